@@ -0,0 +1,235 @@
+"""
+Round-tripping `.buckconfig` editor.
+
+The file is kept as its original lines; only the lines of edited keys change,
+so comments, blank lines, ordering and indentation survive. Edits are batched
+in memory and written once by `save()`, which is a no-op when nothing changed.
+
+`requires_restart()` tells whether the recorded changes touch settings that a
+running buck2 daemon only reads at startup (file watcher, materializer, digest
+and RE/HTTP client settings). Other sections such as [cells], [parser] or
+[buckal] are re-read by buck2 on the next command, so editing them must not
+cost a warm daemon.
+
+    config = BuckConfig.load(workspace / ".buckconfig")
+    config.set("buck2", "file_watcher", "fs_hash_crawler")
+    config.set("buckal", "num_jobs", "8")
+    if config.save(workspace / ".buckconfig") and config.requires_restart():
+        ...  # buck2 kill
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+# Settings the buck2 daemon reads once at startup.
+RESTART_KEYS = frozenset(
+    {
+        ("buck2", "file_watcher"),
+        ("buck2", "materializations"),
+        ("buck2", "sqlite_materializer_state"),
+        ("buck2", "defer_write_actions"),
+        ("buck2", "digest_algorithms"),
+        ("buck2", "source_digest_algorithm"),
+        ("buck2", "daemon_buster"),
+        ("buck2", "allow_vpnless"),
+    }
+)
+RESTART_SECTIONS = frozenset({"buck2_re_client", "buck2_resource_control", "http"})
+
+SECTION_RE = re.compile(r"^\s*\[\s*(?P<name>[^\]]+?)\s*\]\s*(?:[#;].*)?$")
+ENTRY_RE = re.compile(r"^(?P<indent>\s*)(?P<key>[^=\s#;\[][^=]*?)\s*=\s*(?P<value>.*)$")
+DEFAULT_INDENT = "  "
+
+
+@dataclass
+class Entry:
+    section: str
+    key: str
+    value: str
+    start: int  # first line index
+    end: int  # one past the last line (values may continue with a trailing backslash)
+    indent: str
+
+
+@dataclass
+class Change:
+    section: str
+    key: str
+    old: str | None
+    new: str | None
+
+    @property
+    def requires_restart(self) -> bool:
+        return (self.section, self.key) in RESTART_KEYS or self.section in RESTART_SECTIONS
+
+
+class BuckConfig:
+    def __init__(self, text: str = "") -> None:
+        self.original = text
+        self.lines = text.splitlines()
+        self.trailing_newline = text.endswith("\n") or not text
+        self.changes: list[Change] = []
+        self._parse()
+
+    @classmethod
+    def load(cls, path: Path) -> BuckConfig:
+        try:
+            return cls(path.read_text())
+        except FileNotFoundError:
+            return cls()
+
+    def _parse(self) -> None:
+        self.entries: list[Entry] = []
+        # section name -> [(header line, end line)] for every occurrence
+        self.section_spans: dict[str, list[tuple[int, int]]] = {}
+        section: str | None = None
+        i = 0
+        while i < len(self.lines):
+            line = self.lines[i]
+            stripped = line.strip()
+            header = SECTION_RE.match(line)
+            if header:
+                section = header.group("name")
+                self.section_spans.setdefault(section, []).append((i, len(self.lines)))
+                self._close_previous_span(i)
+                i += 1
+                continue
+            match = ENTRY_RE.match(line) if section and stripped[:1] not in ("#", ";") else None
+            start = i
+            i += 1
+            if match is None:
+                continue
+            value = match.group("value")
+            while value.endswith("\\") and i < len(self.lines):
+                value = value[:-1] + self.lines[i].strip()
+                i += 1
+            key = match.group("key").strip()
+            self.entries.append(Entry(section, key, value.strip(), start, i, match.group("indent")))
+
+    def _close_previous_span(self, header_line: int) -> None:
+        # The span of whichever section precedes `header_line` ends there.
+        for spans in self.section_spans.values():
+            for index, (start, end) in enumerate(spans):
+                if start < header_line < end:
+                    spans[index] = (start, header_line)
+
+    def _find(self, section: str, key: str) -> Entry | None:
+        # Later definitions win, as in buck2.
+        for entry in reversed(self.entries):
+            if entry.section == section and entry.key == key:
+                return entry
+        return None
+
+    def get(self, section: str, key: str, default: str | None = None) -> str | None:
+        entry = self._find(section, key)
+        return entry.value if entry else default
+
+    def sections(self) -> list[str]:
+        return list(self.section_spans)
+
+    def items(self, section: str) -> dict[str, str]:
+        return {e.key: e.value for e in self.entries if e.section == section}
+
+    def set(self, section: str, key: str, value: str) -> bool:
+        """Set `section.key`; returns True if the value changed."""
+        value = str(value)
+        entry = self._find(section, key)
+        if entry is not None:
+            if entry.value == value:
+                return False
+            self.lines[entry.start : entry.end] = [f"{entry.indent}{key} = {value}"]
+        elif section in self.section_spans:
+            start, end = self.section_spans[section][-1]
+            # Insert after the section's last entry; trailing blank lines and
+            # comments usually introduce the next section.
+            insert_at = end
+            while insert_at > start + 1 and self.lines[insert_at - 1].strip()[:1] in ("", "#", ";"):
+                insert_at -= 1
+            self.lines.insert(insert_at, f"{self._indent_for(section)}{key} = {value}")
+        else:
+            if self.lines and self.lines[-1].strip():
+                self.lines.append("")
+            self.lines += [f"[{section}]", f"{self._indent_for(section)}{key} = {value}"]
+        self.changes.append(Change(section, key, entry.value if entry else None, value))
+        self._parse()
+        return True
+
+    def unset(self, section: str, key: str) -> bool:
+        entry = self._find(section, key)
+        if entry is None:
+            return False
+        del self.lines[entry.start : entry.end]
+        self.changes.append(Change(section, key, entry.value, None))
+        self._parse()
+        # Remove earlier definitions too, so the key is really gone.
+        self.unset(section, key)
+        return True
+
+    def apply(self, edits: dict[str, str | None]) -> list[Change]:
+        """Apply {"section.key": value} edits (None unsets); returns the effective changes."""
+        before = len(self.changes)
+        for dotted, value in edits.items():
+            section, key = split_key(dotted)
+            if value is None:
+                self.unset(section, key)
+            else:
+                self.set(section, key, value)
+        return self.changes[before:]
+
+    def _indent_for(self, section: str) -> str:
+        for entry in self.entries:
+            if entry.section == section:
+                return entry.indent
+        return self.entries[0].indent if self.entries else DEFAULT_INDENT
+
+    def text(self) -> str:
+        body = "\n".join(self.lines)
+        return body + "\n" if self.trailing_newline and body else body
+
+    def requires_restart(self) -> bool:
+        return any(change.requires_restart for change in self.changes)
+
+    def startup_settings(self) -> dict[str, str]:
+        """The settings a daemon only reads at startup, as {"section.key": value}."""
+        return {
+            f"{e.section}.{e.key}": e.value
+            for e in self.entries
+            if (e.section, e.key) in RESTART_KEYS or e.section in RESTART_SECTIONS
+        }
+
+    def save(self, path: Path) -> bool:
+        """Write the file if its contents changed; returns True if written."""
+        text = self.text()
+        if text == self.original:
+            return False
+        # Replace rather than rewrite in place: workspaces may share inodes
+        # with the sample repo (hardlink materialization).
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        with os.fdopen(fd, "w") as fp:
+            fp.write(text)
+        if path.exists():
+            os.chmod(tmp, path.stat().st_mode & 0o777)
+        os.replace(tmp, path)
+        self.original = text
+        return True
+
+
+def split_key(dotted: str) -> tuple[str, str]:
+    section, sep, key = dotted.partition(".")
+    if not sep or not section or not key:
+        raise ValueError(f"expected section.key, got {dotted!r}")
+    return section.strip(), key.strip()
+
+
+def parse_assignment(text: str) -> tuple[str, str]:
+    """Parse a `section.key=value` command-line assignment."""
+    dotted, sep, value = text.partition("=")
+    if not sep:
+        raise ValueError(f"expected section.key=value, got {text!r}")
+    split_key(dotted)
+    return dotted.strip(), value.strip()
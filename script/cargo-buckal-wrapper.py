@@ -6,26 +6,61 @@ Fixes: libpython3.x.so.1.0: cannot open shared object file
 
 import os
 import sys
-import sysconfig
 import subprocess
 import argparse
 from pathlib import Path
 
+from buckconfig import BuckConfig, parse_assignment
+from cargo_buckal_bin import cargo_buckal_cmd, python_link_env
+
 SCRIPT_DIR = Path(__file__).resolve().parent
 CARGO_BUCKAL_MANIFEST = SCRIPT_DIR / ".." / "cargo-buckal" / "Cargo.toml"
 
 
+def find_buckconfig(start: Path) -> Path:
+    """The .buckconfig of the Buck2 project containing `start` (marked by .buckroot)."""
+    for directory in (start, *start.parents):
+        if (directory / ".buckroot").exists():
+            return directory / ".buckconfig"
+    return start / ".buckconfig"
+
+
+def apply_buckconfig_edits(assignments: list[str]) -> None:
+    try:
+        edits = dict(parse_assignment(item) for item in assignments)
+    except ValueError as exc:
+        sys.exit(f"--set: {exc}")
+    path = find_buckconfig(Path.cwd())
+    config = BuckConfig.load(path)
+    changes = config.apply(edits)
+    if not config.save(path):
+        print(f"[ok] {path} already up to date")
+        return
+    for change in changes:
+        print(f"[ok] set {change.section}.{change.key} = {change.new} in {path}")
+    # Only settings read at daemon startup need a restart; keep a warm daemon otherwise.
+    if config.requires_restart():
+        subprocess.run(["buck2", "kill"], cwd=path.parent, check=False)
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="Run cargo-buckal with proper Python library paths")
     parser.add_argument("--origin", action="store_true",
                        help="Use installed cargo buckal instead of building from source")
+    parser.add_argument("--set", action="append", default=[], metavar="SECTION.KEY=VALUE",
+                        help="Edit the project's .buckconfig before running buckal (repeatable)")
     parser.add_argument("buckal_args", nargs="*", help="Arguments to pass to buckal")
     args = parser.parse_args()
 
+    if args.set:
+        apply_buckconfig_edits(args.set)
+        if not args.buckal_args:
+            return 0
+
     env = os.environ.copy()
 
-    # Set PYO3_PYTHON to current interpreter
-    env["PYO3_PYTHON"] = sys.executable
+    # Set PYO3_PYTHON and the Python library path for the pyo3 link.
+    python_link_env(env)
 
     # Use separate target dir to avoid mixing binaries linked against different Python versions
     env.setdefault(
@@ -33,35 +68,9 @@ def main() -> int:
         str(SCRIPT_DIR / "target" / "buckal-py"),
     )
 
-    # Collect Python library directories
-    lib_dirs: list[str] = []
-    for key in ("LIBDIR", "LIBPL"):
-        value = sysconfig.get_config_var(key)
-        if value:
-            lib_dirs.append(value)
-
-    # Add Python's lib directory relative to executable
-    exe_dir = Path(sys.executable).parent
-    lib_dirs.append(str(exe_dir.parent / "lib"))
-
-    # Set LD_LIBRARY_PATH (or DYLD_LIBRARY_PATH on macOS)
-    ld_var = "DYLD_LIBRARY_PATH" if sys.platform == "darwin" else "LD_LIBRARY_PATH"
-    existing = env.get(ld_var, "")
-    combined = ":".join([d for d in lib_dirs if d] + ([existing] if existing else []))
-    if combined:
-        env[ld_var] = combined
-
-    # Build the command: cargo run ... -- buckal <user_args>
-    if args.origin:
-        # Use installed cargo buckal
-        cmd = ["cargo", "buckal"] + args.buckal_args
-    else:
-        # Build from source
-        cmd = [
-            "cargo", "run", "--quiet",
-            "--manifest-path", str(CARGO_BUCKAL_MANIFEST),
-            "--", "buckal",
-        ] + args.buckal_args
+    # Exec the cached cargo-buckal build directly (or installed cargo buckal
+    # with --origin) instead of paying for `cargo run` on every call.
+    cmd = cargo_buckal_cmd(CARGO_BUCKAL_MANIFEST, env, origin=args.origin) + args.buckal_args
 
     print(f"+ {' '.join(cmd)}")
     return subprocess.run(cmd, env=env).returncode
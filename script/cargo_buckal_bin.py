@@ -0,0 +1,191 @@
+"""
+Resolve a runnable cargo-buckal binary once and reuse it.
+
+`cargo run --manifest-path cargo-buckal/Cargo.toml -- buckal ...` pays for
+cargo's freshness check and build-directory lock on every call. Instead we run
+`cargo build --message-format=json` once, take the executable path from the
+`compiler-artifact` message and remember it, keyed by the Python ABI the binary
+links against (pyo3) and the cargo-buckal git HEAD. Later callers exec the
+binary directly.
+
+Shared by test/buckal_fd_build.py and script/cargo-buckal-wrapper.py.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import sysconfig
+from pathlib import Path
+
+# Set by a parent process that already resolved the binary (e.g. the
+# multi-target harness) so children skip even the cache lookup.
+BIN_ENV_VAR = "CARGO_BUCKAL_BIN"
+CACHE_FILE_NAME = "cargo-buckal-bin.json"
+
+
+def python_link_env(env: dict[str, str]) -> dict[str, str]:
+    """Propagate Python ABI/library path for pyo3 so cargo-buckal can link & run."""
+    env["PYO3_PYTHON"] = sys.executable
+
+    lib_dirs: list[str] = []
+    for key in ("LIBDIR", "LIBPL"):
+        value = sysconfig.get_config_var(key)
+        if value:
+            lib_dirs.append(value)
+    exe_dir = Path(sys.executable).parent
+    lib_dirs.append(str(exe_dir.parent / "lib"))
+    ld_var = "DYLD_LIBRARY_PATH" if sys.platform == "darwin" else "LD_LIBRARY_PATH"
+    existing = env.get(ld_var, "")
+    combined = ":".join([d for d in lib_dirs if d] + ([existing] if existing else []))
+    if combined:
+        env[ld_var] = combined
+    return env
+
+
+def python_abi() -> str:
+    soabi = sysconfig.get_config_var("SOABI") or sys.implementation.cache_tag or "unknown"
+    return f"{soabi}:{sys.executable}"
+
+
+def cargo_buckal_head(manifest: Path) -> str | None:
+    """Return the cargo-buckal git HEAD, or None if it is unknown or the tree is dirty.
+
+    A dirty tree has no stable identity, so callers fall back to `cargo build`
+    (which is incremental anyway) rather than trusting a cached binary.
+    """
+    repo = manifest.parent
+    try:
+        head = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=repo,
+            check=True,
+            text=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=repo,
+            check=True,
+            text=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    if status.strip():
+        return None
+    return head or None
+
+
+def cache_path(manifest: Path, env: dict[str, str]) -> Path:
+    target_dir = env.get("CARGO_TARGET_DIR")
+    base = Path(target_dir) if target_dir else manifest.parent / "target"
+    return base / CACHE_FILE_NAME
+
+
+def load_cached_binary(cache_file: Path, key: str) -> Path | None:
+    try:
+        entries = json.loads(cache_file.read_text())
+    except (OSError, ValueError):
+        return None
+    entry = entries.get(key) if isinstance(entries, dict) else None
+    if not entry:
+        return None
+    binary = Path(entry.get("path", ""))
+    try:
+        mtime_ns = binary.stat().st_mtime_ns
+    except OSError:
+        return None
+    # A rebuild at the same HEAD (e.g. from a since-reverted dirty tree)
+    # changes the mtime; don't trust the entry in that case.
+    if mtime_ns != entry.get("mtime_ns"):
+        return None
+    return binary
+
+
+def store_cached_binary(cache_file: Path, key: str, binary: Path) -> None:
+    try:
+        entries = json.loads(cache_file.read_text())
+        if not isinstance(entries, dict):
+            entries = {}
+    except (OSError, ValueError):
+        entries = {}
+    entries[key] = {"path": str(binary), "mtime_ns": binary.stat().st_mtime_ns}
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cache_file.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(entries, indent=2) + "\n")
+    os.replace(tmp, cache_file)
+
+
+def build_cargo_buckal(manifest: Path, env: dict[str, str]) -> Path:
+    """Run `cargo build` once and return the cargo-buckal executable it produced."""
+    cmd = [
+        "cargo",
+        "build",
+        "--quiet",
+        "--message-format=json-render-diagnostics",
+        "--manifest-path",
+        str(manifest),
+    ]
+    print(f"+ {' '.join(cmd)}")
+    try:
+        result = subprocess.run(cmd, env=env, text=True, stdout=subprocess.PIPE)
+    except OSError as exc:
+        sys.exit(f"failed to run `{' '.join(cmd)}`: {exc}")
+    if result.returncode != 0:
+        # Diagnostics were already rendered on stderr.
+        sys.exit(f"`{' '.join(cmd)}` failed with exit code {result.returncode}")
+    executable: str | None = None
+    for line in result.stdout.splitlines():
+        try:
+            message = json.loads(line)
+        except ValueError:
+            continue
+        if message.get("reason") != "compiler-artifact" or not message.get("executable"):
+            continue
+        if message.get("target", {}).get("name") == "cargo-buckal":
+            executable = message["executable"]
+    if not executable:
+        sys.exit(f"cargo build did not report a cargo-buckal executable for {manifest}")
+    return Path(executable)
+
+
+def resolve_cargo_buckal(manifest: Path, env: dict[str, str]) -> Path:
+    """Return the path of an up-to-date cargo-buckal binary, building it at most once."""
+    override = env.get(BIN_ENV_VAR)
+    if override and Path(override).is_file():
+        return Path(override)
+
+    head = cargo_buckal_head(manifest)
+    key = f"{python_abi()}@{head}" if head else None
+    cache_file = cache_path(manifest, env)
+    if key:
+        cached = load_cached_binary(cache_file, key)
+        if cached:
+            print(f"[info] using cached cargo-buckal binary {cached}")
+            return cached
+
+    binary = build_cargo_buckal(manifest, env)
+    if key:
+        store_cached_binary(cache_file, key, binary)
+    print(f"[info] resolved cargo-buckal binary {binary}")
+    return binary
+
+
+def cargo_buckal_cmd(manifest: Path, env: dict[str, str], origin: bool = False) -> list[str]:
+    """Command prefix for `cargo buckal`; append the subcommand and its arguments."""
+    if origin:
+        return ["cargo", "buckal"]
+    binary = resolve_cargo_buckal(manifest, env)
+    env[BIN_ENV_VAR] = str(binary)
+    # Cargo exports CARGO to subcommands; keep that when exec'ing directly.
+    cargo = shutil.which("cargo")
+    if cargo:
+        env.setdefault("CARGO", cargo)
+    # Cargo invokes subcommand binaries as `cargo-buckal buckal <args>`.
+    return [str(binary), "buckal"]
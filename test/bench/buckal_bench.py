@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""
+Benchmark cargo-buckal migrate and Buck2 build latency on the sample workspaces.
+
+For each target the following scenarios run N times (`--iterations`):
+
+- cold_migrate:      `migrate --buck2` in a freshly materialized, cleaned workspace
+- warm_migrate:      `migrate --buck2` after deleting buckal.snap (full regeneration,
+                     warm OS/cargo caches)
+- noop_migrate:      `migrate --buck2` with nothing changed
+- cold_build:        `buck2 build` after `buck2 clean`
+- incremental_build: `buck2 build` after appending one line to a root source file
+
+Results (median/p95) are printed, appended to a JSON history file, and compared
+against the baseline stored for this host (hostname, CPU count and kernel);
+any scenario whose median is more than `--threshold` slower than the baseline
+is flagged and the script exits non-zero.
+
+`--compare-cargo` instead times cargo and Buck2 head to head on the same
+migrated workspace and target triple (scenarios `<tool>_<scenario>`):
+
+- cold:  build after `cargo clean` / `buck2 clean`
+- noop:  rebuild with nothing changed
+- leaf:  rebuild after editing a workspace member with no first-party
+         dependencies that other members depend on (skipped for one-crate samples)
+- root:  rebuild after editing a member no other member depends on
+
+`--scenarios` selects among these four in this mode (default: all).
+
+Cargo builds into its own CARGO_TARGET_DIR and Buck2 into its own
+`--isolation-dir`, so neither reuses the other's (or the harness's) outputs.
+The results are stored in the history with kind "compare-cargo".
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+TEST_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(TEST_DIR))
+
+from buckal_fd_build import (  # noqa: E402
+    ALL_TARGETS,
+    CARGO_BUCKAL_MANIFEST,
+    REPO_ROOT,
+    ensure_tool,
+    get_default_buck2_target,
+    get_sample_dir,
+    prepare_buck2_workspace,
+    prepare_env,
+)
+from buckal_harness.bench_history import (  # noqa: E402
+    append_history,
+    find_regressions,
+    format_comparison,
+    format_table,
+    host_key,
+    save_baseline,
+)
+from buckal_harness.workspace import STRATEGIES, materialize_workspace, write_text_cow  # noqa: E402
+from buckal_harness.workspace_cache import git_head  # noqa: E402
+from cargo_buckal_bin import cargo_buckal_cmd  # noqa: E402
+from timing_stats import summarize  # noqa: E402
+
+BENCH_DIR = REPO_ROOT / "log" / "bench"
+SCENARIOS = ("cold_migrate", "warm_migrate", "noop_migrate", "cold_build", "incremental_build")
+BUILD_SCENARIOS = ("cold_build", "incremental_build")
+COMPARE_SCENARIOS = ("cold", "noop", "leaf", "root")
+COMPARE_ISOLATION_DIR = "buckal-compare"
+
+
+def timed(cmd: list[str], cwd: Path, env: dict[str, str]) -> float:
+    print(f"+ {' '.join(cmd)} (cwd={cwd})", flush=True)
+    start = time.monotonic()
+    subprocess.run(cmd, cwd=cwd, env=env, check=True)
+    return time.monotonic() - start
+
+
+def quiet(cmd: list[str], cwd: Path, env: dict[str, str]) -> None:
+    subprocess.run(
+        cmd, cwd=cwd, env=env, check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def find_touch_source(workspace: Path) -> Path | None:
+    """Pick a first-party root source file to edit for the incremental build."""
+    for rel in ("src/main.rs", "src/lib.rs"):
+        if (workspace / rel).is_file():
+            return workspace / rel
+    skip = {"third-party", "target", "buck-out", ".git"}
+    for name in ("main.rs", "lib.rs"):
+        for path in sorted(workspace.rglob(f"src/{name}")):
+            if not skip.intersection(path.relative_to(workspace).parts):
+                return path
+    return None
+
+
+def touch_sources(workspace: Path, env: dict[str, str]) -> tuple[Path | None, Path | None]:
+    """(leaf, root) member sources to edit, from `cargo metadata` of the workspace.
+
+    The leaf is a member without first-party dependencies that the most other
+    members depend on; the root is a member nothing depends on, preferring one
+    with a binary. One-crate workspaces have no distinct leaf.
+    """
+    result = subprocess.run(
+        ["cargo", "metadata", "--format-version", "1", "--no-deps"],
+        cwd=workspace,
+        env=env,
+        text=True,
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    metadata = json.loads(result.stdout)
+    members = [p for p in metadata["packages"] if p["id"] in set(metadata["workspace_members"])]
+    names = {p["name"] for p in members}
+    deps = {
+        p["name"]: {d["name"] for d in p["dependencies"] if d.get("path") and d["name"] in names}
+        for p in members
+    }
+    dependents = {name: sum(name in d for d in deps.values()) for name in names}
+
+    def source(package: dict, kinds: tuple[str, ...]) -> Path | None:
+        for kind in kinds:
+            for target in package["targets"]:
+                path = Path(target["src_path"])
+                if kind in target["kind"] and path.is_relative_to(workspace.resolve()):
+                    return path
+        return None
+
+    roots = sorted(
+        (p for p in members if not dependents[p["name"]]),
+        key=lambda p: (source(p, ("bin",)) is None, -len(deps[p["name"]])),
+    )
+    leaves = sorted(
+        (p for p in members if not deps[p["name"]] and dependents[p["name"]]),
+        key=lambda p: -dependents[p["name"]],
+    )
+    root = source(roots[0], ("bin", "lib")) if roots else None
+    leaf = source(leaves[0], ("lib",)) if leaves else None
+    return leaf, root
+
+
+def compare_cargo(
+    target: str,
+    scenarios: list[str],
+    args: argparse.Namespace,
+    env: dict[str, str],
+    buckal_cmd: list[str],
+) -> dict[str, dict]:
+    """Time cargo and Buck2 on the same migrated workspace; keys are `<tool>_<scenario>`."""
+    ns = argparse.Namespace(target=target)
+    sample_dir = get_sample_dir(ns)
+    if not sample_dir.exists():
+        sys.exit(f"Missing sample workspace at {sample_dir}")
+    buck2_target = args.buck2_target or get_default_buck2_target(ns)
+    migrate_cmd = [*buckal_cmd, "migrate", "--buck2"]
+    if args.supported_platform_only:
+        migrate_cmd.append("--supported-platform-only")
+
+    temp_root = Path(tempfile.mkdtemp(prefix=f"buckal-compare-{target}-", dir=args.temp_root))
+    buck2 = ["buck2", "--isolation-dir", COMPARE_ISOLATION_DIR]
+    cargo_env = {**env, "CARGO_TARGET_DIR": str(temp_root / "cargo-target")}
+    cargo_build = ["cargo", "build"]
+    buck2_build = [*buck2, "build", buck2_target]
+    if args.triple:
+        cargo_build += ["--target", args.triple]
+        buck2_build += ["--target-platforms", f"//platforms:{args.triple}"]
+    tools = {
+        "cargo": (cargo_build, ["cargo", "clean"], cargo_env),
+        "buck2": (buck2_build, [*buck2, "clean"], env),
+    }
+    samples: dict[str, list[float]] = {
+        f"{tool}_{scenario}": [] for scenario in scenarios for tool in tools
+    }
+    workspace: Path | None = None
+    touched: dict[Path, str] = {}
+    try:
+        workspace = fresh_workspace(sample_dir, temp_root / "ws" / target, args.materialize, env)
+        subprocess.run(migrate_cmd, cwd=workspace, env=env, check=True)
+        if not args.no_fetch:
+            subprocess.run([*buckal_cmd, "migrate", "--fetch"], cwd=workspace, env=env, check=True)
+        # Downloads are not part of either build.
+        subprocess.run(["cargo", "fetch"], cwd=workspace, env=cargo_env, check=True)
+
+        # Alternate the tools in every round so neither always runs on a warmer machine.
+        # Without the cold scenario, one untimed build gives the others a built workspace.
+        cold_runs = args.iterations if "cold" in scenarios else 1
+        for _ in range(cold_runs):
+            for tool, (build, clean, tool_env) in tools.items():
+                quiet(clean, workspace, tool_env)
+                elapsed = timed(build, workspace, tool_env)
+                if "cold" in scenarios:
+                    samples[f"{tool}_cold"].append(elapsed)
+        if "noop" in scenarios:
+            for _ in range(args.iterations):
+                for tool, (build, _clean, tool_env) in tools.items():
+                    samples[f"{tool}_noop"].append(timed(build, workspace, tool_env))
+
+        edits = [scenario for scenario in ("leaf", "root") if scenario in scenarios]
+        leaf, root = touch_sources(workspace, cargo_env) if edits else (None, None)
+        for scenario, source in (("leaf", leaf), ("root", root)):
+            if scenario not in edits:
+                continue
+            if source is None:
+                print(f"[warn] {target}: no distinct {scenario} crate to edit; skipping {scenario}.")
+                continue
+            print(f"[info] {target}: {scenario} edits go to {source.relative_to(workspace)}")
+            original = touched.setdefault(source, source.read_text())
+            for i in range(args.iterations):
+                for tool, (build, _clean, tool_env) in tools.items():
+                    write_text_cow(source, f"{original}\n// buckal-bench {scenario} {tool} {i}\n")
+                    samples[f"{tool}_{scenario}"].append(timed(build, workspace, tool_env))
+    finally:
+        for source, original in touched.items():
+            write_text_cow(source, original)
+        if workspace is not None:
+            quiet([*buck2, "kill"], workspace, env)
+            quiet(["buck2", "kill"], workspace, env)
+        if args.keep_temp:
+            print(f"[info] kept comparison workspace under {temp_root}")
+        else:
+            shutil.rmtree(temp_root, ignore_errors=True)
+
+    return {name: summarize(values) for name, values in samples.items() if values}
+
+
+def fresh_workspace(sample_dir: Path, dest: Path, strategy: str, env: dict[str, str]) -> Path:
+    workspace = materialize_workspace(sample_dir, dest, strategy=strategy).path
+    prepare_buck2_workspace(workspace, env, clean=True)
+    return workspace
+
+
+def bench_target(
+    target: str,
+    scenarios: list[str],
+    args: argparse.Namespace,
+    env: dict[str, str],
+    buckal_cmd: list[str],
+) -> dict[str, dict]:
+    ns = argparse.Namespace(target=target)
+    sample_dir = get_sample_dir(ns)
+    if not sample_dir.exists():
+        sys.exit(f"Missing sample workspace at {sample_dir}")
+    buck2_target = args.buck2_target or get_default_buck2_target(ns)
+    migrate_cmd = [*buckal_cmd, "migrate", "--buck2"]
+    if args.supported_platform_only:
+        migrate_cmd.append("--supported-platform-only")
+
+    temp_root = Path(tempfile.mkdtemp(prefix=f"buckal-bench-{target}-", dir=args.temp_root))
+    samples: dict[str, list[float]] = {name: [] for name in scenarios}
+    workspace: Path | None = None
+    touched: tuple[Path, str] | None = None
+    try:
+        # Cold migrate needs a fresh workspace per iteration; the last one is
+        # kept for the remaining scenarios.
+        cold_runs = args.iterations if "cold_migrate" in scenarios else 1
+        for i in range(cold_runs):
+            if workspace is not None:
+                quiet(["buck2", "kill"], workspace, env)
+                shutil.rmtree(workspace.parent, ignore_errors=True)
+            workspace = fresh_workspace(
+                sample_dir, temp_root / f"ws-{i}" / target, args.materialize, env
+            )
+            elapsed = timed(migrate_cmd, workspace, env)
+            if "cold_migrate" in scenarios:
+                samples["cold_migrate"].append(elapsed)
+        assert workspace is not None
+
+        if "warm_migrate" in scenarios:
+            for _ in range(args.iterations):
+                (workspace / "buckal.snap").unlink(missing_ok=True)
+                samples["warm_migrate"].append(timed(migrate_cmd, workspace, env))
+
+        if "noop_migrate" in scenarios:
+            for _ in range(args.iterations):
+                samples["noop_migrate"].append(timed(migrate_cmd, workspace, env))
+
+        if not any(name in scenarios for name in BUILD_SCENARIOS):
+            return {name: summarize(values) for name, values in samples.items() if values}
+
+        if not args.no_fetch:
+            subprocess.run([*buckal_cmd, "migrate", "--fetch"], cwd=workspace, env=env, check=True)
+
+        build_cmd = ["buck2", "build", buck2_target]
+        if "cold_build" in scenarios:
+            for _ in range(args.iterations):
+                quiet(["buck2", "clean"], workspace, env)
+                samples["cold_build"].append(timed(build_cmd, workspace, env))
+        else:
+            timed(build_cmd, workspace, env)
+
+        if "incremental_build" in scenarios:
+            source = find_touch_source(workspace)
+            if source is None:
+                print(f"[warn] {target}: no src/main.rs or src/lib.rs to touch; skipping.")
+                del samples["incremental_build"]
+            else:
+                original = source.read_text()
+                touched = (source, original)
+                for i in range(args.iterations):
+                    write_text_cow(source, f"{original}\n// buckal-bench touch {i}\n")
+                    samples["incremental_build"].append(timed(build_cmd, workspace, env))
+    finally:
+        if touched:
+            write_text_cow(*touched)
+        if workspace is not None:
+            quiet(["buck2", "kill"], workspace, env)
+        if args.keep_temp:
+            print(f"[info] kept benchmark workspaces under {temp_root}")
+        else:
+            shutil.rmtree(temp_root, ignore_errors=True)
+
+    return {name: summarize(values) for name, values in samples.items() if values}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--targets",
+        default="fd",
+        help=f"comma-separated targets to benchmark (default: fd; one of {', '.join(ALL_TARGETS)})",
+    )
+    parser.add_argument(
+        "--scenarios",
+        help=f"comma-separated scenarios to run (default: all; {', '.join(SCENARIOS)}, or with "
+        f"--compare-cargo {', '.join(COMPARE_SCENARIOS)})",
+    )
+    parser.add_argument("--iterations", type=int, default=5, help="runs per scenario (default: 5)")
+    parser.add_argument("--buck2-target", help="Buck2 target to build (default: depends on target)")
+    parser.add_argument(
+        "--supported-platform-only",
+        action="store_true",
+        help="pass --supported-platform-only to migrate",
+    )
+    parser.add_argument("--no-fetch", action="store_true", help="skip fetching buckal bundles")
+    parser.add_argument(
+        "--origin",
+        action="store_true",
+        help="benchmark the installed cargo-buckal instead of the local dev version",
+    )
+    parser.add_argument("--materialize", choices=STRATEGIES, default="auto")
+    parser.add_argument("--temp-root", help="parent directory for benchmark workspaces")
+    parser.add_argument("--keep-temp", action="store_true", help="keep benchmark workspaces")
+    parser.add_argument(
+        "--compare-cargo",
+        action="store_true",
+        help="time cargo against Buck2 (cold, no-op, leaf edit, root edit) instead of the "
+        "migrate/build scenarios; stored in the history with kind compare-cargo",
+    )
+    parser.add_argument(
+        "--triple",
+        help="target triple for --compare-cargo (cargo --target, Buck2 //platforms:<triple>; "
+        "default: host)",
+    )
+    parser.add_argument(
+        "--history",
+        default=str(BENCH_DIR / "history.json"),
+        help="JSON history file to append results to (default: log/bench/history.json)",
+    )
+    parser.add_argument(
+        "--baseline",
+        default=str(BENCH_DIR / "baseline.json"),
+        help="baseline file to compare against (default: log/bench/baseline.json)",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="store this run's results as the new baseline",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="flag a regression when a median is this much slower than baseline (default: 0.10)",
+    )
+    args = parser.parse_args()
+
+    targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+    known = COMPARE_SCENARIOS if args.compare_cargo else SCENARIOS
+    scenarios = [s.strip() for s in (args.scenarios or ",".join(known)).split(",") if s.strip()]
+    for target in targets:
+        if target not in ALL_TARGETS:
+            sys.exit(f"Unknown target: {target}")
+    for scenario in scenarios:
+        if scenario not in known:
+            mode = " with --compare-cargo" if args.compare_cargo else ""
+            sys.exit(f"Unknown scenario{mode}: {scenario}. Choose from {', '.join(known)}.")
+    if args.iterations < 1:
+        sys.exit("--iterations must be at least 1")
+
+    ensure_tool("cargo")
+    ensure_tool("buck2")
+    env = prepare_env()
+    buckal_cmd = cargo_buckal_cmd(CARGO_BUCKAL_MANIFEST, env, origin=args.origin)
+
+    if args.compare_cargo:
+        for target in targets:
+            results = compare_cargo(target, scenarios, args, env, buckal_cmd)
+            print()
+            print(format_comparison(target, results))
+            append_history(
+                Path(args.history),
+                {
+                    "kind": "compare-cargo",
+                    "target": target,
+                    "triple": args.triple,
+                    "cargo_buckal_head": git_head(CARGO_BUCKAL_MANIFEST.parent),
+                    "sample_head": git_head(get_sample_dir(argparse.Namespace(target=target))),
+                    "iterations": args.iterations,
+                    "supported_platform_only": args.supported_platform_only,
+                    "scenarios": results,
+                },
+            )
+        return
+
+    regressions: list[str] = []
+    for target in targets:
+        results = bench_target(target, scenarios, args, env, buckal_cmd)
+        print()
+        print(format_table(target, results))
+        append_history(
+            Path(args.history),
+            {
+                "kind": "bench",
+                "target": target,
+                "cargo_buckal_head": git_head(CARGO_BUCKAL_MANIFEST.parent),
+                "sample_head": git_head(get_sample_dir(argparse.Namespace(target=target))),
+                "iterations": args.iterations,
+                "supported_platform_only": args.supported_platform_only,
+                "scenarios": results,
+            },
+        )
+        if args.save_baseline:
+            save_baseline(Path(args.baseline), target, results)
+            print(f"[ok] saved baseline for {target} to {args.baseline}")
+        else:
+            found = find_regressions(Path(args.baseline), target, results, args.threshold)
+            if found is None:
+                print(
+                    f"[warn] no baseline for {target} recorded on this host ({host_key()}); "
+                    "skipping the regression check"
+                )
+            else:
+                regressions.extend(found)
+
+    if regressions:
+        print("\nRegressions beyond threshold:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Snapshot and diff the files cargo-buckal generated in a workspace.
+
+`snapshot` walks a migrated workspace (outside .git/buck-out/target), reads
+the first 512 bytes of every file, keeps the files whose header carries the
+`# @generated by cargo buckal` tag, hashes them in parallel and stores a JSON
+manifest (file -> sha256, plus for BUCK and .bzl files a sha256 per top-level
+rule keyed by its `name`) under `log/buck-manifests/`. `diff` compares two
+manifests, or a manifest and a live workspace, without touching the files
+again, and reports added/removed/changed files and, for changed files, which
+rules changed.
+
+Examples:
+
+    buckal_buck_diff.py snapshot ../3rd/libra --name libra-before
+    buckal_buck_diff.py diff libra-before ../3rd/libra
+    buckal_buck_diff.py diff libra-before libra-after --json
+    buckal_buck_diff.py list
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+from buckal_harness.incremental import SKIP_DIRS
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+MANIFEST_DIR = REPO_ROOT / "log" / "buck-manifests"
+MANIFEST_VERSION = 1
+# cargo-buckal writes the tag on its first lines; some versions quote the command.
+GENERATED_RE = re.compile(rb"@generated by `?cargo[ -]buckal`?")
+HEADER_BYTES = 512
+RULE_START_RE = re.compile(r"^(?P<kind>[A-Za-z_][\w.]*)\($")
+RULE_NAME_RE = re.compile(r'^\s+name = "(?P<name>[^"]*)",?$')
+STARLARK_NAMES = frozenset({"BUCK", "BUCK.v2", "TARGETS"})
+
+
+def rule_hashes(text: str) -> dict[str, str]:
+    """sha256 of each top-level `kind(\\n ... \\n)` call, keyed by `kind:name`."""
+    rules: dict[str, str] = {}
+    lines = text.splitlines(keepends=True)
+    i = 0
+    while i < len(lines):
+        start = RULE_START_RE.match(lines[i].rstrip("\n"))
+        if not start:
+            i += 1
+            continue
+        j = i + 1
+        name = None
+        while j < len(lines) and not lines[j].startswith(")"):
+            if name is None:
+                match = RULE_NAME_RE.match(lines[j].rstrip("\n"))
+                if match:
+                    name = match.group("name")
+            j += 1
+        body = "".join(lines[i : j + 1])
+        key = f"{start.group('kind')}:{name if name is not None else f'@{i + 1}'}"
+        rules[key] = hashlib.sha256(body.encode()).hexdigest()
+        i = j + 1
+    return rules
+
+
+def hash_generated(path: Path) -> dict | None:
+    """Manifest entry for `path`, or None if it is not a cargo-buckal output.
+
+    Only the header is read for files without the tag.
+    """
+    try:
+        with path.open("rb") as fp:
+            header = fp.read(HEADER_BYTES)
+            if not GENERATED_RE.search(header):
+                return None
+            data = header + fp.read()
+    except OSError:
+        return None
+    starlark = path.name in STARLARK_NAMES or path.suffix == ".bzl"
+    return {
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "size": len(data),
+        "rules": rule_hashes(data.decode("utf-8", errors="replace")) if starlark else {},
+    }
+
+
+def candidate_files(workspace: Path) -> list[Path]:
+    """Every regular file outside .git and build output dirs."""
+    files: list[Path] = []
+    for dirpath, dirnames, filenames in os.walk(workspace):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        files.extend(
+            path for path in (Path(dirpath) / name for name in filenames) if not path.is_symlink()
+        )
+    return files
+
+
+def snapshot(workspace: Path, workers: int) -> dict:
+    start = time.monotonic()
+    files = candidate_files(workspace)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        entries = list(pool.map(hash_generated, files))
+    generated = {
+        str(path.relative_to(workspace)): entry
+        for path, entry in zip(files, entries)
+        if entry is not None
+    }
+    return {
+        "version": MANIFEST_VERSION,
+        "workspace": str(workspace.resolve()),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "scanned": len(files),
+        "elapsed_s": round(time.monotonic() - start, 3),
+        "files": dict(sorted(generated.items())),
+    }
+
+
+def manifest_path(name: str) -> Path:
+    return MANIFEST_DIR / f"{name}.json"
+
+
+def load_source(source: str, workers: int) -> dict:
+    """A manifest file, a stored manifest name, or a workspace to snapshot now."""
+    path = Path(source)
+    if path.is_dir():
+        return snapshot(path, workers)
+    for candidate in (path, manifest_path(source)):
+        if candidate.is_file():
+            manifest = json.loads(candidate.read_text())
+            if manifest.get("version") != MANIFEST_VERSION:
+                sys.exit(f"{candidate}: unsupported manifest version {manifest.get('version')}")
+            return manifest
+    sys.exit(f"{source}: not a workspace, manifest file or stored manifest name")
+
+
+@dataclass
+class ManifestDiff:
+    added: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    changed: dict[str, dict[str, list[str]]] = field(default_factory=dict)
+    unchanged: int = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "added": self.added,
+            "removed": self.removed,
+            "changed": self.changed,
+            "unchanged": self.unchanged,
+        }
+
+
+def diff_manifests(old: dict, new: dict) -> ManifestDiff:
+    old_files, new_files = old["files"], new["files"]
+    diff = ManifestDiff()
+    diff.added = sorted(set(new_files) - set(old_files))
+    diff.removed = sorted(set(old_files) - set(new_files))
+    for rel in sorted(set(old_files) & set(new_files)):
+        before, after = old_files[rel], new_files[rel]
+        if before["sha256"] == after["sha256"]:
+            diff.unchanged += 1
+            continue
+        old_rules, new_rules = before["rules"], after["rules"]
+        diff.changed[rel] = {
+            "added": sorted(set(new_rules) - set(old_rules)),
+            "removed": sorted(set(old_rules) - set(new_rules)),
+            "changed": sorted(
+                key for key in set(old_rules) & set(new_rules) if old_rules[key] != new_rules[key]
+            ),
+        }
+    return diff
+
+
+def print_diff(diff: ManifestDiff, limit: int) -> None:
+    print(
+        f"{len(diff.changed)} changed, {len(diff.added)} added, {len(diff.removed)} removed, "
+        f"{diff.unchanged} unchanged"
+    )
+    for label, files in (("added", diff.added), ("removed", diff.removed)):
+        for rel in files[:limit]:
+            print(f"  {'+' if label == 'added' else '-'} {rel}")
+        if len(files) > limit:
+            print(f"  ... {len(files) - limit} more {label}")
+    for rel, rules in list(diff.changed.items())[:limit]:
+        print(f"  ~ {rel}")
+        for sign, key in (("+", "added"), ("-", "removed"), ("~", "changed")):
+            for rule in rules[key]:
+                print(f"      {sign} {rule}")
+    if len(diff.changed) > limit:
+        print(f"  ... {len(diff.changed) - limit} more changed")
+
+
+def cmd_snapshot(args: argparse.Namespace) -> None:
+    workspace = Path(args.workspace)
+    if not workspace.is_dir():
+        sys.exit(f"{workspace} is not a directory")
+    manifest = snapshot(workspace, args.workers)
+    name = args.name or f"{workspace.resolve().name}_{datetime.now():%Y-%m-%d_%H-%M-%S}"
+    out = Path(args.output) if args.output else manifest_path(name)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(manifest, indent=1) + "\n")
+    print(
+        f"[ok] {len(manifest['files'])} generated file(s) of {manifest['scanned']} scanned "
+        f"in {manifest['elapsed_s']:.2f}s -> {out}"
+    )
+
+
+def cmd_diff(args: argparse.Namespace) -> None:
+    old = load_source(args.old, args.workers)
+    new = load_source(args.new, args.workers)
+    diff = diff_manifests(old, new)
+    if args.json:
+        print(json.dumps(diff.as_dict(), indent=2))
+    else:
+        print_diff(diff, args.limit)
+    if args.exit_code and (diff.added or diff.removed or diff.changed):
+        sys.exit(1)
+
+
+def cmd_list(_args: argparse.Namespace) -> None:
+    for path in sorted(MANIFEST_DIR.glob("*.json")):
+        try:
+            manifest = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        print(
+            f"{path.stem:40}  {manifest.get('created_at', '?'):19}  "
+            f"{len(manifest.get('files', {})):6} files  {manifest.get('workspace', '')}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Snapshot and diff cargo-buckal generated files")
+    parser.add_argument(
+        "--workers", type=int, default=min(32, (os.cpu_count() or 4) * 2),
+        help="parallel hashing threads",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    snap = sub.add_parser("snapshot", help="hash a workspace's generated files and store a manifest")
+    snap.add_argument("workspace")
+    snap.add_argument("--name", help="manifest name under log/buck-manifests/ (default: dir_date)")
+    snap.add_argument("-o", "--output", help="write the manifest to this path instead")
+    snap.set_defaults(func=cmd_snapshot)
+
+    diff = sub.add_parser("diff", help="diff two manifests (names, paths or workspaces)")
+    diff.add_argument("old")
+    diff.add_argument("new")
+    diff.add_argument("--json", action="store_true", help="print the diff as JSON")
+    diff.add_argument("--limit", type=int, default=50, help="max files listed per group")
+    diff.add_argument(
+        "--exit-code", action="store_true", help="exit with status 1 if anything changed"
+    )
+    diff.set_defaults(func=cmd_diff)
+
+    lst = sub.add_parser("list", help="list stored manifests")
+    lst.set_defaults(func=cmd_list)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
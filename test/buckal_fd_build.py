@@ -13,6 +13,10 @@ Supports six test targets:
 
 By default the script copies the sample project to a temporary directory to avoid
 dirtying the repo. Use `--inplace` to run directly in the sample directory.
+
+Use `--targets fd,libra,...` or `--all-targets` to run several targets in
+parallel (bounded by `--jobs`); each target runs in its own child process and
+workspace, and a combined pass/fail table is printed at the end.
 """
 
 from __future__ import annotations
@@ -24,13 +28,46 @@ import platform
 import shutil
 import subprocess
 import sys
-import sysconfig
 import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
+from typing import Any
 
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "script"))
+
+from buckal_harness.buck2_tests import (  # noqa: E402
+    aggregate,
+    find_test_targets,
+    format_test_summary,
+    run_sharded_tests,
+    summarize_tests,
+    unexplained_failures,
+    write_junit,
+)
+from buckal_harness.buildscripts import format_profile, profile_buildscripts  # noqa: E402
+from buckal_harness.crate_store import CrateStore  # noqa: E402
+from buckal_harness.daemon import Buck2Daemon  # noqa: E402
+from buckal_harness.event_log import analyze_invocation, format_summary  # noqa: E402
+from buckal_harness.graph_stats import compare_platform_filtering, format_graph_stats  # noqa: E402
+from buckal_harness.incremental import verify_incremental  # noqa: E402
+from buckal_harness.patches import apply_crate_patches  # noqa: E402
+from buckal_harness.remote_cache import (  # noqa: E402
+    LocalCacheServer,
+    cache_stats,
+    cache_stats_from_event_logs,
+    configure_remote_cache,
+    platform_caching,
+)
+from buckal_harness.report import RunReport  # noqa: E402
+from buckal_harness.workspace import STRATEGIES, materialize_workspace  # noqa: E402
+from buckal_harness.workspace_cache import WorkspaceCache, cache_key_parts  # noqa: E402
+from buckconfig import BuckConfig  # noqa: E402
+from cargo_buckal_bin import cargo_buckal_cmd, python_link_env  # noqa: E402
+
 FD_SAMPLE_DIR = REPO_ROOT / "test" / "3rd" / "fd"
 LIBRA_SAMPLE_DIR = REPO_ROOT / "test" / "3rd" / "libra"
 GIT_INTERNAL_SAMPLE_DIR = REPO_ROOT / "test" / "3rd" / "git-internal"
@@ -38,11 +75,162 @@ CARGO_BUCKAL_SAMPLE_DIR = REPO_ROOT / "test" / "3rd" / "cargo-buckal"
 RUST_TEST_WORKSPACE_DIR = REPO_ROOT / "test" / "rust_test_workspace"
 FIRST_PARTY_DEMO_DIR = REPO_ROOT / "test" / "first-party-demo"
 CARGO_BUCKAL_MANIFEST = REPO_ROOT / "cargo-buckal" / "Cargo.toml"
+BUCKAL_BUNDLES_DIR = REPO_ROOT / "buckal-bundles"
+HARNESS_LOG_DIR = REPO_ROOT / "log" / "harness"
+
+ALL_TARGETS = (
+    "fd",
+    "libra",
+    "git-internal",
+    "cargo-buckal",
+    "rust_test_workspace",
+    "first_party_demo",
+)
+# Options handled by the multi-target parent (and whether they take a value);
+# they are stripped before the remaining arguments are forwarded to each
+# per-target child run.
+MULTI_TARGET_OPTIONS = {
+    "--targets": True,
+    "--all-targets": False,
+    "--jobs": True,
+    "--report": True,
+    # Each child writes its results to <DIR>/<target>.
+    "--test-results": True,
+}
+# Path-valued options forwarded to the children, which run with cwd=REPO_ROOT;
+# they are made absolute against the caller's cwd first.
+FORWARDED_PATH_OPTIONS = frozenset(
+    {"--temp-root", "--workspace-cache", "--crate-store", "--remote-cache"}
+)
+
+# Per-invocation buck2 event logs (kept in buck-out, parsed into the report).
+EVENT_LOG_DIR = Path("buck-out") / "buckal-events"
+
+# Phase timings for this process; written by --report and summarised at exit.
+REPORT = RunReport()
+
+
+def run(cmd: list[str], cwd: Path, env: dict[str, str], phase: str | None = None) -> None:
+    print(f"+ {' '.join(cmd)} (cwd={cwd})")
+    with REPORT.phase(phase or " ".join(cmd[:2]), cmd=cmd):
+        subprocess.run(cmd, cwd=cwd, env=env, check=True)
 
 
-def run(cmd: list[str], cwd: Path, env: dict[str, str]) -> None:
-    print(f"+ {' '.join(cmd)} (cwd={cwd})")
-    subprocess.run(cmd, cwd=cwd, env=env, check=True)
+def run_tests(
+    args: argparse.Namespace,
+    workspace: Path,
+    env: dict[str, str],
+    with_event_log: bool,
+    action_phases: dict[str, object],
+) -> list[Path]:
+    """Run the test targets in shards (and repeats); write JUnit/JSON results.
+
+    Returns the event logs of all shard invocations.
+    """
+    with REPORT.phase("test targets"):
+        targets = find_test_targets(workspace, env, args.buck2_test_target)
+    if not targets:
+        print(f"[info] no test targets under {args.buck2_test_target}")
+        return []
+    with REPORT.phase("test"):
+        runs = run_sharded_tests(
+            workspace, env, targets, args.test_shards, args.test_repeat, workspace / EVENT_LOG_DIR
+        )
+    event_logs = [
+        workspace / EVENT_LOG_DIR / f"test-r{shard_run.repeat}-s{shard_run.shard}.json-lines"
+        for shard_run in runs
+    ]
+    if with_event_log:
+        for shard_run, event_log in zip(runs, event_logs):
+            if shard_run.repeat == 1 and event_log.exists():
+                record_actions(
+                    workspace, env, f"test shard {shard_run.shard}", event_log, action_phases
+                )
+
+    tests = aggregate(runs)
+    summary = summarize_tests(runs, tests)
+    if args.test_results:
+        results_dir = Path(args.test_results)
+    else:
+        stamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        results_dir = HARNESS_LOG_DIR / "tests" / f"{stamp}_{args.target}"
+    write_junit(results_dir / "junit.xml", tests, args.target)
+    (results_dir / "tests.json").write_text(
+        json.dumps({"summary": summary, "tests": tests}, indent=2) + "\n"
+    )
+    print(format_test_summary(summary))
+    print(f"[ok] wrote {results_dir / 'junit.xml'} and tests.json")
+    REPORT.add_section("tests", {"results_dir": str(results_dir), **summary})
+
+    broken = unexplained_failures(runs)
+    if summary["failed"] or broken:
+        shards = ", ".join(f"shard {r.shard} run {r.repeat}" for r in broken)
+        sys.exit(
+            "Buck2 tests failed"
+            + (f": {len(summary['failed'])} failing tests" if summary["failed"] else "")
+            + (f"; non-test failures in {shards}" if broken else "")
+        )
+    print("[ok] Buck2 tests finished")
+    return event_logs
+
+
+def event_log_args(workspace: Path, phase: str, enabled: bool) -> tuple[list[str], Path | None]:
+    """`--event-log` arguments for one buck2 invocation, and the log path."""
+    if not enabled:
+        return [], None
+    path = workspace / EVENT_LOG_DIR / f"{phase.replace(' ', '-').replace('/', '_')}.json-lines"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.unlink(missing_ok=True)
+    return ["--event-log", str(path)], path
+
+
+def record_actions(
+    workspace: Path,
+    env: dict[str, str],
+    phase: str,
+    event_log: Path | None,
+    phases: dict[str, object],
+) -> None:
+    """Summarize the actions of the buck2 invocation that just wrote `event_log`."""
+    if event_log is None:
+        return
+    summary = analyze_invocation(event_log, workspace, env)
+    phases[phase] = summary
+    print(format_summary(phase, summary))
+
+
+def record_remote_cache_stats(
+    workspace: Path,
+    env: dict[str, str],
+    phase: str,
+    phases: dict[str, object],
+    event_logs: list[Path] | None = None,
+) -> None:
+    """Record the remote-cache hit rate of the last buck2 command under `phase`.
+
+    With `event_logs`, the phase's invocations are counted from their logs instead.
+    """
+    stats = cache_stats_from_event_logs(event_logs) if event_logs else cache_stats(workspace, env)
+    phases[phase] = stats
+    if stats is None:
+        print(f"[warn] remote cache: no action data for {phase}")
+        return
+    print(f"[info] remote cache ({phase}): {stats['cache_hits']}/{stats['actions']} actions cached")
+    if stats["actions"] and not stats["cache_hits"]:
+        print(
+            "[warn] no cache hits; the execution platform must enable remote_cache_enabled and "
+            "allow_cache_uploads for buck2 to use the cache"
+        )
+
+
+def warn_remote_cache_unused(caching: dict[str, Any]) -> None:
+    platforms = ", ".join(caching["execution_platforms"]) or "buck2's default platform"
+    print("[warn] " + "=" * 72)
+    print(f"[warn] remote cache NOT used: no execution platform ({platforms}) sets")
+    print("[warn] remote_cache_enabled and allow_cache_uploads, so buck2 would never read")
+    print("[warn] or write the cache. Not starting it or touching [buck2_re_client].")
+    print("[warn] Configure a caching execution platform, or pass --remote-cache-force.")
+    print("[warn] " + "=" * 72)
 
 
 def ensure_tool(tool: str) -> None:
@@ -194,79 +382,108 @@ def multi_platform_targets(host: str, use_cross: bool = False) -> tuple[str, ...
     raise ValueError(f"Unexpected host: {host!r}")
 
 
-def ensure_valid_buck2_daemon(cwd: Path, env: dict[str, str]) -> None:
+def build_platform(
+    target: str, triple: str, cwd: Path, env: dict[str, str], extra_args: list[str]
+) -> tuple[str, int, float, str]:
+    cmd = ["buck2", "build", target, "--target-platforms", triple, *extra_args]
+    print(f"+ {' '.join(cmd)} (cwd={cwd})", flush=True)
+    start = time.monotonic()
     result = subprocess.run(
-        ["buck2", "status"],
-        cwd=cwd,
-        env=env,
-        text=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-    )
-    if result.returncode != 0:
-        return
-    try:
-        status = json.loads(result.stdout)
-    except json.JSONDecodeError:
-        return
-    if status.get("valid_working_directory") is False or status.get("valid_buck_out_mount") is False:
-        print("Buck2 daemon reports stale working directory; restarting buckd.")
-        subprocess.run(["buck2", "kill"], cwd=cwd, env=env, check=False)
-
-
-def ensure_buck2_file_watcher(workspace: Path, env: dict[str, str], watcher: str) -> None:
+        cmd, cwd=cwd, env=env, text=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+    )
+    return triple, result.returncode, time.monotonic() - start, result.stdout
+
+
+def build_platforms(
+    target: str,
+    platforms: tuple[str, ...],
+    cwd: Path,
+    env: dict[str, str],
+    jobs: int,
+    extra_args: dict[str, list[str]] | None = None,
+) -> list[tuple[str, int, float]]:
+    """Build `target` for every platform concurrently against the workspace's buck2 daemon.
+
+    All commands share one daemon, so host-side work common to the platforms
+    (proc-macros, build scripts) is computed once and the remaining actions are
+    interleaved by Buck2's scheduler. Each command's output is buffered and
+    printed as a block when it finishes, and its exit code is reported per
+    platform. `jobs=1` keeps the old one-after-another behaviour. `extra_args`
+    maps a platform to additional buck2 arguments (e.g. its `--event-log`).
+    """
+    results: list[tuple[str, int, float]] = []
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(platforms)))) as pool:
+        futures = [
+            pool.submit(build_platform, target, p, cwd, env, (extra_args or {}).get(p, []))
+            for p in platforms
+        ]
+        for future in as_completed(futures):
+            triple, returncode, elapsed, output = future.result()
+            status = "ok" if returncode == 0 else f"failed (exit {returncode})"
+            print(f"----- {triple}: {status} after {elapsed:.1f}s -----")
+            if output:
+                print(output.rstrip())
+            results.append((triple, returncode, elapsed))
+    order = {triple: index for index, triple in enumerate(platforms)}
+    return sorted(results, key=lambda result: order[result[0]])
+
+
+def print_platform_table(results: list[tuple[str, int, float]]) -> None:
+    width = max(len("platform"), *(len(triple) for triple, _, _ in results))
+    print(f"{'platform':<{width}}  {'result':<6}  {'time':>8}")
+    for triple, returncode, elapsed in results:
+        result = "pass" if returncode == 0 else "FAIL"
+        print(f"{triple:<{width}}  {result:<6}  {elapsed:>7.1f}s")
+
+
+def ensure_buck2_file_watcher(workspace: Path, watcher: str) -> None:
     buckconfig_path = workspace / ".buckconfig"
     if not buckconfig_path.exists():
         return
 
-    contents = buckconfig_path.read_text()
-    lines = contents.splitlines()
-    out_lines: list[str] = []
-    in_buck2 = False
-    found_buck2 = False
-    set_file_watcher = False
-
-    for line in lines:
-        stripped = line.strip()
-        if stripped.startswith("[") and stripped.endswith("]"):
-            if in_buck2 and not set_file_watcher:
-                out_lines.append(f"file_watcher = {watcher}")
-                set_file_watcher = True
-            section = stripped[1:-1].strip()
-            in_buck2 = section == "buck2"
-            if in_buck2:
-                found_buck2 = True
-            out_lines.append(line)
-            continue
-
-        if in_buck2:
-            key = stripped.split("#", 1)[0].split(";", 1)[0].strip()
-            if key.startswith("file_watcher"):
-                prefix = line[: len(line) - len(line.lstrip())]
-                out_lines.append(f"{prefix}file_watcher = {watcher}")
-                set_file_watcher = True
-                continue
-
-        out_lines.append(line)
+    config = BuckConfig.load(buckconfig_path)
+    config.set("buck2", "file_watcher", watcher)
+    if not config.save(buckconfig_path):
+        return
+    # A running daemon keeps its old watcher; Buck2Daemon.ensure() restarts it
+    # because the startup configuration fingerprint changed.
+    print(f"[ok] set buck2.file_watcher = {watcher} in {buckconfig_path}")
+
+
+def clean_buck2_files(workspace: Path) -> None:
+    """Remove existing Buck2/Buckal files (like CI's clean_existing_buck2_and_buckal)."""
+    for filename in ("buckal.snap", ".buckconfig", ".buckroot", "BUCK"):
+        path = workspace / filename
+        if path.exists():
+            path.unlink()
+    for dirname in ("third-party", "toolchains", "platforms"):
+        path = workspace / dirname
+        if path.exists():
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def prepare_buck2_workspace(workspace: Path, env: dict[str, str], clean: bool = False) -> None:
+    """Get a workspace ready for `cargo buckal migrate`: optional clean, buck2 init, watcher."""
+    if clean:
+        print("Cleaning existing Buck2/Buckal files...")
+        with REPORT.phase("clean-buck2"):
+            clean_buck2_files(workspace)
 
-    if in_buck2 and not set_file_watcher:
-        out_lines.append(f"file_watcher = {watcher}")
-        set_file_watcher = True
+    buckconfig_path = workspace / ".buckconfig"
+    if not buckconfig_path.exists():
+        run(["buck2", "init"], cwd=workspace, env=env)
 
-    if not found_buck2:
-        if out_lines and out_lines[-1].strip():
-            out_lines.append("")
-        out_lines.append("[buck2]")
-        out_lines.append(f"file_watcher = {watcher}")
-        set_file_watcher = True
+    # We use the bundled toolchains/platforms under `buckal/config/*`, so
+    # remove any `buck2 init` scaffolding to avoid confusion.
+    for dirname in ("toolchains", "platforms"):
+        path = workspace / dirname
+        if path.exists():
+            shutil.rmtree(path, ignore_errors=True)
 
-    new_contents = "\n".join(out_lines)
-    if contents.endswith("\n"):
-        new_contents += "\n"
-    if new_contents != contents:
-        buckconfig_path.write_text(new_contents)
-        print(f"[ok] set buck2.file_watcher = {watcher} in {buckconfig_path}")
-        subprocess.run(["buck2", "kill"], cwd=workspace, env=env, check=False)
+    # Avoid inotify watcher limits on Linux by using the hash crawler watcher.
+    if sys.platform.startswith("linux"):
+        with REPORT.phase("buck2 file_watcher"):
+            ensure_buck2_file_watcher(workspace, "fs_hash_crawler")
 
 
 def commit_and_push_inplace(
@@ -291,6 +508,7 @@ def commit_and_push_inplace(
     print("Committed changes, pushing to origin/main...")
     git_run(["push", "--force-with-lease", "origin", "HEAD:main"], cwd=sample_dir, env=env)
     print("[ok] Pushed changes to origin/main")
+    print("[info] Follow the CI run with: just watch")
 
 
 def get_sample_dir(args: argparse.Namespace) -> Path:
@@ -334,48 +552,6 @@ def get_default_buck2_target(args: argparse.Namespace) -> str:
         return "//..."  # Fallback
 
 
-def patch_libra_openssl_sys_i686(workspace: Path) -> None:
-    """Inject i686 OpenSSL buildscript env for the libra sample workspace."""
-    buck_path = (
-        workspace
-        / "third-party"
-        / "rust"
-        / "crates"
-        / "openssl-sys"
-        / "0.9.111"
-        / "BUCK"
-    )
-    if not buck_path.exists():
-        print(f"[warn] openssl-sys BUCK not found at {buck_path}; skipping patch.")
-        return
-
-    contents = buck_path.read_text()
-    if "i686-unknown-linux-gnu" in contents and "OPENSSL_LIB_DIR" in contents:
-        print("[info] openssl-sys i686 env patch already present.")
-        return
-
-    marker = '    manifest_dir = ":openssl-sys-vendor",\n'
-    if marker not in contents:
-        print("[warn] openssl-sys buildscript_run marker not found; skipping patch.")
-        return
-
-    platform_block = (
-        "    platform = {\n"
-        '        "i686-unknown-linux-gnu": {\n'
-        "            \"env\": {\n"
-        '                "OPENSSL_LIB_DIR": "/usr/lib/i386-linux-gnu",\n'
-        '                "OPENSSL_INCLUDE_DIR": "/usr/include",\n'
-        '                "PKG_CONFIG_ALLOW_CROSS": "1",\n'
-        '                "PKG_CONFIG_PATH": "/usr/lib/i386-linux-gnu/pkgconfig:/usr/lib/pkgconfig",\n'
-        "            },\n"
-        "        },\n"
-        "    },\n"
-    )
-
-    buck_path.write_text(contents.replace(marker, marker + platform_block))
-    print("[ok] patched openssl-sys buildscript env for i686.")
-
-
 def cross_toml_contents(packages_with_arch: tuple[str, ...], packages_no_arch: tuple[str, ...]) -> str:
     packages: list[str] = [f"{pkg}:$CROSS_DEB_ARCH" for pkg in packages_with_arch]
     packages.extend(packages_no_arch)
@@ -421,21 +597,29 @@ def ensure_cross_toml(
     print(f"[ok] wrote Cross.toml at {cross_path}")
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description=__doc__)
+def build_parser() -> argparse.ArgumentParser:
+    # No abbreviations: strip_multi_target_args matches option names exactly.
+    parser = argparse.ArgumentParser(description=__doc__, allow_abbrev=False)
     parser.add_argument(
         "--target",
-        choices=[
-            "fd",
-            "libra",
-            "git-internal",
-            "cargo-buckal",
-            "rust_test_workspace",
-            "first_party_demo",
-        ],
-        default="fd",
+        choices=ALL_TARGETS,
         help="Test target to use (default: fd)",
     )
+    parser.add_argument(
+        "--targets",
+        help="comma-separated list of test targets to run in parallel (e.g. fd,libra)",
+    )
+    parser.add_argument(
+        "--all-targets",
+        action="store_true",
+        help="run every test target in parallel",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        help="number of targets to run concurrently; only valid with --targets/--all-targets "
+        "(default: min(#targets, #cpus))",
+    )
     parser.add_argument(
         "--inplace",
         action="store_true",
@@ -446,6 +630,66 @@ def main() -> None:
         action="store_true",
         help="keep the temporary workspace when not running inplace",
     )
+    parser.add_argument(
+        "--materialize",
+        choices=STRATEGIES,
+        default="auto",
+        help="how to create the temp workspace: reflink, hardlink farm (linked files share "
+        "their inode with the sample), git worktree (no ignored files or submodules) or copy "
+        "(default: auto, tries reflink then copy)",
+    )
+    parser.add_argument(
+        "--temp-root",
+        help="parent directory for temp workspaces (default: system temp dir); put it on the "
+        "same filesystem as the repo so reflink/hardlink materialization can work",
+    )
+    parser.add_argument(
+        "--workspace-cache",
+        metavar="DIR",
+        help="keep warm workspaces (including buck-out) in DIR, one per target/sample "
+        "HEAD/cargo-buckal HEAD/bundle HEAD, and re-sync them on later runs",
+    )
+    parser.add_argument(
+        "--workspace-cache-max-gb",
+        type=float,
+        default=20.0,
+        help="size cap for --workspace-cache; least recently used entries are evicted "
+        "(default: 20)",
+    )
+    parser.add_argument(
+        "--crate-store",
+        metavar="DIR",
+        help="hardlink vendored third-party crate files into a content-addressed store in DIR "
+        "shared by all workspaces (must be on the same filesystem as the workspaces)",
+    )
+    parser.add_argument(
+        "--crate-store-max-gb",
+        type=float,
+        default=10.0,
+        help="size cap for --crate-store; unreferenced objects are evicted (default: 10)",
+    )
+    parser.add_argument(
+        "--remote-cache",
+        metavar="DIR",
+        help="start a local bazel-remote cache storing in DIR and wire [buck2_re_client] to it, "
+        "so identical actions are reused across runs, targets and platforms",
+    )
+    parser.add_argument(
+        "--remote-cache-address",
+        metavar="URL",
+        help="use an already running remote cache (e.g. grpc://127.0.0.1:9092) instead",
+    )
+    parser.add_argument(
+        "--remote-cache-max-gb",
+        type=float,
+        default=20.0,
+        help="size cap for the --remote-cache server (default: 20)",
+    )
+    parser.add_argument(
+        "--remote-cache-force",
+        action="store_true",
+        help="use the remote cache even if no execution platform enables remote caching",
+    )
     parser.add_argument(
         "--buck2-target",
         help="Buck2 target to build (default: depends on target)",
@@ -460,6 +704,12 @@ def main() -> None:
         action="store_true",
         help="also build for additional target platforms",
     )
+    parser.add_argument(
+        "--multi-platform-jobs",
+        type=int,
+        help="number of --multi-platform builds to run concurrently against the same buck2 "
+        "daemon (default: all platforms at once; 1 builds them one after another)",
+    )
     parser.add_argument(
         "--test",
         action="store_true",
@@ -470,6 +720,26 @@ def main() -> None:
         default="//...",
         help="buck2 test target to run when --test is set (default: //...)",
     )
+    parser.add_argument(
+        "--test-shards",
+        type=int,
+        default=1,
+        help="split the test targets into N groups and run one buck2 test per group "
+        "concurrently (default: 1)",
+    )
+    parser.add_argument(
+        "--test-repeat",
+        type=int,
+        default=1,
+        help="run the tests N times and report tests that both pass and fail as flaky "
+        "(default: 1)",
+    )
+    parser.add_argument(
+        "--test-results",
+        metavar="DIR",
+        help="where to write junit.xml and tests.json "
+        "(default: log/harness/tests/<timestamp>_<target>)",
+    )
     parser.add_argument(
         "--no-fetch",
         action="store_true",
@@ -494,19 +764,61 @@ def main() -> None:
         action="store_true",
         help="use installed cargo-buckal instead of local dev version and skip local bundle copy",
     )
+    parser.add_argument(
+        "--verify-incremental",
+        action="store_true",
+        help="after migrate, re-run it as a no-op, after a probe Cargo.toml edit and after "
+        "restoring it, hashing all BUCK files to check that regeneration is incremental",
+    )
+    parser.add_argument(
+        "--report",
+        metavar="PATH",
+        help="write a JSON report with per-phase wall/CPU time, peak RSS and exit codes",
+    )
+    parser.add_argument(
+        "--profile-buildscripts",
+        action="store_true",
+        help="cold-build every buildscript_run target in an isolated buck2 daemon and rank the "
+        "build scripts by wall time and CPUs used against [buckal] num_jobs",
+    )
+    parser.add_argument(
+        "--graph-stats",
+        action="store_true",
+        help="after migrate, measure the generated graph (targets by kind, fan-out, select "
+        "branches, buck2 targets load time) with and without --supported-platform-only",
+    )
+    parser.add_argument(
+        "--no-event-log",
+        action="store_true",
+        help="don't run buck2 build/test with --event-log or add per-action timings, the "
+        "critical path and cache hits to the report",
+    )
     parser.add_argument(
         "--clean-buck2",
         action="store_true",
         help="clean existing Buck2/Buckal files before generating (like CI's clean_existing_buck2_and_buckal)",
     )
-    args = parser.parse_args()
+    return parser
+
+
+def prepare_env() -> dict[str, str]:
+    env = python_link_env(os.environ.copy())
+    # Fresh target dir prevents reusing a binary linked against another Python.
+    env.setdefault(
+        "CARGO_TARGET_DIR",
+        str(REPO_ROOT / "target" / "buckal-py"),
+    )
+    return env
+
+
+def run_single_target(args: argparse.Namespace) -> None:
 
     # Set default buck2 target based on test target if not specified
     if args.buck2_target is None:
         args.buck2_target = get_default_buck2_target(args)
 
     sample_dir = get_sample_dir(args)
-    
+
     if not CARGO_BUCKAL_MANIFEST.exists():
         sys.exit(f"Missing cargo-buckal manifest at {CARGO_BUCKAL_MANIFEST}")
     if not sample_dir.exists():
@@ -514,116 +826,163 @@ def main() -> None:
 
     if args.skip_build and (args.multi_platform or args.test):
         sys.exit("--skip-build is incompatible with --multi-platform/--test")
+    if args.workspace_cache and args.inplace:
+        sys.exit("--workspace-cache is incompatible with --inplace")
+    if (args.remote_cache or args.remote_cache_address) and args.inplace:
+        # The localhost [buck2_re_client] settings would be committed and pushed with the sample.
+        sys.exit("--remote-cache/--remote-cache-address are incompatible with --inplace")
+    if args.test_shards < 1 or args.test_repeat < 1:
+        sys.exit("--test-shards and --test-repeat must be at least 1")
 
     ensure_tool("cargo")
     ensure_tool("buck2")
     ensure_tool("python3")
     ensure_tool("git")
 
-    # Propagate Python ABI/library path for pyo3 so cargo-buckal can link & run.
-    env = os.environ.copy()
-    env["PYO3_PYTHON"] = sys.executable
-    # Fresh target dir prevents reusing a binary linked against another Python.
-    env.setdefault(
-        "CARGO_TARGET_DIR",
-        str(REPO_ROOT / "target" / "buckal-py"),
-    )
-
-    lib_dirs: list[str] = []
-    for key in ("LIBDIR", "LIBPL"):
-        value = sysconfig.get_config_var(key)
-        if value:
-            lib_dirs.append(value)
-    exe_dir = Path(sys.executable).parent
-    lib_dirs.append(str(exe_dir.parent / "lib"))
-    ld_var = "DYLD_LIBRARY_PATH" if sys.platform == "darwin" else "LD_LIBRARY_PATH"
-    existing = env.get(ld_var, "")
-    combined = ":".join([d for d in lib_dirs if d] + ([existing] if existing else []))
-    if combined:
-        env[ld_var] = combined
+    env = prepare_env()
 
     original_branch, inplace_branch = ensure_on_base_and_branch(args, env, sample_dir)
 
     workspace: Path
     temp_dir: Path | None = None
+    cleanup_workspace = None
+    workspace_cache: WorkspaceCache | None = None
+    cache_entry = None
+    REPORT.target = args.target
+    if args.workspace_cache:
+        workspace_cache = WorkspaceCache(
+            Path(args.workspace_cache).resolve(), int(args.workspace_cache_max_gb * 2**30)
+        )
+        flags = [
+            flag
+            for flag, enabled in (
+                ("--supported-platform-only", args.supported_platform_only),
+                ("--no-fetch", args.no_fetch),
+                ("--origin", args.origin),
+            )
+            if enabled
+        ]
+        parts = cache_key_parts(
+            args.target, sample_dir, CARGO_BUCKAL_MANIFEST.parent, BUCKAL_BUNDLES_DIR, flags
+        )
+        with REPORT.phase("materialize (cache)"):
+            cache_entry = workspace_cache.acquire(parts, sample_dir, args.materialize)
+        if cache_entry is None:
+            print("[warn] Cached workspace is in use by another run; using a temp workspace.")
+
     if args.inplace:
         workspace = sample_dir
         print(f"Running in-place in {workspace}")
     else:
-        temp_dir = Path(tempfile.mkdtemp(prefix=f"buckal-{args.target}-"))
-        workspace = temp_dir / args.target
-        shutil.copytree(sample_dir, workspace)
-        print(f"Copied sample workspace to {workspace}")
+        if cache_entry is not None:
+            workspace = cache_entry.workspace
+        else:
+            temp_dir = Path(tempfile.mkdtemp(prefix=f"buckal-{args.target}-", dir=args.temp_root))
+            with REPORT.phase("materialize"):
+                materialized = materialize_workspace(
+                    sample_dir, temp_dir / args.target, strategy=args.materialize
+                )
+            workspace = materialized.path
+            cleanup_workspace = materialized.cleanup
+            print(
+                f"[ok] Materialized sample workspace at {workspace} via {materialized.strategy} "
+                f"in {materialized.seconds:.2f}s"
+            )
         base_branch = get_base_branch(args.target) if is_git_target(args.target) else None
         if original_branch and base_branch and original_branch != base_branch:
             git_run(["checkout", original_branch], cwd=sample_dir, env=env)
 
+    # Cached and in-place workspaces keep their daemon warm for the next run.
+    daemon = Buck2Daemon(
+        workspace, env, keep_warm=args.inplace or cache_entry is not None, report=REPORT
+    )
+    cache_server: LocalCacheServer | None = None
+    remote_cache_address = args.remote_cache_address
+    remote_cache_phases: dict[str, object] = {}
+    action_phases: dict[str, object] = {}
+    with_event_log = not args.no_event_log
     try:
-        # Optionally clean existing Buck2/Buckal files (like CI's clean_existing_buck2_and_buckal)
-        if args.clean_buck2:
-            print("Cleaning existing Buck2/Buckal files...")
-            for filename in ("buckal.snap", ".buckconfig", ".buckroot", "BUCK"):
-                path = workspace / filename
-                if path.exists():
-                    path.unlink()
-            for dirname in ("third-party", "toolchains", "platforms"):
-                path = workspace / dirname
-                if path.exists():
-                    shutil.rmtree(path, ignore_errors=True)
-
-        buckconfig_path = workspace / ".buckconfig"
-        if not buckconfig_path.exists():
-            run(["buck2", "init"], cwd=workspace, env=env)
-
-        # We use the bundled toolchains/platforms under `buckal/config/*`, so
-        # remove any `buck2 init` scaffolding to avoid confusion.
-        for dirname in ("toolchains", "platforms"):
-            path = workspace / dirname
-            if path.exists():
-                shutil.rmtree(path, ignore_errors=True)
-
-        # Avoid inotify watcher limits on Linux by using the hash crawler watcher.
-        if sys.platform.startswith("linux"):
-            ensure_buck2_file_watcher(workspace, env, "fs_hash_crawler")
+        prepare_buck2_workspace(workspace, env, clean=args.clean_buck2)
 
         # Step 1: generate Buck2 files via cargo-buckal (initializes Buck2 if needed).
-        if args.origin:
-            migrate_cmd = ["cargo", "buckal", "migrate", "--buck2"]
-        else:
-            migrate_cmd = [
-                "cargo",
-                "run",
-                "--quiet",
-                "--manifest-path",
-                str(CARGO_BUCKAL_MANIFEST),
-                "--",
-                "buckal",
-                "migrate",
-                "--buck2",
-            ]
+        # The local dev binary is built (at most) once and exec'd directly.
+        buckal_cmd = cargo_buckal_cmd(CARGO_BUCKAL_MANIFEST, env, origin=args.origin)
+        migrate_cmd = [*buckal_cmd, "migrate", "--buck2"]
         if args.supported_platform_only:
             migrate_cmd.append("--supported-platform-only")
-        run(migrate_cmd, cwd=workspace, env=env)
+        run(migrate_cmd, cwd=workspace, env=env, phase="migrate")
+
+        if args.verify_incremental:
+            result = verify_incremental(
+                workspace, lambda phase: run(migrate_cmd, cwd=workspace, env=env, phase=phase)
+            )
+            REPORT.add_section("incremental", result)
+            if not result["ok"]:
+                sys.exit("--verify-incremental: migrate regeneration is not incremental")
 
         if not args.no_fetch:
-            if args.origin:
-                fetch_cmd = ["cargo", "buckal", "migrate", "--fetch"]
-            else:
-                fetch_cmd = [
-                    "cargo",
-                    "run",
-                    "--quiet",
-                    "--manifest-path",
-                    str(CARGO_BUCKAL_MANIFEST),
-                    "--",
-                    "buckal",
-                    "migrate",
-                    "--fetch",
-                ]
-            run(fetch_cmd, cwd=workspace, env=env)
+            run([*buckal_cmd, "migrate", "--fetch"], cwd=workspace, env=env, phase="fetch")
+
+        if args.graph_stats:
+            # Runs before crate patches: measuring the other variant re-migrates the workspace.
+            def migrate_variant(supported_platform_only: bool) -> None:
+                cmd = [*buckal_cmd, "migrate", "--buck2"]
+                if supported_platform_only:
+                    cmd.append("--supported-platform-only")
+                variant = "supported-platform-only" if supported_platform_only else "full"
+                run(cmd, cwd=workspace, env=env, phase=f"graph stats migrate ({variant})")
+
+            with REPORT.phase("graph stats"):
+                graph_stats = compare_platform_filtering(
+                    workspace,
+                    env,
+                    workspace / EVENT_LOG_DIR,
+                    args.supported_platform_only,
+                    migrate_variant,
+                )
+            print(format_graph_stats(graph_stats))
+            REPORT.add_section("graph", graph_stats)
+
+        with REPORT.phase("crate patches"):
+            patch_results = apply_crate_patches(workspace, args.target)
+        if patch_results:
+            REPORT.add_section("crate_patches", patch_results)
+
+        if args.crate_store:
+            store = CrateStore(
+                Path(args.crate_store).resolve(), int(args.crate_store_max_gb * 2**30)
+            )
+            with REPORT.phase("crate store"):
+                store_stats = store.link_workspace(workspace)
+            if store_stats is not None:
+                print(
+                    f"[ok] crate store: {store_stats.files} vendored files, "
+                    f"{store_stats.stored} new, {store_stats.linked + store_stats.already} shared "
+                    f"({store_stats.bytes_shared / 2**20:.1f} MiB) in {store_stats.seconds:.2f}s"
+                )
+                REPORT.add_section("crate_store", store_stats.as_dict())
+
+        if args.remote_cache or remote_cache_address:
+            with REPORT.phase("remote cache check"):
+                caching = platform_caching(workspace, env)
+            if not caching["enabled"] and not args.remote_cache_force:
+                warn_remote_cache_unused(caching)
+                REPORT.add_section("remote_cache", {"skipped": True, **caching})
+                remote_cache_address = None
+            elif args.remote_cache and not remote_cache_address:
+                cache_server = LocalCacheServer(
+                    Path(args.remote_cache).resolve(), args.remote_cache_max_gb
+                )
+                with REPORT.phase("remote cache startup"):
+                    try:
+                        remote_cache_address = cache_server.start()
+                    except RuntimeError as exc:
+                        sys.exit(str(exc))
+        if remote_cache_address:
+            if configure_remote_cache(workspace, remote_cache_address):
+                print(f"[ok] [buck2_re_client] points at {remote_cache_address}")
 
         if args.target == "libra":
-            patch_libra_openssl_sys_i686(workspace)
             ensure_cross_toml(
                 workspace,
                 packages_with_arch=("libssl-dev", "zlib1g-dev"),
@@ -636,61 +995,20 @@ def main() -> None:
                 packages_no_arch=("pkg-config",),
             )
 
-        # # Point the buckal cell to local bundled rules (vendored into the workspace)
-        # # to ensure os_deps/rust_test support.
-        # # Skip when --origin is set (use fetched bundles instead).
-        # if not args.origin:
-        #     bundle_src = (REPO_ROOT / "buckal-bundles").resolve()
-        #     bundle_dst = workspace / "buckal"
-        #     if bundle_dst.exists():
-        #         shutil.rmtree(bundle_dst)
-        #     shutil.copytree(bundle_src, bundle_dst)
-        # bundle_cell_path = "buckal"
-        # if buckconfig_path.exists():
-        #     sections: dict[str, list[str]] = {}
-        #     current = None
-        #     for line in buckconfig_path.read_text().splitlines():
-        #         if line.strip().startswith("[") and line.strip().endswith("]"):
-        #             current = line.strip()[1:-1]
-        #             sections.setdefault(current, [])
-        #         elif current:
-        #             sections[current].append(line)
-
-        #     out_lines: list[str] = []
-        #     out_lines += [
-        #         "[cells]",
-        #         "  root = .",
-        #         "  prelude = prelude",
-        #         f"  toolchains = {bundle_cell_path}/config/toolchains",
-        #         "  none = none",
-        #         f"  buckal = {bundle_cell_path}",
-        #         "",
-        #     ]
-
-        #     if "cell_aliases" in sections:
-        #         out_lines.append("[cell_aliases]")
-        #         out_lines += sections["cell_aliases"]
-        #         out_lines.append("")
-
-        #     out_lines += [
-        #         "[external_cells]",
-        #         "  prelude = bundled",
-        #         "",
-        #     ]
-
-        #     for key in ("parser", "build", "project", "buckal"):
-        #         if key in sections:
-        #             out_lines.append(f"[{key}]")
-        #             out_lines += sections[key]
-        #             out_lines.append("")
-
-        #     buckconfig_path.write_text("\n".join(out_lines).rstrip() + "\n")
-
         if not args.skip_build:
-            # Step 2: build with Buck2.
-            ensure_valid_buck2_daemon(workspace, env)
-            run(["buck2", "build", args.buck2_target], cwd=workspace, env=env)
+            # Step 2: build with Buck2. Every build/test step shares one daemon.
+            daemon.ensure()
+            log_args, event_log = event_log_args(workspace, "build", with_event_log)
+            run(
+                ["buck2", "build", args.buck2_target, *log_args],
+                cwd=workspace,
+                env=env,
+                phase="build",
+            )
             print("[ok] Buck2 build finished")
+            record_actions(workspace, env, "build", event_log, action_phases)
+            if remote_cache_address:
+                record_remote_cache_stats(workspace, env, "build", remote_cache_phases)
 
             # Step 2b: optionally build for additional target platforms.
             if args.multi_platform:
@@ -700,26 +1018,247 @@ def main() -> None:
                 use_cross = False
                 if use_cross:
                     print("[info] Using cross toolchain via *-cross platforms.")
-                ensure_valid_buck2_daemon(workspace, env)
-                for platform in multi_platform_targets(host, use_cross=use_cross):
-                    run(
-                        ["buck2", "build", args.buck2_target, "--target-platforms", platform],
-                        cwd=workspace,
-                        env=env,
+                platforms = multi_platform_targets(host, use_cross=use_cross)
+                platform_logs = {
+                    triple: event_log_args(
+                        workspace, f"build {triple.rsplit(':', 1)[-1]}", with_event_log
                     )
+                    for triple in platforms
+                }
+                with REPORT.phase("multi-platform build"):
+                    results = build_platforms(
+                        args.buck2_target,
+                        platforms,
+                        workspace,
+                        env,
+                        jobs=args.multi_platform_jobs or len(platforms),
+                        extra_args={p: log_args for p, (log_args, _) in platform_logs.items()},
+                    )
+                print_platform_table(results)
+                for triple, (_, event_log) in platform_logs.items():
+                    if event_log is not None and event_log.exists():
+                        record_actions(
+                            workspace, env, f"build {triple}", event_log, action_phases
+                        )
+                REPORT.add_section(
+                    "multi_platform",
+                    [
+                        {"platform": triple, "wall_s": elapsed, "exit_code": returncode}
+                        for triple, returncode, elapsed in results
+                    ],
+                )
+                failed = [triple for triple, returncode, _ in results if returncode != 0]
+                if failed:
+                    sys.exit(f"Buck2 multi-platform build failed for: {', '.join(failed)}")
                 print("[ok] Buck2 multi-platform builds finished")
 
             # Optional: run the test suite.
             if args.test:
-                ensure_valid_buck2_daemon(workspace, env)
-                run(["buck2", "test", args.buck2_test_target], cwd=workspace, env=env)
-                print("[ok] Buck2 tests finished")
+                daemon.ensure()
+                test_logs = run_tests(args, workspace, env, with_event_log, action_phases)
+                if remote_cache_address and test_logs:
+                    record_remote_cache_stats(
+                        workspace, env, "test", remote_cache_phases, event_logs=test_logs
+                    )
+
+        if args.profile_buildscripts:
+            with REPORT.phase("profile build scripts"):
+                profile = profile_buildscripts(
+                    workspace, env, workspace / EVENT_LOG_DIR / "buildscripts.json-lines"
+                )
+            print(format_profile(profile))
+            REPORT.add_section("buildscripts", profile)
 
         commit_and_push_inplace(args, env, sample_dir, inplace_branch)
     finally:
+        daemon.shutdown()
+        REPORT.add_section("daemon", daemon.metrics())
+        if cache_server:
+            cache_server.stop()
+        if action_phases:
+            REPORT.add_section("actions", action_phases)
+        if remote_cache_address:
+            REPORT.add_section(
+                "remote_cache", {"address": remote_cache_address, "phases": remote_cache_phases}
+            )
+        if workspace_cache and cache_entry:
+            workspace_cache.release(cache_entry)
         if temp_dir and not args.keep_temp:
+            if cleanup_workspace:
+                cleanup_workspace()
             shutil.rmtree(temp_dir, ignore_errors=True)
             print(f"Removed temporary workspace {temp_dir}")
+        print()
+        print(REPORT.summary_table())
+        if args.report:
+            REPORT.write(Path(args.report))
+
+
+def strip_multi_target_args(argv: list[str]) -> list[str]:
+    """Drop the multi-target options from argv so the rest can be forwarded per target."""
+    forwarded: list[str] = []
+    skip_value = False
+    for arg in argv:
+        if skip_value:
+            skip_value = False
+            continue
+        name = arg.split("=", 1)[0]
+        if name in MULTI_TARGET_OPTIONS:
+            skip_value = MULTI_TARGET_OPTIONS[name] and "=" not in arg
+            continue
+        forwarded.append(arg)
+    return forwarded
+
+
+def resolve_path_args(argv: list[str]) -> list[str]:
+    """Make the values of FORWARDED_PATH_OPTIONS in argv absolute."""
+    resolved: list[str] = []
+    path_value = False
+    for arg in argv:
+        name, sep, value = arg.partition("=")
+        if path_value:
+            arg = str(Path(arg).resolve())
+        elif sep and name in FORWARDED_PATH_OPTIONS:
+            arg = f"{name}={Path(value).resolve()}"
+        path_value = not sep and not path_value and arg in FORWARDED_PATH_OPTIONS
+        resolved.append(arg)
+    return resolved
+
+
+def selected_targets(args: argparse.Namespace) -> list[str]:
+    if args.all_targets:
+        return list(ALL_TARGETS)
+    targets: list[str] = []
+    for name in args.targets.split(","):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in ALL_TARGETS:
+            sys.exit(f"Unknown target in --targets: {name}. Choose from {', '.join(ALL_TARGETS)}.")
+        if name not in targets:
+            targets.append(name)
+    if not targets:
+        sys.exit("--targets requires at least one target")
+    return targets
+
+
+def run_target_process(
+    target: str,
+    child_argv: list[str],
+    log_dir: Path,
+    env: dict[str, str],
+    test_results: Path | None = None,
+) -> tuple[str, int, float, Path]:
+    """Run the harness for one target in a child process, capturing its output to a log file."""
+    log_path = log_dir / f"{target}.log"
+    report_path = log_dir / f"{target}.json"
+    cmd = [
+        sys.executable,
+        str(Path(__file__).resolve()),
+        "--target",
+        target,
+        "--report",
+        str(report_path),
+        *child_argv,
+    ]
+    if test_results is not None:
+        cmd += ["--test-results", str(test_results / target)]
+    print(f"[info] {target}: started (log: {log_path})", flush=True)
+    start = time.monotonic()
+    with log_path.open("w", encoding="utf-8") as log_fp:
+        returncode = subprocess.run(
+            cmd, cwd=REPO_ROOT, env=env, stdout=log_fp, stderr=subprocess.STDOUT
+        ).returncode
+    elapsed = time.monotonic() - start
+    status = "ok" if returncode == 0 else f"failed (exit {returncode})"
+    print(f"[info] {target}: {status} after {elapsed:.1f}s", flush=True)
+    return target, returncode, elapsed, log_path
+
+
+def print_target_table(results: list[tuple[str, int, float, Path]]) -> None:
+    width = max(len("target"), *(len(target) for target, *_ in results))
+    print()
+    print(f"{'target':<{width}}  {'result':<6}  {'time':>8}  log")
+    for target, returncode, elapsed, log_path in results:
+        result = "pass" if returncode == 0 else "FAIL"
+        print(f"{target:<{width}}  {result:<6}  {elapsed:>7.1f}s  {log_path}")
+
+
+def run_multi_target(args: argparse.Namespace, argv: list[str]) -> None:
+    targets = selected_targets(args)
+    if args.target is not None:
+        sys.exit("--target cannot be combined with --targets/--all-targets")
+    if args.buck2_target and len(targets) > 1:
+        sys.exit("--buck2-target is target specific; run it with a single --target")
+    if args.inplace_branch and len(targets) > 1:
+        sys.exit("--inplace-branch is target specific; run it with a single --target")
+    if args.jobs is None:
+        args.jobs = min(len(targets), os.cpu_count() or 1)
+    if args.jobs < 1:
+        sys.exit("--jobs must be at least 1")
+    if not CARGO_BUCKAL_MANIFEST.exists():
+        sys.exit(f"Missing cargo-buckal manifest at {CARGO_BUCKAL_MANIFEST}")
+    ensure_tool("cargo")
+
+    env = prepare_env()
+    env["PYTHONUNBUFFERED"] = "1"
+    # Resolve cargo-buckal once up front; the binary path is handed to every
+    # worker via the environment, so none of them touches cargo's
+    # CARGO_TARGET_DIR lock.
+    if not args.origin:
+        cargo_buckal_cmd(CARGO_BUCKAL_MANIFEST, env)
+
+    log_dir = HARNESS_LOG_DIR / datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    log_dir.mkdir(parents=True, exist_ok=True)
+    child_argv = resolve_path_args(strip_multi_target_args(argv))
+    test_results = Path(args.test_results).resolve() if args.test_results else None
+    jobs = min(args.jobs, len(targets))
+    print(f"[info] Running {len(targets)} targets with {jobs} workers: {', '.join(targets)}")
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [
+            pool.submit(run_target_process, target, child_argv, log_dir, env, test_results)
+            for target in targets
+        ]
+        results = [future.result() for future in futures]
+    print_target_table(results)
+    print(f"\nTotal wall time: {time.monotonic() - start:.1f}s")
+
+    if args.report:
+        combined: dict[str, object] = {}
+        for target, returncode, elapsed, log_path in results:
+            report_path = log_path.with_suffix(".json")
+            try:
+                child = json.loads(report_path.read_text())
+            except (OSError, ValueError):
+                child = None
+            combined[target] = {
+                "exit_code": returncode,
+                "wall_s": elapsed,
+                "log": str(log_path),
+                "report": child,
+            }
+        Path(args.report).write_text(json.dumps({"targets": combined}, indent=2) + "\n")
+        print(f"[ok] wrote combined run report to {args.report}")
+
+    failed = [target for target, returncode, _, _ in results if returncode != 0]
+    if failed:
+        sys.exit(f"{len(failed)} of {len(results)} targets failed: {', '.join(failed)}")
+
+
+def main() -> None:
+    parser = build_parser()
+    argv = sys.argv[1:]
+    args = parser.parse_args(argv)
+    if args.targets or args.all_targets:
+        run_multi_target(args, argv)
+        return
+    if args.jobs is not None:
+        sys.exit("--jobs only applies to --targets/--all-targets")
+    if args.target is None:
+        args.target = "fd"
+    run_single_target(args)
 
 
 if __name__ == "__main__":
@@ -0,0 +1 @@
+"""Helpers for test/buckal_fd_build.py, split out by concern."""
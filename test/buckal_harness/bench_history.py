@@ -0,0 +1,123 @@
+"""
+The local benchmark JSON history file and baseline comparison.
+
+History is a JSON list of runs, newest last:
+
+    [{"timestamp": ..., "target": "fd", "kind": "bench",
+      "cargo_buckal_head": ..., "sample_head": ..., "host": ...,
+      "scenarios": {"noop_migrate": {"n": 5, "median": 0.41, "p95": 0.47, ...}}}]
+
+The baseline file maps host -> target -> scenario -> stats and is only written
+on request (`--save-baseline`), so regressions are always judged against a
+deliberately chosen reference rather than the previous run. The host key
+(`host_key()`) covers hostname, OS/arch, CPU count and kernel release; a run
+is only compared against a baseline recorded under the same key, since
+timings from another machine say nothing about a regression.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import platform
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+
+def host_id() -> str:
+    return f"{platform.node()}/{platform.system().lower()}-{platform.machine()}"
+
+
+def host_key() -> str:
+    """Which baseline a run may be compared with: host_id plus CPU count and kernel."""
+    return f"{host_id()}/{os.cpu_count() or 0}cpu/{platform.release()}"
+
+
+def load_json(path: Path, default: Any) -> Any:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return default
+
+
+def append_history(path: Path, entry: dict[str, Any]) -> None:
+    history = load_json(path, [])
+    if not isinstance(history, list):
+        history = []
+    entry.setdefault("timestamp", datetime.now().isoformat(timespec="seconds"))
+    entry.setdefault("host", host_id())
+    history.append(entry)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(history, indent=2) + "\n")
+
+
+def save_baseline(path: Path, target: str, scenarios: dict[str, dict[str, Any]]) -> None:
+    baseline = load_json(path, {})
+    if not isinstance(baseline, dict):
+        baseline = {}
+    # Entries from before baselines were keyed by host have no "/" in their key.
+    baseline = {key: value for key, value in baseline.items() if "/" in key}
+    baseline.setdefault(host_key(), {})[target] = {
+        name: {key: stats[key] for key in ("n", "median", "p95")}
+        for name, stats in scenarios.items()
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(baseline, indent=2) + "\n")
+
+
+def find_regressions(
+    baseline_path: Path, target: str, scenarios: dict[str, dict[str, Any]], threshold: float
+) -> list[str] | None:
+    """Describe every scenario whose median is more than `threshold` slower than baseline.
+
+    Returns None if no baseline for `target` was recorded on this host (see host_key).
+    """
+    baseline = load_json(baseline_path, {})
+    if not isinstance(baseline, dict):
+        return None
+    baseline = baseline.get(host_key(), {}).get(target)
+    if not baseline:
+        return None
+    regressions: list[str] = []
+    for name, stats in scenarios.items():
+        reference = baseline.get(name)
+        if not reference or not reference.get("median"):
+            continue
+        ratio = stats["median"] / reference["median"]
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{target}/{name}: median {stats['median']:.2f}s vs baseline "
+                f"{reference['median']:.2f}s (+{(ratio - 1) * 100:.0f}%)"
+            )
+    return regressions
+
+
+def format_table(target: str, scenarios: dict[str, dict[str, Any]]) -> str:
+    width = max(len("scenario"), *(len(name) for name in scenarios)) if scenarios else 8
+    lines = [f"[{target}]", f"{'scenario':<{width}}  {'n':>3}  {'median':>9}  {'p95':>9}"]
+    for name, stats in scenarios.items():
+        lines.append(
+            f"{name:<{width}}  {stats['n']:>3}  {stats['median']:>8.2f}s  {stats['p95']:>8.2f}s"
+        )
+    return "\n".join(lines)
+
+
+def format_comparison(target: str, scenarios: dict[str, dict[str, Any]]) -> str:
+    """cargo vs buck2 medians per scenario from `<tool>_<scenario>` keys."""
+    names = list(dict.fromkeys(key.split("_", 1)[1] for key in scenarios))
+    width = max(len("scenario"), *(len(name) for name in names)) if names else 8
+    lines = [
+        f"[{target}]",
+        f"{'scenario':<{width}}  {'cargo':>9}  {'buck2':>9}  {'speedup':>8}",
+    ]
+    for name in names:
+        cargo, buck2 = scenarios.get(f"cargo_{name}"), scenarios.get(f"buck2_{name}")
+        cells = [f"{s['median']:>8.2f}s" if s else f"{'-':>9}" for s in (cargo, buck2)]
+        speedup = (
+            f"{cargo['median'] / buck2['median']:>7.2f}x"
+            if cargo and buck2 and buck2["median"]
+            else f"{'-':>8}"
+        )
+        lines.append(f"{name:<{width}}  {cells[0]}  {cells[1]}  {speedup}")
+    return "\n".join(lines)
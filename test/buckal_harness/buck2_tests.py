@@ -0,0 +1,331 @@
+"""
+Sharded `buck2 test` runs with per-test results.
+
+Instead of one opaque `buck2 test //...`, the harness:
+
+1. lists the test targets under the pattern with one `buck2 uquery`,
+2. splits them round-robin into `--test-shards` groups and runs one
+   `buck2 test --skip-incompatible-targets` per group concurrently against
+   the workspace's daemon (explicit labels, unlike `//...`, would otherwise
+   fail when incompatible with the target platform),
+3. repeats the whole run `--test-repeat` times, and
+4. reads every test's status and duration from each shard's event log
+   (`TestResult` events), falling back to buck2's console lines
+   (`✓ Pass: <name> (0.1s)`) when the log has none.
+
+A test that passes in some repeats and fails in others is reported as flaky;
+one that fails in every repeat is a failure. Results are written as JUnit
+XML and JSON.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import statistics
+import subprocess
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterator
+
+from buckal_harness.event_log import duration_s
+
+TEST_QUERY = "kind('.*_test', {pattern})"
+SLOWEST_N = 15
+
+# buck2_data.TestStatus
+TEST_STATUSES = {
+    1: "pass",
+    2: "fail",
+    3: "skip",
+    4: "omitted",
+    5: "fatal",
+    6: "timeout",
+    7: "unknown",
+    8: "rerun",
+    9: "listing_success",
+    10: "listing_failed",
+}
+FAILED_STATUSES = frozenset({"fail", "fatal", "timeout", "listing_failed"})
+IGNORED_STATUSES = frozenset({"listing_success", "rerun", "unknown", "not_set"})
+CONSOLE_RE = re.compile(
+    r"^\s*(?:[✓✗↻⏭]\s+)?"
+    r"(?P<status>Pass|Fail|Skip|Omitted|Fatal|Timeout|Listing (?:success|failed))"
+    r": (?P<name>.+?)(?: \((?P<secs>\d+(?:\.\d+)?)s\))?\s*$"
+)
+
+
+@dataclass
+class TestCase:
+    name: str
+    target: str
+    status: str
+    duration_s: float | None = None
+    message: str | None = None
+
+
+@dataclass
+class ShardRun:
+    repeat: int
+    shard: int
+    targets: list[str]
+    returncode: int
+    wall_s: float
+    cases: list[TestCase] = field(default_factory=list)
+
+
+def find_test_targets(workspace: Path, env: dict[str, str], pattern: str) -> list[str]:
+    result = subprocess.run(
+        ["buck2", "uquery", TEST_QUERY.format(pattern=pattern)],
+        cwd=workspace,
+        env=env,
+        text=True,
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    return sorted({line.strip() for line in result.stdout.splitlines() if line.strip()})
+
+
+def split_shards(targets: list[str], shards: int) -> list[list[str]]:
+    groups: list[list[str]] = [[] for _ in range(max(1, min(shards, len(targets))))]
+    for index, target in enumerate(targets):
+        groups[index % len(groups)].append(target)
+    return groups
+
+
+def test_status(value: Any) -> str:
+    if isinstance(value, int):
+        return TEST_STATUSES.get(value, str(value))
+    return str(value or "unknown").lower()
+
+
+def label_of(value: Any) -> str:
+    if isinstance(value, dict):
+        label = value.get("label", value)
+        if isinstance(label, dict) and "package" in label:
+            return f"{label['package']}:{label.get('name', '')}"
+    return str(value or "")
+
+
+def iter_event_results(path: Path) -> Iterator[TestCase]:
+    with path.open(encoding="utf-8", errors="replace") as fp:
+        for line in fp:
+            if '"TestResult"' not in line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            event = record.get("Event", record) if isinstance(record, dict) else None
+            data = event.get("data") if isinstance(event, dict) else None
+            instant = data.get("Instant") if isinstance(data, dict) else None
+            payload = instant.get("data") if isinstance(instant, dict) else None
+            result = payload.get("TestResult") if isinstance(payload, dict) else None
+            if not isinstance(result, dict):
+                continue
+            status = test_status(result.get("status"))
+            if status in IGNORED_STATUSES:
+                continue
+            yield TestCase(
+                name=str(result.get("name", "?")),
+                target=label_of(result.get("target_label")),
+                status=status,
+                duration_s=duration_s(result.get("duration")),
+                message=result.get("msg") or None,
+            )
+
+
+def parse_console(output: str) -> list[TestCase]:
+    cases = []
+    for line in output.splitlines():
+        match = CONSOLE_RE.match(line)
+        if not match:
+            continue
+        status = match.group("status").lower().replace(" ", "_")
+        if status in IGNORED_STATUSES:
+            continue
+        name = match.group("name")
+        cases.append(
+            TestCase(
+                name=name,
+                target=name.split(" - ", 1)[0],
+                status=status,
+                duration_s=float(match.group("secs")) if match.group("secs") else None,
+            )
+        )
+    return cases
+
+
+def run_shard(
+    workspace: Path,
+    env: dict[str, str],
+    repeat: int,
+    shard: int,
+    targets: list[str],
+    event_log: Path,
+) -> tuple[ShardRun, str]:
+    event_log.unlink(missing_ok=True)
+    cmd = ["buck2", "test", "--skip-incompatible-targets", *targets, "--event-log", str(event_log)]
+    start = time.monotonic()
+    result = subprocess.run(
+        cmd, cwd=workspace, env=env, text=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+    )
+    run = ShardRun(repeat, shard, targets, result.returncode, time.monotonic() - start)
+    try:
+        run.cases = list(iter_event_results(event_log))
+    except OSError:
+        run.cases = []
+    if not run.cases:
+        run.cases = parse_console(result.stdout)
+    return run, result.stdout
+
+
+def run_sharded_tests(
+    workspace: Path,
+    env: dict[str, str],
+    targets: list[str],
+    shards: int,
+    repeat: int,
+    event_dir: Path,
+) -> list[ShardRun]:
+    """Run every repeat's shards concurrently; returns one ShardRun per shard and repeat."""
+    groups = split_shards(targets, shards)
+    event_dir.mkdir(parents=True, exist_ok=True)
+    runs: list[ShardRun] = []
+    for rep in range(1, repeat + 1):
+        print(f"[info] test run {rep}/{repeat}: {len(targets)} targets in {len(groups)} shards")
+        with ThreadPoolExecutor(max_workers=len(groups)) as pool:
+            futures = [
+                pool.submit(
+                    run_shard,
+                    workspace,
+                    env,
+                    rep,
+                    index,
+                    group,
+                    event_dir / f"test-r{rep}-s{index}.json-lines",
+                )
+                for index, group in enumerate(groups, start=1)
+            ]
+            for future in futures:
+                run, output = future.result()
+                status = "ok" if run.returncode == 0 else f"failed (exit {run.returncode})"
+                print(f"----- shard {run.shard} run {rep}: {status} after {run.wall_s:.1f}s -----")
+                if output:
+                    print(output.rstrip())
+                runs.append(run)
+    return runs
+
+
+def aggregate(runs: list[ShardRun]) -> list[dict[str, Any]]:
+    """One entry per test across repeats, with its statuses, durations and verdict."""
+    tests: dict[tuple[str, str], dict[str, Any]] = {}
+    for run in runs:
+        for case in run.cases:
+            entry = tests.setdefault(
+                (case.target, case.name),
+                {"target": case.target, "name": case.name, "statuses": [], "durations": []},
+            )
+            entry["statuses"].append(case.status)
+            if case.duration_s is not None:
+                entry["durations"].append(round(case.duration_s, 3))
+            if case.message and case.status in FAILED_STATUSES:
+                entry["message"] = case.message
+    for entry in tests.values():
+        failed = [status in FAILED_STATUSES for status in entry["statuses"]]
+        if any(failed):
+            entry["verdict"] = "fail" if all(failed) else "flaky"
+        elif all(status == "skip" for status in entry["statuses"]):
+            entry["verdict"] = "skip"
+        else:
+            entry["verdict"] = "pass"
+        entry["median_s"] = statistics.median(entry["durations"]) if entry["durations"] else None
+    return sorted(tests.values(), key=lambda e: (e["target"], e["name"]))
+
+
+def summarize_tests(runs: list[ShardRun], tests: list[dict[str, Any]]) -> dict[str, Any]:
+    verdicts: dict[str, int] = {}
+    for entry in tests:
+        verdicts[entry["verdict"]] = verdicts.get(entry["verdict"], 0) + 1
+    timed = [entry for entry in tests if entry["median_s"] is not None]
+    return {
+        "tests": len(tests),
+        "verdicts": verdicts,
+        "slowest": sorted(timed, key=lambda e: e["median_s"], reverse=True)[:SLOWEST_N],
+        "flaky": [entry for entry in tests if entry["verdict"] == "flaky"],
+        "failed": [entry for entry in tests if entry["verdict"] == "fail"],
+        "shards": [
+            {
+                "repeat": run.repeat,
+                "shard": run.shard,
+                "targets": len(run.targets),
+                "exit_code": run.returncode,
+                "wall_s": round(run.wall_s, 3),
+                "results": len(run.cases),
+            }
+            for run in runs
+        ],
+    }
+
+
+def unexplained_failures(runs: list[ShardRun]) -> list[ShardRun]:
+    """Shard runs that exited non-zero without reporting a failed test (e.g. build errors)."""
+    return [
+        run
+        for run in runs
+        if run.returncode != 0 and not any(case.status in FAILED_STATUSES for case in run.cases)
+    ]
+
+
+def write_junit(path: Path, tests: list[dict[str, Any]], suite_name: str) -> None:
+    suites = ET.Element("testsuites", name=suite_name)
+    by_target: dict[str, list[dict[str, Any]]] = {}
+    for entry in tests:
+        by_target.setdefault(entry["target"], []).append(entry)
+    for target, entries in by_target.items():
+        suite = ET.SubElement(
+            suites,
+            "testsuite",
+            name=target,
+            tests=str(len(entries)),
+            failures=str(sum(e["verdict"] == "fail" for e in entries)),
+            skipped=str(sum(e["verdict"] == "skip" for e in entries)),
+            time=f"{sum(e['median_s'] or 0 for e in entries):.3f}",
+        )
+        for entry in entries:
+            case = ET.SubElement(
+                suite,
+                "testcase",
+                name=entry["name"],
+                classname=target,
+                time=f"{entry['median_s'] or 0:.3f}",
+            )
+            if entry["verdict"] == "fail":
+                failure = ET.SubElement(case, "failure", message="failed in every run")
+                failure.text = entry.get("message") or ""
+            elif entry["verdict"] == "skip":
+                ET.SubElement(case, "skipped")
+            elif entry["verdict"] == "flaky":
+                ET.SubElement(case, "properties").append(
+                    ET.Element("property", name="flaky", value=",".join(entry["statuses"]))
+                )
+    ET.indent(suites)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    ET.ElementTree(suites).write(path, encoding="utf-8", xml_declaration=True)
+
+
+def format_test_summary(summary: dict[str, Any], rows: int = 10) -> str:
+    verdicts = ", ".join(f"{count} {name}" for name, count in sorted(summary["verdicts"].items()))
+    lines = [f"[info] {summary['tests']} tests: {verdicts or 'no results parsed'}"]
+    if summary["slowest"]:
+        lines.append("  slowest tests (median):")
+        for entry in summary["slowest"][:rows]:
+            lines.append(f"    {entry['median_s']:>7.2f}s  {entry['name']}")
+    for entry in summary["flaky"]:
+        lines.append(f"[warn] flaky: {entry['name']} ({', '.join(entry['statuses'])})")
+    for entry in summary["failed"]:
+        lines.append(f"[warn] failed: {entry['name']}")
+    return "\n".join(lines)
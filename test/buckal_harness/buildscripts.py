@@ -0,0 +1,130 @@
+"""
+Cold-build profile of every build script in the generated graph.
+
+`--profile-buildscripts` finds all `buildscript_run` targets with one
+`buck2 uquery`, then builds exactly those targets from scratch under a
+separate `--isolation-dir`, so the workspace's own daemon and buck-out stay
+warm and no cached result hides a build script. The event log of that build
+gives each build script's wall time and, where buck2 records it, the CPU time
+of its command. CPU time divided by wall time is the number of CPUs the
+script actually kept busy; comparing it with `[buckal] num_jobs` (NUM_JOBS for
+the scripts, default: all CPUs) shows which scripts ignore NUM_JOBS, which
+are serial, and whether num_jobs is worth tuning.
+
+All build scripts run in one build, as in a normal cold build, so their
+timings include contention with each other and with rustc actions.
+"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import time
+from pathlib import Path
+from typing import Any
+
+from buckal_harness.event_log import iter_actions
+from buckconfig import BuckConfig
+
+BUILDSCRIPT_QUERY = "kind('buildscript_run|cargo_buildscript', //...)"
+ISOLATION_DIR = "buckal-buildscripts"
+
+
+def find_buildscript_targets(workspace: Path, env: dict[str, str]) -> list[str]:
+    result = subprocess.run(
+        ["buck2", "uquery", BUILDSCRIPT_QUERY],
+        cwd=workspace,
+        env=env,
+        text=True,
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    return sorted({line.strip() for line in result.stdout.splitlines() if line.strip()})
+
+
+def configured_num_jobs(workspace: Path) -> int:
+    """`[buckal] num_jobs` from .buckconfig(.local); the bundle defaults it to the CPU count."""
+    value = None
+    for name in (".buckconfig", ".buckconfig.local"):
+        value = BuckConfig.load(workspace / name).get("buckal", "num_jobs", value)
+    try:
+        return int(value) if value else os.cpu_count() or 1
+    except ValueError:
+        return os.cpu_count() or 1
+
+
+def strip_cell(label: str) -> str:
+    return label.split("//", 1)[-1] if "//" in label else label
+
+
+def profile_buildscripts(
+    workspace: Path, env: dict[str, str], event_log: Path
+) -> dict[str, Any]:
+    """Cold-build all build scripts in an isolated daemon and rank them by wall time."""
+    targets = find_buildscript_targets(workspace, env)
+    num_jobs = configured_num_jobs(workspace)
+    profile: dict[str, Any] = {"num_jobs": num_jobs, "targets": len(targets), "scripts": []}
+    if not targets:
+        return profile
+
+    isolated = ["buck2", "--isolation-dir", ISOLATION_DIR]
+    subprocess.run([*isolated, "clean"], cwd=workspace, env=env, check=False)
+    event_log.parent.mkdir(parents=True, exist_ok=True)
+    event_log.unlink(missing_ok=True)
+    cmd = [*isolated, "build", *targets, "--event-log", str(event_log)]
+    print(f"+ {' '.join(cmd[:4])} <{len(targets)} build scripts> --event-log {event_log}")
+    start = time.monotonic()
+    try:
+        result = subprocess.run(cmd, cwd=workspace, env=env, check=False)
+    finally:
+        profile["wall_s"] = round(time.monotonic() - start, 3)
+        subprocess.run([*isolated, "kill"], cwd=workspace, env=env, check=False)
+    profile["exit_code"] = result.returncode
+
+    wanted = {strip_cell(target) for target in targets}
+    scripts = []
+    for action in iter_actions(event_log):
+        if not action.is_buildscript and strip_cell(action.label) not in wanted:
+            continue
+        cpus = action.cpu_s / action.wall_s if action.cpu_s is not None and action.wall_s else None
+        scripts.append(
+            {
+                "label": action.label,
+                "wall_s": round(action.wall_s, 3),
+                "cpu_s": None if action.cpu_s is None else round(action.cpu_s, 3),
+                "cpus_used": None if cpus is None else round(cpus, 2),
+                "num_jobs_utilization": None if cpus is None else round(cpus / num_jobs, 3),
+                "queue_s": action.queue_s,
+                "kind": action.kind,
+                "failed": action.failed,
+            }
+        )
+    scripts.sort(key=lambda script: script["wall_s"], reverse=True)
+    profile["scripts"] = scripts
+    profile["total_wall_s"] = round(sum(script["wall_s"] for script in scripts), 3)
+    return profile
+
+
+def format_profile(profile: dict[str, Any], rows: int = 20) -> str:
+    scripts = profile["scripts"]
+    if not scripts:
+        return f"[info] no build script actions found ({profile['targets']} buildscript targets)"
+    width = max(len("build script"), *(len(s["label"]) for s in scripts[:rows]))
+    lines = [
+        f"[info] {len(scripts)} build scripts, {profile['total_wall_s']:.1f}s total, "
+        f"num_jobs={profile['num_jobs']}",
+        f"{'build script':<{width}}  {'wall':>8}  {'cpu':>8}  {'cpus':>5}  {'of jobs':>7}",
+    ]
+    for script in scripts[:rows]:
+        cpu = "-" if script["cpu_s"] is None else f"{script['cpu_s']:.1f}s"
+        cpus = "-" if script["cpus_used"] is None else f"{script['cpus_used']:.1f}"
+        share = (
+            "-"
+            if script["num_jobs_utilization"] is None
+            else f"{script['num_jobs_utilization']:.0%}"
+        )
+        wall = f"{script['wall_s']:.1f}s"
+        lines.append(f"{script['label']:<{width}}  {wall:>8}  {cpu:>8}  {cpus:>5}  {share:>7}")
+    if len(scripts) > rows:
+        lines.append(f"... {len(scripts) - rows} more in the report")
+    return "\n".join(lines)
@@ -0,0 +1,281 @@
+"""
+Content-addressed store for vendored crate sources shared by all workspaces.
+
+fd, libra, git-internal and cargo-buckal vendor many of the same crates under
+`third-party/rust/crates/<crate>/<version>/`. With `--crate-store DIR` every
+regular file in those directories (except the files cargo-buckal or the
+harness rewrite, see workspace.COW_FILE_NAMES) is replaced by a hardlink to
+`DIR/objects/<sha256[:2]>/<sha256>[.x]`, so each distinct file is stored once
+across every sample, temp workspace and cached workspace.
+
+- A file already linked to the store is recognised by its inode (read from the
+  store's directory entries, no stat per object) and not hashed again.
+- New objects are added with link/rename, so concurrent multi-target runs can
+  share one store.
+- Objects are read-only (0444, or 0555 when executable): one inode is shared
+  by every workspace, so a tool that rewrites a vendored file in place fails
+  instead of corrupting the object for all later runs.
+- `DIR/index.json` records each object's size, mtime and last use. An object
+  whose size or mtime no longer matches (written despite the mode, e.g. by
+  root) is dropped from the store instead of being linked again.
+- The store must be on the same filesystem as the workspaces; otherwise
+  linking is skipped with a warning.
+- Objects no workspace links to any more are removed least recently used
+  first (by the index's last use, not atime) once the store exceeds its size
+  cap.
+"""
+
+from __future__ import annotations
+
+import errno
+import hashlib
+import json
+import os
+import shutil
+import stat
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO
+
+try:
+    import fcntl
+except ImportError:  # Windows: no locking, runs sharing a store must not overlap.
+    fcntl = None  # type: ignore[assignment]
+
+from buckal_harness.patches import CRATES_DIR
+from buckal_harness.workspace import COW_FILE_NAMES
+
+OBJECTS_DIR = "objects"
+INDEX_FILE = "index.json"
+
+
+@dataclass
+class LinkStats:
+    files: int = 0
+    linked: int = 0  # replaced by a link to an existing object
+    stored: int = 0  # new objects added to the store
+    already: int = 0  # already linked on a previous run
+    skipped: int = 0
+    corrupted: int = 0  # objects modified after they were stored, dropped
+    bytes_shared: int = 0
+    seconds: float = 0.0
+
+    def as_dict(self) -> dict[str, float]:
+        return {
+            "files": self.files,
+            "linked": self.linked,
+            "stored": self.stored,
+            "already_linked": self.already,
+            "skipped": self.skipped,
+            "corrupted": self.corrupted,
+            "bytes_shared": self.bytes_shared,
+            "seconds": round(self.seconds, 3),
+        }
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CrateStore:
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        self.root = root
+        self.objects = root / OBJECTS_DIR
+        self.max_bytes = max_bytes
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.device = os.stat(self.objects).st_dev
+        self._inodes: dict[int, str] | None = None
+        self._index: dict[str, dict[str, float]] = {}
+        self._used: dict[str, dict[str, float]] = {}
+        self._dropped: set[str] = set()
+
+    def object_path(self, digest: str, executable: bool) -> Path:
+        return self.objects / digest[:2] / (digest + (".x" if executable else ""))
+
+    def inodes(self) -> dict[int, str]:
+        """Inode -> object name; DirEntry.inode() comes from readdir, not stat."""
+        if self._inodes is None:
+            self._inodes = {}
+            for bucket in os.scandir(self.objects):
+                if bucket.is_dir(follow_symlinks=False):
+                    for entry in os.scandir(bucket.path):
+                        if not entry.name.startswith("."):
+                            self._inodes[entry.inode()] = entry.name
+        return self._inodes
+
+    # -- index -------------------------------------------------------------
+
+    def _locked_index(self) -> tuple[IO[bytes], dict[str, dict[str, float]]]:
+        lock = (self.root / f"{INDEX_FILE}.lock").open("ab")
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            index = json.loads((self.root / INDEX_FILE).read_text())
+        except (OSError, ValueError):
+            index = {}
+        return lock, index
+
+    def _write_index(self, index: dict[str, dict[str, float]]) -> None:
+        path = self.root / INDEX_FILE
+        tmp = path.with_name(f".{INDEX_FILE}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(index, separators=(",", ":")) + "\n")
+        os.replace(tmp, path)
+
+    def _load_index(self) -> None:
+        lock, self._index = self._locked_index()
+        lock.close()
+
+    def _save_index(self) -> None:
+        """Merge this run's object uses and removals into the index (other runs may write it)."""
+        lock, index = self._locked_index()
+        try:
+            index.update(self._used)
+            for name in self._dropped:
+                index.pop(name, None)
+            self._write_index(index)
+        finally:
+            lock.close()
+        self._index = index
+        self._used = {}
+        self._dropped = set()
+
+    def _use(self, name: str, st: os.stat_result) -> bool:
+        """Record a use of object `name`; False if it changed since it was stored."""
+        known = self._index.get(name)
+        if known is not None and (
+            known["size"] != st.st_size or known["mtime_ns"] != st.st_mtime_ns
+        ):
+            return False
+        self._used[name] = {
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "last_used": time.time(),
+        }
+        return True
+
+    def _drop(self, name: str) -> None:
+        print(f"[warn] crate store: object {name} was modified after it was stored; dropping it")
+        (self.objects / name[:2] / name).unlink(missing_ok=True)
+        self._used.pop(name, None)
+        self._index.pop(name, None)
+        self._dropped.add(name)
+        self._inodes = None
+
+    def _add_object(self, path: str, st: os.stat_result, obj: Path) -> None:
+        obj.parent.mkdir(exist_ok=True)
+        tmp = obj.with_name(f".{obj.name}.{os.getpid()}.tmp")
+        tmp.unlink(missing_ok=True)
+        if st.st_nlink == 1:
+            # Nothing else shares this file: adopt its inode as the object.
+            os.link(path, tmp)
+        else:
+            # Hardlinked to a sample checkout; don't tie the sample's inode to the store.
+            shutil.copy2(path, tmp)
+        os.chmod(tmp, 0o555 if obj.name.endswith(".x") else 0o444)
+        os.replace(tmp, obj)
+
+    def _link_file(self, path: str, st: os.stat_result, stats: LinkStats) -> None:
+        name = self.inodes().get(st.st_ino) if st.st_dev == self.device else None
+        if name is not None:
+            if self._use(name, st):
+                stats.already += 1
+                stats.bytes_shared += st.st_size
+            else:
+                self._drop(name)
+                stats.corrupted += 1
+            return
+        executable = bool(st.st_mode & stat.S_IXUSR)
+        obj = self.object_path(file_digest(path), executable)
+        if obj.exists() and not self._use(obj.name, obj.stat()):
+            self._drop(obj.name)
+            stats.corrupted += 1
+        if not obj.exists():
+            self._add_object(path, st, obj)
+            stats.stored += 1
+        else:
+            stats.linked += 1
+            stats.bytes_shared += st.st_size
+        obj_st = obj.stat()
+        if obj_st.st_mode & 0o222:
+            # Stored before objects were made read-only.
+            os.chmod(obj, obj_st.st_mode & ~0o222)
+            obj_st = obj.stat()
+        self._use(obj.name, obj_st)
+        self.inodes()[obj_st.st_ino] = obj.name
+        if obj_st.st_ino == st.st_ino:
+            return
+        tmp = f"{path}.{os.getpid()}.store-tmp"
+        os.link(obj, tmp)
+        os.replace(tmp, path)
+
+    def link_workspace(self, workspace: Path) -> LinkStats | None:
+        """Link the workspace's vendored crate files into the store; None if unsupported."""
+        stats = LinkStats()
+        crates = workspace / CRATES_DIR
+        if not crates.is_dir():
+            return stats
+        if os.stat(crates).st_dev != self.device:
+            print(f"[warn] --crate-store {self.root} is on another filesystem; not linking")
+            return None
+        start = time.monotonic()
+        self._load_index()
+        for dirpath, _dirnames, filenames in os.walk(crates):
+            if Path(dirpath) == crates:
+                continue
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                stats.files += 1
+                try:
+                    st = os.lstat(path)
+                    if name in COW_FILE_NAMES or not stat.S_ISREG(st.st_mode) or st.st_size == 0:
+                        stats.skipped += 1
+                        continue
+                    self._link_file(path, st, stats)
+                except OSError as exc:
+                    if exc.errno == errno.EXDEV:
+                        print(f"[warn] --crate-store {self.root} is on another filesystem")
+                        return None
+                    print(f"[warn] crate store: {path}: {exc}")
+                    stats.skipped += 1
+        self._save_index()
+        stats.seconds = time.monotonic() - start
+        if stats.stored:
+            self.evict()
+        return stats
+
+    def evict(self) -> None:
+        """Drop unreferenced objects (link count 1), least recently used first, while over the cap.
+
+        Last use comes from the index; atime means little on noatime/relatime mounts.
+        """
+        objects: list[tuple[float, int, Path, int]] = []
+        total = 0
+        for bucket in os.scandir(self.objects):
+            if not bucket.is_dir(follow_symlinks=False):
+                continue
+            for entry in os.scandir(bucket.path):
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                total += st.st_size
+                known = self._index.get(entry.name)
+                last_used = known["last_used"] if known else st.st_mtime
+                objects.append((last_used, st.st_size, Path(entry.path), st.st_nlink))
+        if total <= self.max_bytes:
+            return
+        for _last_used, size, path, nlink in sorted(objects):
+            if total <= self.max_bytes:
+                break
+            if nlink > 1:
+                continue
+            path.unlink(missing_ok=True)
+            self._dropped.add(path.name)
+            total -= size
+        self._inodes = None
+        self._save_index()
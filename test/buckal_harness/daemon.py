@@ -0,0 +1,158 @@
+"""
+One buck2 daemon per workspace, managed for the whole harness run.
+
+`Buck2Daemon.ensure()` runs before the first build/test command and is a no-op
+afterwards. It asks `buck2 status` once, then restarts the daemon only when:
+
+- the daemon reports a stale working directory or buck-out mount, or
+- the startup-only `.buckconfig` settings (file watcher, materializer, digest,
+  RE/HTTP client; see buckconfig.RESTART_KEYS) differ from those recorded in
+  `buck-out/buckal-daemon.json` when the daemon was started, or
+- there is no record, so the daemon's configuration is unknown.
+
+A cold start is done explicitly with `buck2 server` so its latency can be
+reported. Daemons of cached and in-place workspaces are left running for the
+next run; daemons of temporary workspaces are killed by `shutdown()` before
+the directory is deleted.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import subprocess
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any
+
+from buckal_harness.report import RunReport
+from buckconfig import BuckConfig
+
+FINGERPRINT_FILE = Path("buck-out") / "buckal-daemon.json"
+
+
+def config_fingerprint(workspace: Path) -> str:
+    settings: dict[str, str] = {}
+    for name in (".buckconfig", ".buckconfig.local"):
+        settings.update(BuckConfig.load(workspace / name).startup_settings())
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()
+
+
+class Buck2Daemon:
+    def __init__(
+        self,
+        workspace: Path,
+        env: dict[str, str],
+        keep_warm: bool,
+        report: RunReport | None = None,
+    ) -> None:
+        self.workspace = workspace
+        self.env = env
+        self.keep_warm = keep_warm
+        self.report = report
+        self.ready = False
+        self.used = False
+        self.status_checks = 0
+        self.restarts: list[str] = []
+        self.startup_s: float | None = None
+        self.reused = False
+
+    def _phase(self, name: str, cmd: list[str]):
+        return self.report.phase(name, cmd) if self.report else nullcontext()
+
+    def _buck2(self, *args: str, capture: bool = False) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            ["buck2", *args],
+            cwd=self.workspace,
+            env=self.env,
+            text=True,
+            stdout=subprocess.PIPE if capture else subprocess.DEVNULL,
+            stderr=subprocess.PIPE if capture else subprocess.DEVNULL,
+            check=False,
+        )
+
+    def status(self) -> dict[str, Any] | None:
+        """Parsed `buck2 status`, or None if no daemon is running for the workspace."""
+        self.status_checks += 1
+        with self._phase("buck2 status", ["buck2", "status"]):
+            result = self._buck2("status", capture=True)
+        if result.returncode != 0:
+            return None
+        try:
+            status = json.loads(result.stdout)
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(status, dict) or not (status.get("process_info") or status.get("pid")):
+            return None
+        return status
+
+    def _recorded_fingerprint(self) -> str | None:
+        try:
+            return json.loads((self.workspace / FINGERPRINT_FILE).read_text()).get("config")
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def _record_fingerprint(self, fingerprint: str) -> None:
+        path = self.workspace / FINGERPRINT_FILE
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps({"config": fingerprint, "started_at": time.time()}) + "\n")
+        except OSError:
+            pass
+
+    def kill(self, reason: str) -> None:
+        print(f"[info] restarting buck2 daemon: {reason}")
+        self.restarts.append(reason)
+        with self._phase("buck2 kill", ["buck2", "kill"]):
+            self._buck2("kill")
+        (self.workspace / FINGERPRINT_FILE).unlink(missing_ok=True)
+
+    def ensure(self) -> None:
+        """Make sure a daemon with the current configuration is running (once per run)."""
+        self.used = True
+        if self.ready:
+            return
+        fingerprint = config_fingerprint(self.workspace)
+        status = self.status()
+        if status is not None:
+            if (
+                status.get("valid_working_directory") is False
+                or status.get("valid_buck_out_mount") is False
+            ):
+                self.kill("daemon reports a stale working directory")
+                status = None
+            else:
+                recorded = self._recorded_fingerprint()
+                if recorded is None:
+                    self.kill("no record of the daemon's startup configuration")
+                    status = None
+                elif recorded != fingerprint:
+                    self.kill("startup-only .buckconfig settings changed")
+                    status = None
+        if status is None:
+            start = time.monotonic()
+            with self._phase("buck2 daemon startup", ["buck2", "server"]):
+                self._buck2("server")
+            self.startup_s = time.monotonic() - start
+            self._record_fingerprint(fingerprint)
+            print(f"[info] buck2 daemon started in {self.startup_s:.2f}s")
+        else:
+            self.reused = True
+            print("[ok] reusing warm buck2 daemon")
+        self.ready = True
+
+    def shutdown(self) -> None:
+        """Kill the daemon unless it should stay warm for the next run."""
+        if self.used and not self.keep_warm:
+            with self._phase("buck2 kill", ["buck2", "kill"]):
+                self._buck2("kill")
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "reused": self.reused,
+            "startup_s": self.startup_s,
+            "restarts": self.restarts,
+            "status_checks": self.status_checks,
+            "keep_warm": self.keep_warm,
+        }
@@ -0,0 +1,266 @@
+"""
+Per-action timings from buck2 event logs.
+
+Build and test commands run with `--event-log <file>.json-lines`, which makes
+buck2 write every event of the invocation as one JSON object per line. Only
+the `SpanEnd` events of `ActionExecution` spans are needed: each carries the
+action's owner label, category/identifier, execution kind (local, remote,
+action cache, ...), whether it failed, its duration and the metadata of the
+commands it ran.
+
+The event-log schema follows buck2's protobuf definitions and is not stable,
+so the parser is deliberately tolerant: enums may be ints or names, missing
+fields are skipped, and malformed lines are ignored. The critical path comes
+from `buck2 log critical-path --format json <event log>`.
+"""
+
+from __future__ import annotations
+
+import json
+import subprocess
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Iterator
+
+TOP_N = 15
+
+# buck2_data.ActionExecutionKind
+EXECUTION_KINDS = {
+    0: "not_set",
+    1: "local",
+    2: "remote",
+    3: "action_cache",
+    4: "simple",
+    5: "deferred",
+    6: "local_worker",
+    7: "remote_dep_file_cache",
+    8: "local_dep_file_cache",
+    9: "local_action_cache",
+}
+CACHE_KINDS = frozenset(
+    {"action_cache", "remote_dep_file_cache", "local_dep_file_cache", "local_action_cache"}
+)
+BUILDSCRIPT_CATEGORIES = ("buildscript", "cargo_buildscript", "build_script")
+
+
+@dataclass
+class ActionRecord:
+    label: str
+    category: str
+    identifier: str
+    kind: str
+    wall_s: float
+    failed: bool = False
+    cpu_s: float | None = None
+    queue_s: float | None = None
+
+    @property
+    def is_buildscript(self) -> bool:
+        return self.category.lower() in BUILDSCRIPT_CATEGORIES or "build-script-run" in self.label
+
+    @property
+    def cached(self) -> bool:
+        return self.kind in CACHE_KINDS
+
+
+def duration_s(value: Any) -> float | None:
+    """A protobuf Duration as seconds ({"secs", "nanos"}, "1.5s" or a number)."""
+    if isinstance(value, dict):
+        return float(value.get("secs", value.get("seconds", 0))) + value.get("nanos", 0) / 1e9
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str) and value.endswith("s"):
+        try:
+            return float(value[:-1])
+        except ValueError:
+            return None
+    return None
+
+
+def execution_kind(value: Any) -> str:
+    if isinstance(value, int):
+        return EXECUTION_KINDS.get(value, str(value))
+    if isinstance(value, str):
+        return value.lower()
+    return "unknown"
+
+
+def owner_label(key: Any) -> str:
+    """`//pkg:name` of an action key's owner, whatever kind of owner it is."""
+    owner = key.get("owner") if isinstance(key, dict) else None
+    if not isinstance(owner, dict):
+        return "?"
+    for value in owner.values():
+        label = value.get("label", value) if isinstance(value, dict) else value
+        if isinstance(label, dict) and "package" in label:
+            return f"{label['package']}:{label.get('name', '')}"
+        if isinstance(label, str):
+            return label
+    return "?"
+
+
+def command_seconds(commands: Any, names: tuple[str, ...]) -> float | None:
+    """Sum of the first matching duration field over the commands' metadata."""
+    total = None
+    for command in commands if isinstance(commands, list) else ():
+        details = command.get("details", command) if isinstance(command, dict) else {}
+        metadata = details.get("metadata", {}) if isinstance(details, dict) else {}
+        stats = metadata.get("execution_stats") or {}
+        for name in names:
+            if name in stats:
+                value = stats[name] / 1e6 if name.endswith("_us") else duration_s(stats[name])
+            elif name in metadata:
+                value = duration_s(metadata[name])
+            else:
+                continue
+            if value is not None:
+                total = (total or 0.0) + value
+            break
+    return total
+
+
+def action_from_end(end: dict[str, Any]) -> ActionRecord | None:
+    data = end.get("data")
+    action = data.get("ActionExecution") if isinstance(data, dict) else None
+    if not isinstance(action, dict):
+        return None
+    name = action.get("name") or {}
+    commands = action.get("commands")
+    cpu_user = command_seconds(commands, ("user_cpu_time_us", "cpu_time_user"))
+    cpu_sys = command_seconds(commands, ("system_cpu_time_us", "cpu_time_system"))
+    wall = duration_s(action.get("wall_time")) or duration_s(end.get("duration")) or 0.0
+    return ActionRecord(
+        label=owner_label(action.get("key")),
+        category=str(name.get("category", "")),
+        identifier=str(name.get("identifier", "")),
+        kind=execution_kind(action.get("execution_kind")),
+        wall_s=wall,
+        failed=bool(action.get("failed")),
+        cpu_s=None if cpu_user is None and cpu_sys is None else (cpu_user or 0) + (cpu_sys or 0),
+        queue_s=command_seconds(commands, ("queue_duration",)),
+    )
+
+
+def iter_actions(path: Path) -> Iterator[ActionRecord]:
+    """Finished actions of one `--event-log` json-lines file."""
+    with path.open(encoding="utf-8", errors="replace") as fp:
+        for line in fp:
+            if '"ActionExecution"' not in line or '"SpanEnd"' not in line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            event = record.get("Event", record) if isinstance(record, dict) else None
+            data = event.get("data") if isinstance(event, dict) else None
+            end = data.get("SpanEnd") if isinstance(data, dict) else None
+            if isinstance(end, dict):
+                action = action_from_end(end)
+                if action is not None:
+                    yield action
+
+
+def critical_path(
+    event_log: Path, cwd: Path, env: dict[str, str]
+) -> list[dict[str, Any]] | None:
+    """Entries of `buck2 log critical-path` for one event log, or None if unavailable."""
+    result = subprocess.run(
+        ["buck2", "log", "critical-path", "--format", "json", str(event_log)],
+        cwd=cwd,
+        env=env,
+        text=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        check=False,
+    )
+    if result.returncode != 0:
+        return None
+    entries = []
+    for line in result.stdout.splitlines():
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(entry, dict):
+            entries.append(
+                {
+                    "kind": entry.get("kind"),
+                    "name": entry.get("name"),
+                    "category": entry.get("category"),
+                    "identifier": entry.get("identifier"),
+                    "execution_kind": entry.get("execution_kind"),
+                    "total_s": duration_s(entry.get("total_duration")),
+                    "user_s": duration_s(entry.get("user_duration")),
+                    "potential_improvement_s": duration_s(
+                        entry.get("potential_improvement_duration")
+                    ),
+                }
+            )
+    return entries
+
+
+def summarize_actions(actions: list[ActionRecord], top: int = TOP_N) -> dict[str, Any]:
+    kinds: dict[str, int] = {}
+    categories: dict[str, dict[str, float]] = {}
+    for action in actions:
+        kinds[action.kind] = kinds.get(action.kind, 0) + 1
+        bucket = categories.setdefault(action.category or "?", {"count": 0, "wall_s": 0.0})
+        bucket["count"] += 1
+        bucket["wall_s"] = round(bucket["wall_s"] + action.wall_s, 3)
+
+    def slowest(selected: list[ActionRecord]) -> list[dict[str, Any]]:
+        ranked = sorted(selected, key=lambda action: action.wall_s, reverse=True)[:top]
+        return [asdict(action) for action in ranked]
+
+    cached = sum(1 for action in actions if action.cached)
+    return {
+        "actions": len(actions),
+        "failed": sum(1 for action in actions if action.failed),
+        "cache_hits": cached,
+        "executed": sum(1 for action in actions if action.kind in ("local", "remote")),
+        "by_execution_kind": kinds,
+        "by_category": dict(
+            sorted(categories.items(), key=lambda item: item[1]["wall_s"], reverse=True)
+        ),
+        "slowest_rustc": slowest([a for a in actions if a.category == "rustc"]),
+        "slowest_buildscripts": slowest([a for a in actions if a.is_buildscript]),
+    }
+
+
+def analyze_invocation(event_log: Path, cwd: Path, env: dict[str, str]) -> dict[str, Any]:
+    """Summary of one build/test invocation from its event log."""
+    summary: dict[str, Any] = {"event_log": str(event_log)}
+    try:
+        summary.update(summarize_actions(list(iter_actions(event_log))))
+    except OSError as exc:
+        summary["error"] = f"cannot read event log: {exc}"
+    path = critical_path(event_log, cwd, env)
+    summary["critical_path"] = path
+    if path:
+        summary["critical_path_s"] = round(sum(entry["total_s"] or 0 for entry in path), 3)
+    return summary
+
+
+def format_summary(phase: str, summary: dict[str, Any], rows: int = 5) -> str:
+    if "actions" not in summary:
+        return f"[warn] {phase}: {summary.get('error', 'no event log data')}"
+    lines = [
+        f"[info] {phase}: {summary['actions']} actions, {summary['executed']} executed, "
+        f"{summary['cache_hits']} cache hits"
+        + (
+            f", critical path {summary['critical_path_s']:.1f}s"
+            if summary.get("critical_path_s") is not None
+            else ""
+        )
+    ]
+    for title, key in (
+        ("slowest rustc", "slowest_rustc"),
+        ("slowest build scripts", "slowest_buildscripts"),
+    ):
+        if summary[key]:
+            lines.append(f"  {title}:")
+            for action in summary[key][:rows]:
+                lines.append(
+                    f"    {action['wall_s']:>7.1f}s  {action['label']}  {action['identifier']}"
+                )
+    return "\n".join(lines)
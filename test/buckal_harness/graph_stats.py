@@ -0,0 +1,350 @@
+"""
+Size and load cost of the generated BUCK graph.
+
+`--graph-stats` runs right after migrate and fetch. It describes the graph in
+three ways:
+
+* the BUCK files themselves: how many, how large, and how many rules use
+  `os_deps`/`os_named_deps` or `select()`;
+* one bulk `buck2 uquery //...` with the rule type and dependency attributes:
+  targets by kind, targets per package (first-party packages and vendored
+  crates separately), dependency fan-out, and `select()` branches after the
+  bundle macros have expanded `os_deps`;
+* `buck2 targets //...` timed on a fresh daemon (cold) and again (warm), with
+  per-file load times taken from the `Load` spans of the cold run's event log.
+
+All queries run under `buck2 --isolation-dir buckal-graph`, so the
+workspace's own daemon is neither started nor disturbed, and that daemon is
+killed before each cold run and afterwards.
+
+The graph is then regenerated with the opposite `--supported-platform-only`
+setting, measured again and restored by a final migrate. Comparing the two
+shows how much platform filtering removes from the graph and from load time.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import statistics
+import subprocess
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from buckal_harness.event_log import duration_s
+from buckal_harness.incremental import SKIP_DIRS, diff_snapshots, snapshot_buck_files
+
+ISOLATION_DIR = "buckal-graph"
+THIRD_PARTY_PREFIX = "third-party/rust/crates/"
+TOP_N = 15
+DEP_ATTRIBUTES = ("deps", "named_deps", "exported_deps", "os_deps", "os_named_deps")
+GRAPH_ATTRIBUTES = rf"^(buck\.type|buck\.package|{'|'.join(DEP_ATTRIBUTES)})$"
+SELECT_RE = re.compile(r"\bselect\(")
+OS_DEPS_RE = re.compile(r"^\s*os_(?:named_)?deps\s*=", re.MULTILINE)
+# Quoted strings of a select() rendered as text; group 2 is set for dict keys (conditions).
+SELECT_STRING_RE = re.compile(r'"([^"]*)"(\s*:)?')
+
+
+def isolated(*args: str) -> list[str]:
+    return ["buck2", "--isolation-dir", ISOLATION_DIR, *args]
+
+
+def scan_buck_files(workspace: Path) -> dict[str, Any]:
+    """Static counts over every BUCK file outside buck-out/.git/target."""
+    files = size = select_calls = os_dep_rules = 0
+    for dirpath, dirnames, filenames in os.walk(workspace):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        if "BUCK" not in filenames:
+            continue
+        text = (Path(dirpath) / "BUCK").read_text(encoding="utf-8", errors="replace")
+        files += 1
+        size += len(text.encode())
+        select_calls += len(SELECT_RE.findall(text))
+        os_dep_rules += len(OS_DEPS_RE.findall(text))
+    return {
+        "files": files,
+        "bytes": size,
+        "select_calls": select_calls,
+        "os_deps_attributes": os_dep_rules,
+    }
+
+
+def dep_labels(value: Any) -> tuple[set[str], int]:
+    """Dependency labels in an attribute value, and the number of select() branches in it.
+
+    uquery renders a select() either as {"__type": "selector", "entries": {...}} or
+    as text; dict keys (select conditions, named_deps names) are never labels.
+    """
+    labels: set[str] = set()
+    branches = 0
+    if isinstance(value, str) and "select(" in value:
+        for match in SELECT_STRING_RE.finditer(value):
+            if match.group(2):
+                branches += 1
+            elif "//" in match.group(1) or match.group(1).startswith(":"):
+                labels.add(match.group(1))
+    elif isinstance(value, str):
+        if value:
+            labels.add(value)
+    elif isinstance(value, (dict, list)):
+        if isinstance(value, dict) and value.get("__type") == "selector":
+            entries = value.get("entries")
+            value = entries if isinstance(entries, dict) else {}
+            branches = len(value)
+        for item in value.values() if isinstance(value, dict) else value:
+            found, nested = dep_labels(item)
+            labels |= found
+            branches += nested
+    return labels, branches
+
+
+def package_of(label: str, attrs: dict[str, Any]) -> str:
+    package = attrs.get("buck.package")
+    if isinstance(package, str) and package:
+        return package
+    return label.rsplit(":", 1)[0]
+
+
+def distribution(values: list[int]) -> dict[str, Any]:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "mean": round(statistics.fmean(ordered), 2),
+        "p50": ordered[len(ordered) // 2],
+        "p90": ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))],
+        "max": ordered[-1],
+    }
+
+
+def query_graph(workspace: Path, env: dict[str, str]) -> dict[str, Any]:
+    """Targets by kind, per-package counts, fan-out and select() branches from one uquery."""
+    start = time.monotonic()
+    result = subprocess.run(
+        isolated("uquery", "//...", "--output-attribute", GRAPH_ATTRIBUTES, "--json"),
+        cwd=workspace,
+        env=env,
+        text=True,
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    query_s = round(time.monotonic() - start, 3)
+    targets: dict[str, dict[str, Any]] = json.loads(result.stdout or "{}")
+
+    kinds: dict[str, int] = {}
+    packages: dict[str, int] = {}
+    fan_out: dict[str, int] = {}
+    edges = select_targets = select_branches = 0
+    for label, attrs in targets.items():
+        kind = str(attrs.get("buck.type", "?"))
+        kinds[kind] = kinds.get(kind, 0) + 1
+        package = package_of(label, attrs)
+        packages[package] = packages.get(package, 0) + 1
+        labels: set[str] = set()
+        branches = 0
+        for name in DEP_ATTRIBUTES:
+            found, nested = dep_labels(attrs.get(name))
+            labels |= found
+            branches += nested
+        fan_out[label] = len(labels)
+        edges += len(labels)
+        if branches:
+            select_targets += 1
+            select_branches += branches
+
+    def third_party(package: str) -> bool:
+        return THIRD_PARTY_PREFIX in package
+
+    ranked = sorted(fan_out.items(), key=lambda item: item[1], reverse=True)[:TOP_N]
+    return {
+        "query_s": query_s,
+        "targets": len(targets),
+        "packages": len(packages),
+        "by_kind": dict(sorted(kinds.items(), key=lambda item: item[1], reverse=True)),
+        "targets_per_crate": distribution([n for p, n in packages.items() if third_party(p)]),
+        "targets_per_first_party_package": distribution(
+            [n for p, n in packages.items() if not third_party(p)]
+        ),
+        "dep_edges": edges,
+        "fan_out": distribution(list(fan_out.values())),
+        "highest_fan_out": [{"label": label, "deps": deps} for label, deps in ranked],
+        "select_targets": select_targets,
+        "select_branches": select_branches,
+    }
+
+
+def iter_load_times(path: Path) -> list[dict[str, Any]]:
+    """(module, seconds) of every finished `Load` span of one event log."""
+    loads = []
+    with path.open(encoding="utf-8", errors="replace") as fp:
+        for line in fp:
+            if '"SpanEnd"' not in line or '"Load' not in line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            event = record.get("Event", record) if isinstance(record, dict) else None
+            data = event.get("data") if isinstance(event, dict) else None
+            end = data.get("SpanEnd") if isinstance(data, dict) else None
+            payload = end.get("data") if isinstance(end, dict) else None
+            load = payload.get("Load") if isinstance(payload, dict) else None
+            if not isinstance(load, dict):
+                continue
+            seconds = duration_s(end.get("duration"))
+            if seconds is not None:
+                loads.append(
+                    {
+                        "module": str(load.get("module_id", "?")),
+                        "seconds": round(seconds, 4),
+                        "error": bool(load.get("error")),
+                    }
+                )
+    return loads
+
+
+def time_targets(workspace: Path, env: dict[str, str], event_log: Path) -> dict[str, Any]:
+    """Wall time of `buck2 targets //...` on a fresh daemon and again warm, plus load times."""
+    subprocess.run(isolated("kill"), cwd=workspace, env=env, check=False)
+    event_log.parent.mkdir(parents=True, exist_ok=True)
+    event_log.unlink(missing_ok=True)
+    timings: dict[str, Any] = {}
+    for run, extra in (("cold", ["--event-log", str(event_log)]), ("warm", [])):
+        start = time.monotonic()
+        result = subprocess.run(
+            isolated("targets", "//...", *extra),
+            cwd=workspace,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            check=False,
+        )
+        timings[f"{run}_s"] = round(time.monotonic() - start, 3)
+        timings[f"{run}_exit_code"] = result.returncode
+
+    try:
+        loads = iter_load_times(event_log)
+    except OSError:
+        loads = []
+    loads.sort(key=lambda load: load["seconds"], reverse=True)
+    timings["loads"] = len(loads)
+    timings["load_total_s"] = round(sum(load["seconds"] for load in loads), 3)
+    timings["third_party_load_s"] = round(
+        sum(load["seconds"] for load in loads if THIRD_PARTY_PREFIX in load["module"]), 3
+    )
+    timings["slowest_loads"] = loads[:TOP_N]
+    timings["load_errors"] = [load["module"] for load in loads if load["error"]]
+    return timings
+
+
+def analyze_graph(workspace: Path, env: dict[str, str], event_log: Path) -> dict[str, Any]:
+    stats: dict[str, Any] = {"buck_files": scan_buck_files(workspace)}
+    try:
+        stats["load"] = time_targets(workspace, env, event_log)
+        try:
+            stats["graph"] = query_graph(workspace, env)
+        except subprocess.CalledProcessError as exc:
+            stats["graph"] = {"error": f"buck2 uquery exited with {exc.returncode}"}
+    finally:
+        subprocess.run(isolated("kill"), cwd=workspace, env=env, check=False)
+    return stats
+
+
+def reduction(full: dict[str, Any], filtered: dict[str, Any]) -> dict[str, Any]:
+    """What --supported-platform-only removes, as absolute and relative differences."""
+    metrics = {
+        "buck_file_bytes": ("buck_files", "bytes"),
+        "os_deps_attributes": ("buck_files", "os_deps_attributes"),
+        "targets": ("graph", "targets"),
+        "dep_edges": ("graph", "dep_edges"),
+        "select_branches": ("graph", "select_branches"),
+        "targets_cold_s": ("load", "cold_s"),
+        "targets_warm_s": ("load", "warm_s"),
+        "load_total_s": ("load", "load_total_s"),
+        "uquery_s": ("graph", "query_s"),
+    }
+    result = {}
+    for name, (section, key) in metrics.items():
+        before = full.get(section, {}).get(key)
+        after = filtered.get(section, {}).get(key)
+        if before is None or after is None:
+            continue
+        result[name] = {
+            "full": before,
+            "supported_platform_only": after,
+            "removed": round(before - after, 3),
+            "removed_pct": round((before - after) / before * 100, 1) if before else None,
+        }
+    return result
+
+
+def compare_platform_filtering(
+    workspace: Path,
+    env: dict[str, str],
+    event_dir: Path,
+    supported_platform_only: bool,
+    run_migrate: Callable[[bool], None],
+) -> dict[str, Any]:
+    """Measure the graph as generated, then with the opposite --supported-platform-only.
+
+    `run_migrate(flag)` regenerates the workspace with that setting; the
+    workspace is migrated back afterwards and checked against the original.
+    """
+    current = "supported_platform_only" if supported_platform_only else "full"
+    other = "full" if supported_platform_only else "supported_platform_only"
+    before = snapshot_buck_files(workspace)
+    results = {current: analyze_graph(workspace, env, event_dir / f"graph-{current}.json-lines")}
+    try:
+        run_migrate(not supported_platform_only)
+        results[other] = analyze_graph(workspace, env, event_dir / f"graph-{other}.json-lines")
+    finally:
+        run_migrate(supported_platform_only)
+    diff = diff_snapshots(before, snapshot_buck_files(workspace))
+    results["restored"] = not (diff.changed or diff.added or diff.removed)
+    results["reduction"] = reduction(results["full"], results["supported_platform_only"])
+    return results
+
+
+def format_graph_stats(stats: dict[str, Any], rows: int = 5) -> str:
+    lines = []
+    for variant in ("full", "supported_platform_only"):
+        if variant not in stats:
+            continue
+        files = stats[variant]["buck_files"]
+        graph = stats[variant].get("graph", {})
+        load = stats[variant].get("load", {})
+        by_kind = list(graph.get("by_kind", {}).items())
+        kinds = ", ".join(f"{n} {kind}" for kind, n in by_kind[:rows])
+        lines.append(
+            f"[info] {variant}: {files['files']} BUCK files ({files['bytes'] / 2**10:.0f} KiB), "
+            f"{graph.get('targets', 0)} targets, {graph.get('dep_edges', 0)} dep edges, "
+            f"{graph.get('select_branches', 0)} select branches"
+        )
+        if "error" in graph:
+            lines.append(f"[warn] {variant}: {graph['error']}")
+        if kinds:
+            lines.append(f"  kinds: {kinds}")
+        fan_out = graph.get("fan_out", {})
+        if fan_out.get("count"):
+            lines.append(
+                f"  fan-out: mean {fan_out['mean']}, p90 {fan_out['p90']}, max {fan_out['max']}; "
+                f"targets per crate: mean {graph['targets_per_crate'].get('mean', '-')}"
+            )
+        if load:
+            lines.append(
+                f"  buck2 targets //...: {load['cold_s']:.2f}s cold, {load['warm_s']:.2f}s warm; "
+                f"{load['loads']} loads, {load['load_total_s']:.2f}s total"
+            )
+            for entry in load["slowest_loads"][:rows]:
+                lines.append(f"    {entry['seconds']:>7.3f}s  {entry['module']}")
+    for name, entry in stats.get("reduction", {}).items():
+        if entry["removed_pct"] is not None:
+            lines.append(
+                f"  --supported-platform-only {name}: {entry['full']} -> "
+                f"{entry['supported_platform_only']} ({-entry['removed_pct']:+.1f}%)"
+            )
+    if stats.get("restored") is False:
+        lines.append("[warn] BUCK files differ from the original migrate after restoring")
+    return "\n".join(lines)
@@ -0,0 +1,205 @@
+"""
+Verify that `cargo buckal migrate` regenerates BUCK files incrementally.
+
+After the harness's normal migrate, `--verify-incremental` runs:
+
+1. a no-op migrate, which must not rewrite any BUCK file (content or mtime);
+2. a migrate after a controlled Cargo.toml edit (a probe feature added to one
+   first-party package and enabled by default), which must change at least one
+   BUCK file and whose changes should stay inside that package;
+3. a migrate after restoring Cargo.toml, which should return to the original
+   output.
+
+Every BUCK file outside buck-out/.git/target is hashed before and after each
+pass, and each pass's wall time is recorded.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from buckal_harness.workspace import write_text_cow
+
+SKIP_DIRS = frozenset({".git", "buck-out", "target"})
+PROBE_FEATURE = "buckal-verify-probe"
+
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot_buck_files(workspace: Path) -> dict[str, tuple[str, int]]:
+    """Map relative BUCK path -> (sha256, mtime_ns)."""
+    snapshot: dict[str, tuple[str, int]] = {}
+    for dirpath, dirnames, filenames in os.walk(workspace):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        if "BUCK" in filenames:
+            path = Path(dirpath) / "BUCK"
+            snapshot[str(path.relative_to(workspace))] = (hash_file(path), path.stat().st_mtime_ns)
+    return snapshot
+
+
+@dataclass
+class SnapshotDiff:
+    changed: list[str] = field(default_factory=list)
+    rewritten: list[str] = field(default_factory=list)  # same content, new mtime
+    added: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+
+    @property
+    def touched(self) -> list[str]:
+        return sorted(self.changed + self.rewritten + self.added + self.removed)
+
+    def as_dict(self) -> dict[str, list[str]]:
+        return {
+            "changed": sorted(self.changed),
+            "rewritten": sorted(self.rewritten),
+            "added": sorted(self.added),
+            "removed": sorted(self.removed),
+        }
+
+
+def diff_snapshots(
+    before: dict[str, tuple[str, int]], after: dict[str, tuple[str, int]]
+) -> SnapshotDiff:
+    diff = SnapshotDiff()
+    for rel, (digest, mtime) in after.items():
+        if rel not in before:
+            diff.added.append(rel)
+        elif before[rel][0] != digest:
+            diff.changed.append(rel)
+        elif before[rel][1] != mtime:
+            diff.rewritten.append(rel)
+    diff.removed = [rel for rel in before if rel not in after]
+    return diff
+
+
+def find_probe_manifest(workspace: Path) -> Path | None:
+    """First-party Cargo.toml with a [package] section, preferring the workspace root."""
+    candidates = [workspace / "Cargo.toml"]
+    for dirpath, dirnames, filenames in os.walk(workspace):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS | {"third-party"})
+        if "Cargo.toml" in filenames and Path(dirpath) != workspace:
+            candidates.append(Path(dirpath) / "Cargo.toml")
+    for manifest in candidates:
+        if manifest.is_file() and "[package]" in manifest.read_text().splitlines():
+            return manifest
+    return None
+
+
+def add_probe_feature(text: str) -> str:
+    """Add a probe feature and enable it by default, so the package's BUCK rule changes."""
+    lines = text.splitlines(keepends=True)
+    if lines and not lines[-1].endswith("\n"):
+        lines[-1] += "\n"
+    probe = [f"{PROBE_FEATURE} = []\n"]
+    try:
+        start = next(i for i, line in enumerate(lines) if line.strip() == "[features]")
+    except StopIteration:
+        return "".join(lines) + f'\n[features]\ndefault = ["{PROBE_FEATURE}"]\n' + probe[0]
+    end = next(
+        (i for i in range(start + 1, len(lines)) if lines[i].lstrip().startswith("[")), len(lines)
+    )
+    for i in range(start + 1, end):
+        key, sep, value = lines[i].partition("=")
+        if sep and key.strip() == "default" and value.lstrip().startswith("["):
+            # Prepend to the existing list; TOML allows the trailing comma this may leave.
+            bracket = lines[i].index("[", len(key))
+            rest = lines[i][bracket + 1 :]
+            joiner = "," if rest.lstrip(" ").startswith(("\n", "]")) else ", "
+            lines[i] = f'{lines[i][: bracket + 1]}"{PROBE_FEATURE}"{joiner}{rest}'
+            break
+    else:
+        probe.insert(0, f'default = ["{PROBE_FEATURE}"]\n')
+    return "".join(lines[: start + 1] + probe + lines[start + 1 :])
+
+
+def timed_pass(
+    name: str, run_migrate: Callable[[str], None], workspace: Path
+) -> tuple[float, dict[str, tuple[str, int]]]:
+    start = time.monotonic()
+    run_migrate(name)
+    elapsed = time.monotonic() - start
+    return elapsed, snapshot_buck_files(workspace)
+
+
+def verify_incremental(workspace: Path, run_migrate: Callable[[str], None]) -> dict:
+    """Run the verification passes; `run_migrate(phase)` runs one migrate.
+
+    Returns a report dict whose "ok" is False if the no-op pass rewrote
+    anything, the edit pass changed no BUCK file, or the restore pass did not
+    reproduce the original output.
+    """
+    baseline = snapshot_buck_files(workspace)
+    print(f"[info] verify-incremental: hashed {len(baseline)} BUCK files")
+
+    noop_s, after_noop = timed_pass("migrate (no-op)", run_migrate, workspace)
+    noop_diff = diff_snapshots(baseline, after_noop)
+    report: dict = {
+        "buck_files": len(baseline),
+        "noop": {"wall_s": noop_s, **noop_diff.as_dict()},
+    }
+    ok = not noop_diff.touched
+    if ok:
+        print(f"[ok] no-op migrate rewrote nothing ({noop_s:.2f}s)")
+    else:
+        print(f"[warn] no-op migrate touched {len(noop_diff.touched)} BUCK files ({noop_s:.2f}s)")
+        for rel in noop_diff.touched[:20]:
+            print(f"  {rel}")
+
+    manifest = find_probe_manifest(workspace)
+    if manifest is None:
+        print("[warn] verify-incremental: no first-party [package] manifest; skipping edit pass")
+        report["ok"] = ok
+        return report
+
+    package_dir = manifest.parent.relative_to(workspace)
+    original = manifest.read_text()
+    write_text_cow(manifest, add_probe_feature(original))
+    try:
+        edit_s, after_edit = timed_pass("migrate (Cargo.toml edit)", run_migrate, workspace)
+    finally:
+        write_text_cow(manifest, original)
+    edit_diff = diff_snapshots(after_noop, after_edit)
+    outside = [rel for rel in edit_diff.touched if Path(rel).parent != package_dir]
+    report["edit"] = {
+        "manifest": str(manifest.relative_to(workspace)),
+        "wall_s": edit_s,
+        "outside_package": outside,
+        **edit_diff.as_dict(),
+    }
+    print(
+        f"[info] migrate after editing {manifest.relative_to(workspace)} touched "
+        f"{len(edit_diff.touched)} BUCK files ({edit_s:.2f}s)"
+    )
+    if not edit_diff.changed and not edit_diff.added:
+        # Otherwise a migrate that ignores Cargo.toml edits would pass the check.
+        print("[warn] migrate after the Cargo.toml edit changed no BUCK file")
+        ok = False
+    if outside:
+        print(f"[warn] {len(outside)} of them are outside {package_dir}/:")
+        for rel in outside[:20]:
+            print(f"  {rel}")
+
+    restore_s, after_restore = timed_pass("migrate (restore)", run_migrate, workspace)
+    restored = {rel: digest for rel, (digest, _) in after_restore.items()} == {
+        rel: digest for rel, (digest, _) in after_noop.items()
+    }
+    report["restore"] = {"wall_s": restore_s, "matches_original": restored}
+    if restored:
+        print(f"[ok] migrate after restoring Cargo.toml matched the original ({restore_s:.2f}s)")
+    else:
+        print("[warn] migrate after restoring Cargo.toml did not reproduce the original output")
+        ok = False
+
+    report["ok"] = ok
+    return report
@@ -0,0 +1,214 @@
+"""
+Declarative per-crate patches for generated third-party BUCK files.
+
+Each `CratePatch` names a crate, a version range, a target triple and the
+env/attrs to add to the `platform = {...}` attribute of one rule in
+`third-party/rust/crates/<crate>/<version>/BUCK` (by default the crate's
+`buildscript_run`).
+
+`apply_crate_patches()` lists `third-party/rust/crates` once and only the
+version directories of crates that have patches, so the cost grows with the
+number of files touched rather than the size of the vendor tree. Every BUCK
+file is read and written at most once, however many patches apply to it.
+Patches are idempotent: an already present triple whose env keys are all
+set is left alone.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from buckal_harness.workspace import write_text_cow
+
+CRATES_DIR = Path("third-party") / "rust" / "crates"
+
+
+@dataclass(frozen=True)
+class CratePatch:
+    name: str
+    crate: str
+    versions: str  # comma-separated constraints, e.g. ">=0.9.0, <0.10"
+    triple: str
+    env: dict[str, str] = field(default_factory=dict)
+    attrs: dict[str, Any] = field(default_factory=dict)
+    rule: str = "buildscript_run"
+    targets: tuple[str, ...] | None = None  # harness targets; None means all
+
+
+PATCHES: tuple[CratePatch, ...] = (
+    CratePatch(
+        name="openssl-sys i686 system OpenSSL",
+        crate="openssl-sys",
+        versions=">=0.9.0, <0.10",
+        triple="i686-unknown-linux-gnu",
+        env={
+            "OPENSSL_LIB_DIR": "/usr/lib/i386-linux-gnu",
+            "OPENSSL_INCLUDE_DIR": "/usr/include",
+            "PKG_CONFIG_ALLOW_CROSS": "1",
+            "PKG_CONFIG_PATH": "/usr/lib/i386-linux-gnu/pkgconfig:/usr/lib/pkgconfig",
+        },
+        targets=("libra",),
+    ),
+)
+
+CONSTRAINT_RE = re.compile(r"^\s*(>=|<=|==|=|>|<)?\s*([0-9][0-9A-Za-z.+-]*)\s*$")
+
+
+def parse_version(text: str) -> tuple[int, ...]:
+    """Numeric release part of a semver string ("0.9.111+1.1" -> (0, 9, 111))."""
+    release = re.split(r"[-+]", text, maxsplit=1)[0]
+    parts: list[int] = []
+    for part in release.split("."):
+        if not part.isdigit():
+            break
+        parts.append(int(part))
+    return tuple(parts)
+
+
+def version_matches(version: str, spec: str) -> bool:
+    if spec.strip() in ("", "*"):
+        return True
+    have = parse_version(version)
+    for constraint in spec.split(","):
+        match = CONSTRAINT_RE.match(constraint)
+        if not match:
+            raise ValueError(f"bad version constraint {constraint!r} in {spec!r}")
+        op, want = match.group(1) or "==", parse_version(match.group(2))
+        width = max(len(have), len(want))
+        a, b = have + (0,) * (width - len(have)), want + (0,) * (width - len(want))
+        ok = {
+            ">=": a >= b,
+            "<=": a <= b,
+            ">": a > b,
+            "<": a < b,
+            "==": a == b,
+            "=": a == b,
+        }[op]
+        if not ok:
+            return False
+    return True
+
+
+def index_crate_versions(workspace: Path, crates: set[str]) -> dict[str, dict[str, Path]]:
+    """crate -> version -> BUCK path, for the requested crates only."""
+    root = workspace / CRATES_DIR
+    index: dict[str, dict[str, Path]] = {}
+    try:
+        entries = list(os.scandir(root))
+    except FileNotFoundError:
+        return index
+    for crate_entry in entries:
+        if crate_entry.name not in crates or not crate_entry.is_dir():
+            continue
+        for version_entry in os.scandir(crate_entry.path):
+            buck = Path(version_entry.path) / "BUCK"
+            if version_entry.is_dir() and buck.is_file():
+                index.setdefault(crate_entry.name, {})[version_entry.name] = buck
+    return index
+
+
+def find_rule_call(contents: str, rule: str, crate: str) -> tuple[int, int] | None:
+    """(start, end) offsets of the `rule(...)` call for `crate`, end at its closing ")"."""
+    for match in re.finditer(rf"^{re.escape(rule)}\($", contents, flags=re.MULTILINE):
+        close = re.search(r"^\)", contents[match.end() :], flags=re.MULTILINE)
+        if not close:
+            continue
+        start, end = match.start(), match.end() + close.start()
+        body = contents[start:end]
+        # A BUCK file normally has one buildscript_run; prefer the crate's own.
+        if f'"{crate}' in body or rule != "buildscript_run":
+            return start, end
+    return None
+
+
+def render_starlark(value: Any, indent: str) -> str:
+    """Starlark literal in the generator's layout (one item per line, trailing commas)."""
+    inner = indent + "    "
+    if isinstance(value, dict):
+        items = "".join(
+            f"{inner}{json.dumps(key)}: {render_starlark(item, inner)},\n"
+            for key, item in value.items()
+        )
+        return "{\n" + items + indent + "}"
+    if isinstance(value, (list, tuple)):
+        items = "".join(f"{inner}{render_starlark(item, inner)},\n" for item in value)
+        return "[\n" + items + indent + "]"
+    if isinstance(value, bool):
+        return "True" if value else "False"
+    return json.dumps(value)
+
+
+def render_platform_entry(patch: CratePatch, indent: str) -> str:
+    value: dict[str, Any] = {}
+    if patch.env:
+        value["env"] = patch.env
+    value.update(patch.attrs)
+    return f"{indent}{json.dumps(patch.triple)}: {render_starlark(value, indent)},\n"
+
+
+def already_applied(call: str, patch: CratePatch) -> bool:
+    return f'"{patch.triple}"' in call and all(f'"{key}"' in call for key in patch.env)
+
+
+def apply_to_contents(contents: str, patch: CratePatch) -> tuple[str, str]:
+    """Apply one patch to a BUCK file's text; returns (new contents, status)."""
+    span = find_rule_call(contents, patch.rule, patch.crate)
+    if span is None:
+        return contents, f"no {patch.rule}() call found"
+    start, end = span
+    call = contents[start:end]
+    if already_applied(call, patch):
+        return contents, "already applied"
+    if f"{json.dumps(patch.triple)}:" in call:
+        # A second entry for the same triple would be a duplicate dict key.
+        return contents, f"{patch.triple} already configured differently; skipped"
+    platform = re.search(r"^(?P<indent>\s*)platform = \{\n", call, flags=re.MULTILINE)
+    if platform:
+        # Merge into the existing platform dict as a new triple entry.
+        insert_at = start + platform.end()
+        entry = render_platform_entry(patch, platform.group("indent") + "    ")
+    else:
+        insert_at = end
+        entry = "    platform = {\n" + render_platform_entry(patch, "        ") + "    },\n"
+    return contents[:insert_at] + entry + contents[insert_at:], "applied"
+
+
+def apply_crate_patches(
+    workspace: Path, target: str | None, patches: tuple[CratePatch, ...] = PATCHES
+) -> list[dict[str, str]]:
+    """Apply every registered patch for `target` in one pass; returns per-file results."""
+    selected = [p for p in patches if p.targets is None or target in p.targets]
+    if not selected:
+        return []
+    index = index_crate_versions(workspace, {p.crate for p in selected})
+
+    by_file: dict[Path, list[CratePatch]] = {}
+    for patch in selected:
+        matched = [
+            buck
+            for version, buck in sorted(index.get(patch.crate, {}).items())
+            if version_matches(version, patch.versions)
+        ]
+        if not matched:
+            print(f"[warn] {patch.name}: no {patch.crate} {patch.versions} under {CRATES_DIR}")
+        for buck in matched:
+            by_file.setdefault(buck, []).append(patch)
+
+    results: list[dict[str, str]] = []
+    for buck, file_patches in by_file.items():
+        original = buck.read_text()
+        contents = original
+        for patch in file_patches:
+            contents, status = apply_to_contents(contents, patch)
+            rel = str(buck.relative_to(workspace))
+            results.append({"patch": patch.name, "file": rel, "status": status})
+            level = "ok" if status == "applied" else "info" if status == "already applied" else "warn"
+            print(f"[{level}] {patch.name}: {status} ({rel})")
+        if contents != original:
+            write_text_cow(buck, contents)
+    return results
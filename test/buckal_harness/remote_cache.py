@@ -0,0 +1,381 @@
+"""
+Local remote-cache server shared by harness runs.
+
+Every temp workspace starts with an empty buck-out, so identical crate builds
+are repeated for every run, sample and platform. With `--remote-cache DIR` the
+harness starts `bazel-remote` (a disk-backed Remote Execution API cache that
+buck2's RE client speaks) on a free localhost port, storing objects in DIR,
+and points the workspace's `[buck2_re_client]` at it. Concurrent runs with the
+same DIR (e.g. the targets of a multi-target run) share one server, which the
+last of them stops. `--remote-cache-address` uses a server that is already
+running instead.
+
+Buck2 only reads from and writes to the cache for actions whose execution
+platform sets `remote_cache_enabled = True` and `allow_cache_uploads = True`
+in its `CommandExecutorConfig`. The buckal bundles' platforms do not, so
+`platform_caching()` checks this first; the harness refuses to wire up the
+cache (and restart the daemon for it) when no platform enables caching,
+unless `--remote-cache-force` is given.
+
+Hit rates come from `buck2 log what-ran --format json` for the last command:
+an action whose executor is a cache counts as a hit. Phases that run several
+buck2 commands at once (sharded tests) are counted from their event logs
+instead, since what-ran only sees the last of them.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import signal
+import socket
+import subprocess
+import time
+import urllib.request
+from pathlib import Path
+from typing import IO, Any
+
+try:
+    import fcntl
+except ImportError:  # Windows: no locking, so each run starts and stops its own server.
+    fcntl = None  # type: ignore[assignment]
+
+from buckal_harness.event_log import iter_actions
+from buckconfig import BuckConfig
+
+STARTUP_TIMEOUT_S = 30.0
+CHECK_ISOLATION_DIR = "buckal-remote-cache-check"
+# Both must be true in an execution platform's CommandExecutorConfig.
+CACHE_FLAG_RES = tuple(
+    re.compile(rf"{name}\W{{0,3}}[=:]\s*true", re.IGNORECASE)
+    for name in ("remote_cache_enabled", "allow_cache_uploads")
+)
+PLATFORM_SOURCE_SUFFIXES = (".bzl", ".bxl")
+PLATFORM_SOURCE_NAMES = frozenset({"BUCK", "BUCK.v2", "TARGETS"})
+PLATFORM_SKIP_DIRS = frozenset({".git", "buck-out", "target", "third-party", "prelude"})
+
+
+def parse_address(address: str) -> tuple[str, int]:
+    """("host", port) of a grpc://host:port address."""
+    hostport = address.split("://", 1)[-1].rstrip("/")
+    host, _, port = hostport.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def port_open(host: str, port: int) -> bool:
+    try:
+        with socket.create_connection((host, port), timeout=0.5):
+            return True
+    except OSError:
+        return False
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def is_bazel_remote(http_port: int) -> bool:
+    """Whether the HTTP listener on `http_port` answers bazel-remote's /status."""
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{http_port}/status", timeout=2) as resp:
+            status = json.loads(resp.read().decode("utf-8"))
+    except (OSError, ValueError):
+        return False
+    return isinstance(status, dict) and "MaxSize" in status
+
+
+class LocalCacheServer:
+    """A bazel-remote process storing its cache in `root`, shared by concurrent runs.
+
+    The server is described by `root/server.json` (pid and ports) and is only
+    reused when that pid is alive and its HTTP port answers bazel-remote's
+    /status; otherwise a new one is started on a free port. Every run using
+    the server holds a shared flock on `root/users.lock`; `stop()` terminates
+    the server only when no other run holds it, and only if the harness
+    started it. `root/server.lock` serializes these start/stop decisions.
+    Without fcntl (Windows) no server is shared: each run starts its own and
+    stops it.
+    """
+
+    def __init__(self, root: Path, max_gb: float, port: int | None = None) -> None:
+        self.root = root
+        self.max_gb = max_gb
+        self.port = port
+        self.address: str | None = None
+        self.process: subprocess.Popen | None = None
+        self._log: IO[bytes] | None = None
+        self._users: IO[bytes] | None = None
+
+    def _state_path(self) -> Path:
+        return self.root / "server.json"
+
+    def _running_server(self) -> dict[str, Any] | None:
+        try:
+            state = json.loads(self._state_path().read_text())
+        except (OSError, ValueError):
+            return None
+        if not pid_alive(int(state.get("pid", 0))) or not is_bazel_remote(state["http_port"]):
+            return None
+        return state
+
+    def _locked(self) -> IO[bytes]:
+        self.root.mkdir(parents=True, exist_ok=True)
+        lock = (self.root / "server.lock").open("ab")
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        return lock
+
+    def start(self) -> str:
+        """Start the server (or join the one recorded in root); returns its address."""
+        with self._locked():
+            state = self._running_server() if fcntl is not None else None
+            if state is not None:
+                self.address = f"grpc://127.0.0.1:{state['port']}"
+                print(f"[info] reusing the remote cache at {self.address} (pid {state['pid']})")
+            else:
+                self._spawn()
+            self._users = (self.root / "users.lock").open("ab")
+            if fcntl is not None:
+                fcntl.flock(self._users, fcntl.LOCK_SH)
+        assert self.address is not None
+        return self.address
+
+    def _spawn(self) -> None:
+        binary = os.environ.get("BAZEL_REMOTE") or shutil.which("bazel-remote")
+        if not binary:
+            raise RuntimeError(
+                "bazel-remote not found; install it (or set BAZEL_REMOTE) for --remote-cache, "
+                "or pass --remote-cache-address for a running server"
+            )
+        port = self.port or free_port()
+        http_port = free_port()
+        if port_open("127.0.0.1", port):
+            raise RuntimeError(f"port {port} is already in use; cannot start bazel-remote on it")
+        self._log = (self.root / "bazel-remote.log").open("ab")
+        cmd = [
+            binary,
+            "--dir",
+            str(self.root / "cas"),
+            "--max_size",
+            str(max(1, round(self.max_gb))),
+            "--grpc_address",
+            f"127.0.0.1:{port}",
+            "--http_address",
+            f"127.0.0.1:{http_port}",
+        ]
+        print(f"+ {' '.join(cmd)}")
+        # Own session: a Ctrl-C in this run must not kill a server other runs share.
+        self.process = subprocess.Popen(
+            cmd, stdout=self._log, stderr=subprocess.STDOUT, start_new_session=True
+        )
+        deadline = time.monotonic() + STARTUP_TIMEOUT_S
+        while not port_open("127.0.0.1", port):
+            if self.process.poll() is not None or time.monotonic() > deadline:
+                self._terminate(self.process.pid)
+                raise RuntimeError(
+                    f"bazel-remote did not start; see {self.root / 'bazel-remote.log'}"
+                )
+            time.sleep(0.1)
+        self._state_path().write_text(
+            json.dumps({"pid": self.process.pid, "port": port, "http_port": http_port}) + "\n"
+        )
+        self.address = f"grpc://127.0.0.1:{port}"
+        print(f"[ok] remote cache listening on {self.address} (storage: {self.root})")
+
+    def _terminate(self, pid: int) -> None:
+        if self.process is not None and self.process.pid == pid:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+            return
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            return
+        deadline = time.monotonic() + 10
+        while pid_alive(pid) and time.monotonic() < deadline:
+            time.sleep(0.1)
+        if pid_alive(pid):
+            os.kill(pid, signal.SIGKILL)
+
+    def stop(self) -> None:
+        """Leave the server; the last run still using a harness-started server stops it."""
+        if self._users is None:
+            return
+        with self._locked():
+            self._users.close()
+            self._users = None
+            if fcntl is None:
+                if self.process is not None:
+                    self._terminate(self.process.pid)
+                self._state_path().unlink(missing_ok=True)
+            else:
+                self._leave_shared()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def _leave_shared(self) -> None:
+        """Stop the recorded server unless another run still holds users.lock."""
+        with (self.root / "users.lock").open("ab") as users:
+            try:
+                fcntl.flock(users, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                print("[info] remote cache left running for other harness runs")
+            else:
+                state = self._running_server()
+                if state is not None:
+                    self._terminate(int(state["pid"]))
+                self._state_path().unlink(missing_ok=True)
+
+
+def execution_platforms(workspace: Path) -> list[str]:
+    value = None
+    for name in (".buckconfig", ".buckconfig.local"):
+        value = BuckConfig.load(workspace / name).get("build", "execution_platforms", value)
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+def caching_in_sources(workspace: Path) -> list[str]:
+    """Workspace BUCK/.bzl files that set both cache flags of a CommandExecutorConfig."""
+    found = []
+    for dirpath, dirnames, filenames in os.walk(workspace):
+        dirnames[:] = [d for d in dirnames if d not in PLATFORM_SKIP_DIRS]
+        for name in filenames:
+            if name not in PLATFORM_SOURCE_NAMES and not name.endswith(PLATFORM_SOURCE_SUFFIXES):
+                continue
+            path = Path(dirpath) / name
+            text = path.read_text(encoding="utf-8", errors="replace")
+            if all(flag.search(text) for flag in CACHE_FLAG_RES):
+                found.append(str(path.relative_to(workspace)))
+    return found
+
+
+def platform_caching(workspace: Path, env: dict[str, str]) -> dict[str, Any]:
+    """Whether the workspace's execution platforms let buck2 read and write a remote cache.
+
+    Checks the providers of `[build] execution_platforms` (with a throwaway
+    daemon under its own isolation dir), then the workspace's own BUCK/.bzl
+    sources, for `remote_cache_enabled` and `allow_cache_uploads` set to true.
+    """
+    platforms = execution_platforms(workspace)
+    result: dict[str, Any] = {"execution_platforms": platforms, "enabled": False}
+    if platforms:
+        isolated = ["buck2", "--isolation-dir", CHECK_ISOLATION_DIR]
+        try:
+            audit = subprocess.run(
+                [*isolated, "audit", "providers", *platforms],
+                cwd=workspace,
+                env=env,
+                text=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                check=False,
+            )
+        finally:
+            subprocess.run([*isolated, "kill"], cwd=workspace, env=env, check=False)
+        if audit.returncode == 0 and all(flag.search(audit.stdout) for flag in CACHE_FLAG_RES):
+            result.update(enabled=True, source="buck2 audit providers")
+            return result
+    sources = caching_in_sources(workspace)
+    if sources:
+        result.update(enabled=True, source=", ".join(sources))
+    return result
+
+
+def configure_remote_cache(workspace: Path, address: str) -> bool:
+    """Point the workspace's buck2 RE client at `address`; True if .buckconfig changed.
+
+    [buck2_re_client] is read at daemon startup, so a change makes the daemon
+    manager restart the daemon (see daemon.config_fingerprint).
+    """
+    path = workspace / ".buckconfig"
+    config = BuckConfig.load(path)
+    config.apply(
+        {
+            "buck2_re_client.engine_address": address,
+            "buck2_re_client.action_cache_address": address,
+            "buck2_re_client.cas_address": address,
+            "buck2_re_client.tls": "false",
+        }
+    )
+    return config.save(path)
+
+
+def executor_of(record: dict[str, Any]) -> str:
+    reproducer = record.get("reproducer")
+    if isinstance(reproducer, dict):
+        return str(reproducer.get("executor", "")).lower()
+    return str(record.get("executor", "")).lower()
+
+
+def cache_stats(workspace: Path, env: dict[str, str]) -> dict[str, Any] | None:
+    """Action counts by executor for the last buck2 command, or None if unavailable."""
+    result = subprocess.run(
+        ["buck2", "log", "what-ran", "--format", "json"],
+        cwd=workspace,
+        env=env,
+        text=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        check=False,
+    )
+    if result.returncode != 0:
+        return None
+    executors: dict[str, int] = {}
+    for line in result.stdout.splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(record, dict):
+            executor = executor_of(record) or "unknown"
+            executors[executor] = executors.get(executor, 0) + 1
+    actions = sum(executors.values())
+    hits = sum(count for executor, count in executors.items() if "cache" in executor)
+    return {
+        "actions": actions,
+        "cache_hits": hits,
+        "hit_rate": round(hits / actions, 4) if actions else None,
+        "executors": executors,
+    }
+
+
+def cache_stats_from_event_logs(event_logs: list[Path]) -> dict[str, Any] | None:
+    """Action counts by execution kind over several invocations' event logs."""
+    executors: dict[str, int] = {}
+    hits = 0
+    for path in event_logs:
+        try:
+            actions = list(iter_actions(path))
+        except OSError:
+            continue
+        for action in actions:
+            executors[action.kind] = executors.get(action.kind, 0) + 1
+            hits += action.cached
+    if not executors:
+        return None
+    actions_total = sum(executors.values())
+    return {
+        "actions": actions_total,
+        "cache_hits": hits,
+        "hit_rate": round(hits / actions_total, 4),
+        "executors": executors,
+    }
@@ -0,0 +1,124 @@
+"""
+Per-phase timing for a harness run and the `--report run.json` it writes.
+
+Every phase (a command run through `run()`, or a Python step such as
+materializing the workspace) records wall time, the CPU time of child
+processes (`resource.getrusage(RUSAGE_CHILDREN)`), the children's peak RSS and
+the exit code.
+
+Caveats:
+- Buck2 actions execute in the buck2 daemon, which is not our child, so CPU
+  time for buck2 phases only covers the client process.
+- `ru_maxrss` for children is a high-water mark over the whole run; a phase's
+  peak RSS is only reported when that phase raised it.
+- `resource` is unavailable on Windows; CPU/RSS are omitted there.
+"""
+
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+
+@dataclass
+class PhaseRecord:
+    name: str
+    started_at: str
+    wall_s: float
+    cpu_user_s: float | None = None
+    cpu_sys_s: float | None = None
+    peak_rss_mb: float | None = None
+    exit_code: int | None = 0
+    cmd: list[str] | None = None
+    error: str | None = None
+
+
+def children_usage() -> tuple[float, float, float] | None:
+    """(user seconds, system seconds, max RSS in MiB) of waited-for children."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss is KiB on Linux but bytes on macOS.
+    rss_mb = usage.ru_maxrss / (2**20 if sys.platform == "darwin" else 2**10)
+    return usage.ru_utime, usage.ru_stime, rss_mb
+
+
+@dataclass
+class RunReport:
+    target: str | None = None
+    started_at: str = field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
+    phases: list[PhaseRecord] = field(default_factory=list)
+    sections: dict[str, Any] = field(default_factory=dict)
+    t0: float = field(default_factory=time.monotonic, repr=False)
+
+    @contextmanager
+    def phase(self, name: str, cmd: list[str] | None = None) -> Iterator[PhaseRecord]:
+        record = PhaseRecord(
+            name=name, started_at=datetime.now().isoformat(timespec="seconds"), wall_s=0.0, cmd=cmd
+        )
+        before = children_usage()
+        start = time.monotonic()
+        try:
+            yield record
+        except subprocess.CalledProcessError as exc:
+            record.exit_code = exc.returncode
+            raise
+        except SystemExit as exc:
+            record.exit_code = exc.code if isinstance(exc.code, int) else 1
+            record.error = None if isinstance(exc.code, int) else str(exc.code)
+            raise
+        except BaseException as exc:
+            record.exit_code = None
+            record.error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            record.wall_s = time.monotonic() - start
+            after = children_usage()
+            if before and after:
+                record.cpu_user_s = after[0] - before[0]
+                record.cpu_sys_s = after[1] - before[1]
+                if after[2] > before[2]:
+                    record.peak_rss_mb = after[2]
+            self.phases.append(record)
+
+    def add_section(self, name: str, data: Any) -> None:
+        self.sections[name] = data
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "target": self.target,
+            "started_at": self.started_at,
+            "total_wall_s": time.monotonic() - self.t0,
+            "phases": [asdict(p) for p in self.phases],
+            **self.sections,
+        }
+
+    def write(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), indent=2) + "\n")
+        print(f"[ok] wrote run report to {path}")
+
+    def summary_table(self) -> str:
+        if not self.phases:
+            return "(no phases recorded)"
+        width = max(len("phase"), *(len(p.name) for p in self.phases))
+        lines = [f"{'phase':<{width}}  {'wall':>8}  {'cpu':>8}  {'rss MiB':>8}  exit"]
+        for p in self.phases:
+            cpu = "-" if p.cpu_user_s is None else f"{p.cpu_user_s + (p.cpu_sys_s or 0):.1f}s"
+            rss = "-" if p.peak_rss_mb is None else f"{p.peak_rss_mb:.0f}"
+            code = "-" if p.exit_code is None else str(p.exit_code)
+            lines.append(f"{p.name:<{width}}  {p.wall_s:>7.1f}s  {cpu:>8}  {rss:>8}  {code}")
+        lines.append(f"{'total':<{width}}  {time.monotonic() - self.t0:>7.1f}s")
+        return "\n".join(lines)
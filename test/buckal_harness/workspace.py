@@ -0,0 +1,217 @@
+"""
+Materialize a sample workspace for a harness run.
+
+`shutil.copytree` copies every byte of the sample (including `.git` and any
+vendored crates) on every run. The strategies here avoid that where the
+filesystem allows it:
+
+- reflink:  clone each file with the FICLONE ioctl (btrfs, xfs, ...).
+- hardlink: hardlink every file, but copy the files the harness or cargo-buckal
+            rewrites in place. Linked files share their inode (and mode) with
+            the sample checkout and are left untouched, so a tool that writes
+            one in place also changes the sample.
+- worktree: `git worktree add --detach` for clean git-backed samples. Ignored
+            files and submodule contents are not part of the worktree.
+- copy:     plain `shutil.copytree`.
+
+`auto` tries reflink, then copy; hardlink and worktree trade isolation or
+completeness for speed and are only used when asked for. Each strategy is
+probed on a single file first so an unsupported filesystem (or a
+cross-device temp dir) fails fast.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+
+
+STRATEGIES = ("auto", "reflink", "hardlink", "worktree", "copy")
+AUTO_ORDER = ("reflink", "copy")
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+# Files that are rewritten in place during a run. A hardlink farm copies these
+# instead of linking them; everything else is only ever replaced or created.
+COW_FILE_NAMES = frozenset(
+    {".buckconfig", ".buckroot", "BUCK", "Cross.toml", "buckal.snap", "Cargo.toml", "Cargo.lock"}
+)
+# Top-level directories that cargo-buckal regenerates wholesale.
+COW_DIR_NAMES = frozenset({"buckal", "toolchains", "platforms"})
+
+
+@dataclass
+class Materialized:
+    path: Path
+    strategy: str
+    seconds: float
+    cleanup: Callable[[], None] = field(default=lambda: None)
+
+
+def reflink_file(src: str, dst: str) -> str:
+    if fcntl is None:
+        raise OSError("reflink is not supported on this platform")
+    with open(src, "rb") as src_fp, open(dst, "wb") as dst_fp:
+        fcntl.ioctl(dst_fp.fileno(), FICLONE, src_fp.fileno())
+    shutil.copystat(src, dst)
+    return dst
+
+
+def is_cow_path(src_root: Path, src: str) -> bool:
+    path = Path(src)
+    if path.name in COW_FILE_NAMES:
+        return True
+    rel = path.relative_to(src_root)
+    return len(rel.parts) > 1 and rel.parts[0] in COW_DIR_NAMES
+
+
+def hardlink_copier(src_root: Path) -> Callable[[str, str], str]:
+    def copy(src: str, dst: str) -> str:
+        if is_cow_path(src_root, src):
+            return shutil.copy2(src, dst)
+        os.link(src, dst)
+        return dst
+
+    return copy
+
+
+def write_text_cow(path: Path, contents: str) -> None:
+    """Write via a temp file + rename so a hardlinked file is never modified in place."""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(contents)
+    os.replace(tmp, path)
+
+
+def probe_file(src_root: Path) -> Path | None:
+    for name in ("Cargo.toml", "README.md"):
+        candidate = src_root / name
+        if candidate.is_file():
+            return candidate
+    for candidate in src_root.iterdir():
+        if candidate.is_file() and not candidate.is_symlink():
+            return candidate
+    return None
+
+
+def probe(copier: Callable[[str, str], str], src_root: Path, dst_parent: Path) -> None:
+    """Try the copier on one file; raises OSError if the strategy can't work here."""
+    sample = probe_file(src_root)
+    if sample is None:
+        raise OSError(f"no regular file to probe in {src_root}")
+    target = dst_parent / f".probe-{os.getpid()}-{sample.name}"
+    try:
+        copier(str(sample), str(target))
+    finally:
+        target.unlink(missing_ok=True)
+
+
+def git_worktree_clean(src_root: Path) -> bool:
+    if not (src_root / ".git").exists():
+        return False
+    result = subprocess.run(
+        ["git", "status", "--porcelain"],
+        cwd=src_root,
+        text=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    return result.returncode == 0 and not result.stdout.strip()
+
+
+def worktree_omissions(src_root: Path) -> list[str]:
+    """What a worktree of `src_root` lacks compared with the checkout on disk."""
+    missing = []
+    ignored = subprocess.run(
+        ["git", "status", "--porcelain", "--ignored"],
+        cwd=src_root,
+        text=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    ).stdout
+    count = sum(1 for line in ignored.splitlines() if line.startswith("!! "))
+    if count:
+        missing.append(f"{count} ignored paths")
+    if (src_root / ".gitmodules").exists():
+        missing.append("submodule contents")
+    return missing
+
+
+def add_worktree(src_root: Path, dst: Path) -> Callable[[], None]:
+    subprocess.run(
+        ["git", "worktree", "add", "--detach", str(dst), "HEAD"],
+        cwd=src_root,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+    def cleanup() -> None:
+        subprocess.run(
+            ["git", "worktree", "remove", "--force", str(dst)],
+            cwd=src_root,
+            check=False,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        subprocess.run(["git", "worktree", "prune"], cwd=src_root, check=False)
+
+    return cleanup
+
+
+def try_strategy(strategy: str, src_root: Path, dst: Path) -> Callable[[], None]:
+    """Materialize with one strategy or raise OSError/CalledProcessError."""
+    if strategy == "worktree":
+        if not git_worktree_clean(src_root):
+            raise OSError(f"{src_root} is not a clean git checkout")
+        missing = worktree_omissions(src_root)
+        if missing:
+            print(f"[warn] git worktree of {src_root} does not include: {', '.join(missing)}")
+        return add_worktree(src_root, dst)
+
+    if strategy == "reflink":
+        copier: Callable[[str, str], str] = reflink_file
+        probe(copier, src_root, dst.parent)
+    elif strategy == "hardlink":
+        copier = hardlink_copier(src_root)
+        # Probe with a raw link: the probe file may be one the farm copies.
+        probe(lambda src, dst: os.link(src, dst) or dst, src_root, dst.parent)
+    else:
+        copier = shutil.copy2
+    try:
+        shutil.copytree(src_root, dst, copy_function=copier)
+    except shutil.Error as exc:
+        shutil.rmtree(dst, ignore_errors=True)
+        raise OSError(str(exc)) from exc
+    return lambda: None
+
+
+def materialize_workspace(
+    src_root: Path, dst: Path, strategy: str = "auto", allow_worktree: bool = True
+) -> Materialized:
+    """Create `dst` as a private copy of `src_root`, using the cheapest strategy that works."""
+    order = AUTO_ORDER if strategy == "auto" else (strategy, "copy")
+    if not allow_worktree:
+        order = tuple(candidate for candidate in order if candidate != "worktree")
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    start = time.monotonic()
+    for candidate in dict.fromkeys(order):
+        try:
+            cleanup = try_strategy(candidate, src_root, dst)
+        except (OSError, subprocess.CalledProcessError) as exc:
+            if candidate == "copy":
+                raise
+            if strategy != "auto":
+                print(f"[warn] {candidate} materialization failed ({exc}); falling back to copy.")
+            continue
+        return Materialized(dst, candidate, time.monotonic() - start, cleanup)
+    raise AssertionError("unreachable: copy strategy always returns or raises")
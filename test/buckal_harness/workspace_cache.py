@@ -0,0 +1,245 @@
+"""
+Persistent warm workspaces for repeat harness runs.
+
+A temp workspace is thrown away after every run, and buck-out goes with it, so
+the next build of the same sample is cold. With `--workspace-cache DIR` the
+harness keeps one workspace per (target, sample HEAD, cargo-buckal HEAD,
+bundle HEAD, generation flags) under DIR instead:
+
+- The first run materializes the entry like a temp workspace.
+- Later runs re-sync only the sample files whose size/mtime changed since the
+  last sync (and delete files removed from the sample). Generated files and
+  buck-out are left alone, so the build is incremental.
+- Entries are evicted least-recently-used first once the cache grows past its
+  size cap.
+
+Each entry is locked (flock) while a run uses it; a second concurrent run of the
+same key gets None from `acquire` and falls back to a temp workspace.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO
+
+from buckal_harness.workspace import materialize_workspace
+
+try:
+    import fcntl
+except ImportError:  # Windows: no locking, runs must not overlap.
+    fcntl = None  # type: ignore[assignment]
+
+
+META_FILE = "cache-entry.json"
+LOCK_FILE = ".lock"
+
+
+def git_head(path: Path) -> str | None:
+    result = subprocess.run(
+        ["git", "rev-parse", "HEAD"],
+        cwd=path,
+        text=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip() or None
+
+
+def cache_key_parts(
+    target: str, sample_dir: Path, cargo_buckal_dir: Path, bundle_dir: Path, flags: list[str]
+) -> dict[str, str]:
+    return {
+        "target": target,
+        "sample_head": git_head(sample_dir) or "nogit",
+        "cargo_buckal_head": git_head(cargo_buckal_dir) or "nogit",
+        "bundle_head": git_head(bundle_dir) or "nogit",
+        "flags": " ".join(sorted(flags)),
+    }
+
+
+def cache_key(parts: dict[str, str]) -> str:
+    digest = hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+    return f"{parts['target']}-{digest[:16]}"
+
+
+def scan_tree(root: Path) -> dict[str, list[int]]:
+    """Map relative path -> [size, mtime_ns] for every file under root."""
+    manifest: dict[str, list[int]] = {}
+    for dirpath, _dirnames, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            manifest[os.path.relpath(path, root)] = [st.st_size, st.st_mtime_ns]
+    return manifest
+
+
+def tree_size(root: Path) -> int:
+    total = 0
+    for dirpath, _dirnames, filenames in os.walk(root):
+        for name in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_size
+            except OSError:
+                continue
+    return total
+
+
+def sync_tree(
+    src: Path, dst: Path, previous: dict[str, list[int]]
+) -> tuple[dict[str, list[int]], int, int]:
+    """Copy files that changed in src since `previous`; drop files that left src.
+
+    Returns (new manifest, files copied, files removed).
+    """
+    current = scan_tree(src)
+    copied = 0
+    for rel, stat in current.items():
+        target = dst / rel
+        if previous.get(rel) == stat and target.exists():
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Copy next to the target and rename, so a hardlinked file is replaced
+        # rather than written through.
+        tmp = target.with_name(f".{target.name}.sync-tmp")
+        shutil.copy2(src / rel, tmp)
+        os.replace(tmp, target)
+        copied += 1
+    removed = 0
+    for rel in previous.keys() - current.keys():
+        (dst / rel).unlink(missing_ok=True)
+        removed += 1
+    return current, copied, removed
+
+
+def try_lock(path: Path) -> IO[str] | None:
+    """Take an exclusive non-blocking lock; returns the open handle or None if busy."""
+    fp = path.open("a+")
+    if fcntl is None:
+        return fp
+    try:
+        fcntl.flock(fp.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        fp.close()
+        return None
+    return fp
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    entry_dir: Path
+    workspace: Path
+    lock: IO[str]
+    manifest: dict[str, list[int]]
+    parts: dict[str, str]
+    reused: bool
+
+
+class WorkspaceCache:
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def acquire(self, parts: dict[str, str], sample_dir: Path, strategy: str) -> CacheEntry | None:
+        key = cache_key(parts)
+        entry_dir = self.root / key
+        entry_dir.mkdir(parents=True, exist_ok=True)
+        lock = try_lock(entry_dir / LOCK_FILE)
+        if lock is None:
+            return None
+
+        workspace = entry_dir / parts["target"]
+        meta = self.read_meta(entry_dir)
+        start = time.monotonic()
+        if workspace.exists() and meta is not None:
+            manifest, copied, removed = sync_tree(sample_dir, workspace, meta.get("manifest", {}))
+            print(
+                f"[ok] Reusing cached workspace {workspace}: re-synced {copied} changed and "
+                f"removed {removed} deleted files in {time.monotonic() - start:.2f}s"
+            )
+            reused = True
+        else:
+            shutil.rmtree(workspace, ignore_errors=True)
+            # A git worktree would leave bookkeeping in the sample repo for as
+            # long as the entry lives, so cache entries never use one.
+            materialized = materialize_workspace(
+                sample_dir, workspace, strategy=strategy, allow_worktree=False
+            )
+            manifest = scan_tree(sample_dir)
+            print(
+                f"[ok] Created cached workspace {workspace} via {materialized.strategy} "
+                f"in {materialized.seconds:.2f}s"
+            )
+            reused = False
+        return CacheEntry(key, entry_dir, workspace, lock, manifest, parts, reused)
+
+    def release(self, entry: CacheEntry) -> None:
+        meta = {
+            "key": entry.key,
+            "parts": entry.parts,
+            "last_used": time.time(),
+            "size": tree_size(entry.entry_dir),
+            "manifest": entry.manifest,
+        }
+        tmp = entry.entry_dir / f"{META_FILE}.tmp"
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, entry.entry_dir / META_FILE)
+        entry.lock.close()
+        self.evict(keep=entry.entry_dir)
+
+    @staticmethod
+    def read_meta(entry_dir: Path) -> dict | None:
+        try:
+            return json.loads((entry_dir / META_FILE).read_text())
+        except (OSError, ValueError):
+            return None
+
+    def evict(self, keep: Path | None = None) -> None:
+        """Drop least-recently-used entries (never `keep`) until the cache fits in max_bytes."""
+        entries: list[tuple[float, int, Path]] = []
+        for entry_dir in self.root.iterdir():
+            if not entry_dir.is_dir() or entry_dir == keep:
+                continue
+            meta = self.read_meta(entry_dir)
+            if meta is None:
+                continue
+            entries.append((float(meta.get("last_used", 0)), int(meta.get("size", 0)), entry_dir))
+        total = sum(size for _, size, _ in entries)
+        if keep is not None:
+            total += int((self.read_meta(keep) or {}).get("size", 0))
+        for _, size, entry_dir in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            lock = try_lock(entry_dir / LOCK_FILE)
+            if lock is None:
+                continue  # in use by another run
+            try:
+                # Stop any buck2 daemon rooted in the entry before deleting it.
+                meta = self.read_meta(entry_dir) or {}
+                workspace = entry_dir / str(meta.get("parts", {}).get("target", ""))
+                if meta and (workspace / ".buckconfig").exists() and shutil.which("buck2"):
+                    subprocess.run(
+                        ["buck2", "kill"],
+                        cwd=workspace,
+                        check=False,
+                        stdout=subprocess.DEVNULL,
+                        stderr=subprocess.DEVNULL,
+                    )
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            finally:
+                lock.close()
+            total -= size
+            print(f"[info] Evicted cached workspace {entry_dir.name} ({size / 2**30:.2f} GiB)")
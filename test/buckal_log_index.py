@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+"""
+Index dumped CI logs (`log/<date>/<job>_<id>.log`) into a local SQLite database
+and query it.
+
+Each Buck2 "Action failed: <label> (<configuration>) (<category> <id>)" block is
+recorded with its target label, crate name/version, platform triple, the first
+rustc error code and the first error block. Indexing is incremental: a log is
+only re-parsed when its size or mtime changed.
+
+Examples:
+
+    buckal_log_index.py index
+    buckal_log_index.py crates --platform i686 --runs 20
+    buckal_log_index.py errors --code E0425
+    buckal_log_index.py show openssl-sys
+    buckal_log_index.py sql "select crate, count(*) from failures group by crate"
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, TextIO
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+LOG_DIR = REPO_ROOT / "log"
+DEFAULT_DB = LOG_DIR / "index.sqlite3"
+RUN_META = "run.json"
+SCHEMA_VERSION = 1
+# Directories written by github_actions_latest.py (make_date_slug).
+RUN_DIR_RE = re.compile(r"^(?:\d{4}-\d\d-\d\d_\d\d-\d\d|unknown)$")
+
+TIMESTAMP_RE = re.compile(r"^\ufeff?\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(?:\.\d+)?Z ?")
+ANSI_RE = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+ACTION_FAILED_RE = re.compile(
+    r"Action failed: (?P<label>\S+) \((?P<cfg>[^)]*)\)"
+    r"(?: \((?P<category>[\w.-]+)(?: (?P<ident>[^)]*))?\))?"
+)
+ERROR_RE = re.compile(r"^error(?:\[(?P<code>E\d{4})\])?: ")
+THIRD_PARTY_RE = re.compile(r"//third-party/rust/crates/(?P<crate>[^/:]+)/(?P<version>[^/:]+):")
+TRIPLE_RE = re.compile(
+    r"(?<![A-Za-z0-9])(?:x86_64|i686|i586|aarch64|arm|armv7|riscv64gc|powerpc64le|s390x|wasm32)"
+    r"-(?:[a-z0-9_]+-)?(?:linux|windows|darwin|freebsd|netbsd|none|wasi|android|ios)"
+    r"(?:-[a-z0-9_]+)?\b"
+)
+# Lines that end the output of a failed action.
+BLOCK_END_RE = re.compile(r"^(?:Action failed: |BUILD FAILED|Build ID: |##\[|# \S+\.txt$)")
+MAX_BLOCK_LINES = 40
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    dir TEXT UNIQUE NOT NULL,
+    run_id INTEGER,
+    head_sha TEXT,
+    created_at TEXT
+);
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY,
+    run INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    path TEXT UNIQUE NOT NULL,
+    job_name TEXT,
+    job_id INTEGER,
+    platform TEXT,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS failures (
+    id INTEGER PRIMARY KEY,
+    log INTEGER NOT NULL REFERENCES logs(id) ON DELETE CASCADE,
+    label TEXT NOT NULL,
+    configuration TEXT,
+    category TEXT,
+    identifier TEXT,
+    crate TEXT,
+    crate_version TEXT,
+    platform TEXT,
+    error_code TEXT,
+    first_error TEXT,
+    UNIQUE (log, label, configuration, category, identifier)
+);
+CREATE INDEX IF NOT EXISTS failures_crate ON failures (crate);
+CREATE INDEX IF NOT EXISTS failures_platform ON failures (platform);
+CREATE INDEX IF NOT EXISTS failures_code ON failures (error_code);
+"""
+
+
+@dataclass
+class Failure:
+    label: str
+    configuration: str
+    category: str | None
+    identifier: str | None
+    error_code: str | None = None
+    first_error: list[str] = field(default_factory=list)
+    fallback: list[str] = field(default_factory=list)
+    in_error: bool = False
+
+    @property
+    def crate(self) -> tuple[str, str | None]:
+        match = THIRD_PARTY_RE.search(self.label)
+        if match:
+            return match.group("crate"), match.group("version")
+        # First-party: the rule name, without buckal's suffixes.
+        name = self.label.rsplit(":", 1)[-1]
+        return re.sub(r"-(?:build-script-(?:build|run)|unittest|test)$", "", name), None
+
+    def feed(self, line: str) -> None:
+        match = ERROR_RE.match(line)
+        if match:
+            if self.first_error:
+                self.in_error = False
+                return
+            self.error_code = match.group("code")
+            self.first_error.append(line)
+            self.in_error = True
+            return
+        if self.in_error:
+            if not line.strip() or line.startswith(("warning:", "error")):
+                self.in_error = False
+            elif len(self.first_error) < MAX_BLOCK_LINES:
+                self.first_error.append(line)
+            return
+        lowered = line.lower()
+        if not self.first_error and not self.fallback:
+            if "error" in lowered or "panicked" in lowered:
+                self.fallback.append(line)
+
+    def error_text(self) -> str | None:
+        lines = self.first_error or self.fallback
+        return "\n".join(lines) if lines else None
+
+
+def clean_lines(fp: TextIO) -> Iterator[str]:
+    """Log lines without GitHub's timestamp prefix and ANSI colours."""
+    for raw in fp:
+        line = TIMESTAMP_RE.sub("", raw.rstrip("\r\n"), count=1)
+        yield ANSI_RE.sub("", line)
+
+
+def parse_failures(fp: TextIO) -> tuple[list[Failure], list[str]]:
+    """Failed actions plus every triple seen in the log (for platform inference)."""
+    failures: list[Failure] = []
+    triples: list[str] = []
+    current: Failure | None = None
+    for line in clean_lines(fp):
+        if len(triples) < 50:
+            triples.extend(TRIPLE_RE.findall(line))
+        match = ACTION_FAILED_RE.search(line)
+        if match:
+            current = Failure(
+                label=match.group("label"),
+                configuration=match.group("cfg"),
+                category=match.group("category"),
+                identifier=match.group("ident"),
+            )
+            failures.append(current)
+            continue
+        if current is None:
+            continue
+        if BLOCK_END_RE.match(line):
+            current = None
+            continue
+        current.feed(line)
+    return failures, triples
+
+
+def job_from_filename(path: Path) -> tuple[str, int | None]:
+    stem = path.stem
+    name, _, job_id = stem.rpartition("_")
+    if name and job_id.isdigit():
+        return name, int(job_id)
+    return stem, None
+
+
+def infer_platform(job_name: str, failure_cfg: str | None, triples: list[str]) -> str | None:
+    for text in (job_name, failure_cfg or ""):
+        match = TRIPLE_RE.search(text)
+        if match:
+            return match.group(0)
+    if triples:
+        return max(set(triples), key=triples.count)
+    return None
+
+
+def connect(db_path: Path) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version != SCHEMA_VERSION:
+        conn.executescript(
+            "DROP TABLE IF EXISTS failures; DROP TABLE IF EXISTS logs; DROP TABLE IF EXISTS runs;"
+        )
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def run_row(conn: sqlite3.Connection, run_dir: Path, log_root: Path) -> int:
+    rel = str(run_dir.relative_to(log_root))
+    meta: dict = {}
+    try:
+        meta = json.loads((run_dir / RUN_META).read_text())
+    except (OSError, ValueError):
+        pass
+    conn.execute(
+        "INSERT INTO runs (dir, run_id, head_sha, created_at) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT (dir) DO UPDATE SET run_id = excluded.run_id, "
+        "head_sha = excluded.head_sha, created_at = excluded.created_at",
+        (rel, meta.get("id"), meta.get("head_sha"), meta.get("created_at") or rel),
+    )
+    return conn.execute("SELECT id FROM runs WHERE dir = ?", (rel,)).fetchone()[0]
+
+
+def index_log(conn: sqlite3.Connection, run_id: int, path: Path, stat: os.stat_result) -> int:
+    job_name, job_id = job_from_filename(path)
+    with path.open(encoding="utf-8", errors="replace") as fp:
+        failures, triples = parse_failures(fp)
+    conn.execute("DELETE FROM logs WHERE path = ?", (str(path),))
+    log_id = conn.execute(
+        "INSERT INTO logs (run, path, job_name, job_id, platform, size, mtime_ns) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            run_id,
+            str(path),
+            job_name,
+            job_id,
+            infer_platform(job_name, None, triples),
+            stat.st_size,
+            stat.st_mtime_ns,
+        ),
+    ).lastrowid
+    for failure in failures:
+        crate, version = failure.crate
+        conn.execute(
+            "INSERT OR IGNORE INTO failures (log, label, configuration, category, identifier, "
+            "crate, crate_version, platform, error_code, first_error) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                log_id,
+                failure.label,
+                failure.configuration,
+                failure.category,
+                failure.identifier,
+                crate,
+                version,
+                infer_platform(job_name, failure.configuration, triples),
+                failure.error_code,
+                failure.error_text(),
+            ),
+        )
+    return len(failures)
+
+
+def update_index(conn: sqlite3.Connection, log_root: Path, verbose: bool = True) -> None:
+    known = {
+        row["path"]: (row["size"], row["mtime_ns"])
+        for row in conn.execute("SELECT path, size, mtime_ns FROM logs")
+    }
+    seen: set[str] = set()
+    parsed = failures = 0
+    run_dirs = sorted(p for p in log_root.iterdir() if p.is_dir() and RUN_DIR_RE.match(p.name))
+    for run_dir in run_dirs:
+        logs = sorted(p for p in run_dir.glob("*.log") if not p.name.endswith(".err.log"))
+        if not logs:
+            continue
+        run_id = run_row(conn, run_dir, log_root)
+        for path in logs:
+            stat = path.stat()
+            seen.add(str(path))
+            if known.get(str(path)) == (stat.st_size, stat.st_mtime_ns):
+                continue
+            failures += index_log(conn, run_id, path, stat)
+            parsed += 1
+    stale = [path for path in known if path not in seen]
+    conn.executemany("DELETE FROM logs WHERE path = ?", [(path,) for path in stale])
+    conn.execute("DELETE FROM runs WHERE id NOT IN (SELECT run FROM logs)")
+    conn.execute(
+        "INSERT OR REPLACE INTO meta (key, value) VALUES ('indexed_at', ?)",
+        (datetime.now().isoformat(timespec="seconds"),),
+    )
+    conn.commit()
+    if verbose and (parsed or stale):
+        print(
+            f"[info] indexed {parsed} log(s), {failures} failed action(s); "
+            f"dropped {len(stale)} removed log(s)",
+            file=sys.stderr,
+        )
+
+
+def recent_runs_clause(runs: int | None) -> tuple[str, list]:
+    if not runs:
+        return "", []
+    return (
+        " AND l.run IN (SELECT id FROM runs ORDER BY created_at DESC LIMIT ?)",
+        [runs],
+    )
+
+
+def filters(args: argparse.Namespace) -> tuple[str, list]:
+    clause, params = recent_runs_clause(args.runs)
+    if args.platform:
+        clause += " AND f.platform LIKE ?"
+        params.append(f"%{args.platform}%")
+    if getattr(args, "crate", None):
+        clause += " AND f.crate = ?"
+        params.append(args.crate)
+    if getattr(args, "code", None):
+        clause += " AND f.error_code = ?"
+        params.append(args.code)
+    return clause, params
+
+
+def print_rows(rows: list[sqlite3.Row]) -> None:
+    if not rows:
+        print("(no rows)")
+        return
+    columns = rows[0].keys()
+    cells = [["" if row[c] is None else str(row[c]) for c in columns] for row in rows]
+    widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)).rstrip())
+    for r in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(r, widths)).rstrip())
+
+
+def cmd_crates(conn: sqlite3.Connection, args: argparse.Namespace) -> None:
+    clause, params = filters(args)
+    rows = conn.execute(
+        "SELECT f.crate, COUNT(DISTINCT l.run) AS runs, COUNT(*) AS failures, "
+        "GROUP_CONCAT(DISTINCT f.platform) AS platforms, "
+        "GROUP_CONCAT(DISTINCT f.error_code) AS codes "
+        "FROM failures f JOIN logs l ON f.log = l.id WHERE 1" + clause + " "
+        "GROUP BY f.crate ORDER BY runs DESC, failures DESC, f.crate",
+        params,
+    ).fetchall()
+    print_rows(rows)
+
+
+def cmd_errors(conn: sqlite3.Connection, args: argparse.Namespace) -> None:
+    clause, params = filters(args)
+    rows = conn.execute(
+        "SELECT COALESCE(f.error_code, '-') AS code, COUNT(*) AS failures, "
+        "COUNT(DISTINCT f.crate) AS crates, GROUP_CONCAT(DISTINCT f.crate) AS crate_names "
+        "FROM failures f JOIN logs l ON f.log = l.id WHERE 1" + clause + " "
+        "GROUP BY code ORDER BY failures DESC",
+        params,
+    ).fetchall()
+    print_rows(rows)
+
+
+def cmd_show(conn: sqlite3.Connection, args: argparse.Namespace) -> None:
+    clause, params = filters(args)
+    rows = conn.execute(
+        "SELECT r.dir, l.job_name, f.platform, f.label, f.category, f.error_code, f.first_error "
+        "FROM failures f JOIN logs l ON f.log = l.id JOIN runs r ON l.run = r.id "
+        "WHERE 1" + clause + " ORDER BY r.created_at DESC, f.platform LIMIT ?",
+        [*params, args.limit],
+    ).fetchall()
+    for row in rows:
+        print(f"== {row['dir']}  {row['job_name']}  [{row['platform'] or '?'}]")
+        print(f"   {row['label']} ({row['category'] or '?'}) {row['error_code'] or ''}".rstrip())
+        if row["first_error"]:
+            for line in row["first_error"].splitlines():
+                print(f"   | {line}")
+    if not rows:
+        print("(no rows)")
+
+
+def cmd_sql(conn: sqlite3.Connection, args: argparse.Namespace) -> None:
+    print_rows(conn.execute(args.query).fetchall())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--log-dir", default=str(LOG_DIR), help="dumped log root (default: log/)")
+    parser.add_argument(
+        "--db", default=str(DEFAULT_DB), help="index path (default: log/index.sqlite3)"
+    )
+    parser.add_argument(
+        "--no-update", action="store_true", help="query the index without re-scanning logs first"
+    )
+    sub = parser.add_subparsers(dest="command")
+
+    sub.add_parser("index", help="index new or changed logs")
+
+    def add_filters(p: argparse.ArgumentParser) -> None:
+        p.add_argument("--platform", help="substring of the platform triple, e.g. i686")
+        p.add_argument("--runs", type=int, help="only the N most recent runs")
+
+    crates = sub.add_parser("crates", help="crates with failed actions")
+    add_filters(crates)
+    crates.add_argument("--code", help="only this rustc error code, e.g. E0425")
+
+    errors = sub.add_parser("errors", help="failures grouped by rustc error code")
+    add_filters(errors)
+    errors.add_argument("--crate", help="only this crate")
+    errors.add_argument("--code", help="only this rustc error code")
+
+    show = sub.add_parser("show", help="first error block of each failure of a crate")
+    show.add_argument("crate", nargs="?", help="crate name (default: all)")
+    add_filters(show)
+    show.add_argument("--code", help="only this rustc error code")
+    show.add_argument(
+        "--limit", type=int, default=20, help="maximum failures to print (default: 20)"
+    )
+
+    sql = sub.add_parser("sql", help="run a raw SQL query against the index")
+    sql.add_argument("query")
+
+    args = parser.parse_args()
+    log_root = Path(args.log_dir)
+    if not log_root.is_dir():
+        sys.exit(f"No log directory at {log_root}; run github_actions_latest.py --dump-log first")
+
+    conn = connect(Path(args.db))
+    try:
+        if args.command == "index" or not args.no_update:
+            update_index(conn, log_root, verbose=True)
+        if args.command in (None, "index"):
+            total = conn.execute("SELECT COUNT(*) FROM failures").fetchone()[0]
+            logs = conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0]
+            print(f"[ok] {logs} log(s), {total} failed action(s) in {args.db}")
+        elif args.command == "crates":
+            cmd_crates(conn, args)
+        elif args.command == "errors":
+            cmd_errors(conn, args)
+        elif args.command == "show":
+            cmd_show(conn, args)
+        elif args.command == "sql":
+            cmd_sql(conn, args)
+    except sqlite3.Error as exc:
+        sys.exit(f"SQLite error: {exc}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,12 @@ Fetch and print the most recent GitHub Actions workflow run for a repository.
 
 Defaults to yueneiqi/fd-test and uses the GitHub REST API. Authentication is
 optional; set GITHUB_TOKEN to raise rate limits or access private runs.
+
+`--watch` follows the run for a commit (default: HEAD of test/3rd/fd, which is
+what the harness pushes to fd-test). It polls with conditional requests, backs
+off while nothing changes, and prints every job status change. With
+`--dump-log`, each failed b2* job's log is downloaded as soon as that job
+finishes.
 """
 
 from __future__ import annotations
@@ -13,77 +19,31 @@ import json
 import os
 import sys
 from datetime import datetime
-from io import BytesIO
+import io
 from pathlib import Path
 import re
-from typing import Any, Iterable, Tuple
-from urllib.error import HTTPError, URLError
+import statistics
+import subprocess
+import tempfile
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import IO, Any, Iterator, TextIO
 from urllib.parse import urlencode
-from urllib.request import HTTPRedirectHandler, Request, build_opener, urlopen
 import zipfile
 
+from github_api import API_BASE, GitHubClient, GitHubError
+from github_cache import ResponseCache
+from timing_stats import summarize
+
 
-API_BASE = "https://api.github.com"
 DEFAULT_REPO = "yueneiqi/fd-test"
 REPO_ROOT = Path(__file__).resolve().parents[1]
-
-
-def build_request(url: str, token: str | None) -> Request:
-    headers = {
-        "Accept": "application/vnd.github+json",
-        "User-Agent": "buckal-actions-helper/1.0",
-    }
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
-    return Request(url, headers=headers)
-
-
-def fetch_json(url: str, token: str | None) -> Tuple[Any, dict[str, str]]:
-    req = build_request(url, token)
-    with urlopen(req) as resp:
-        payload = json.loads(resp.read().decode("utf-8"))
-        headers = {k: v for k, v in resp.headers.items()}
-        return payload, headers
-
-
-class NoRedirect(HTTPRedirectHandler):
-    """Handler that prevents automatic redirects so we can capture Location."""
-
-    def redirect_request(self, req, fp, code, msg, headers, newurl):
-        return None
-
-
-def fetch_bytes(url: str, token: str | None) -> Tuple[bytes, dict[str, str]]:
-    """
-    Fetch bytes, following at most one external redirect (for Actions log blobs).
-    GitHub's log endpoints return a 302 to a signed blob URL; we grab the
-    Location ourselves to avoid auth issues and then fetch without credentials.
-    """
-    req = build_request(url, token)
-    opener = build_opener(NoRedirect())
-    try:
-        with opener.open(req) as resp:
-            content = resp.read()
-            headers = {k: v for k, v in resp.headers.items()}
-            return content, headers
-    except HTTPError as exc:
-        if exc.code in (301, 302, 303, 307, 308):
-            location = exc.headers.get("Location")
-            if not location:
-                raise
-            # Follow the signed blob URL without GitHub auth headers.
-            req2 = Request(
-                location,
-                headers={
-                    "Accept": "*/*",
-                    "User-Agent": "buckal-actions-helper/1.0",
-                },
-            )
-            with urlopen(req2) as resp2:
-                content = resp2.read()
-                headers = {k: v for k, v in resp2.headers.items()}
-                return content, headers
-        raise
+CACHE_DIR = REPO_ROOT / "log" / ".cache" / "github"
+LOG_CHUNK_CHARS = 1 << 16
+FD_SAMPLE_DIR = REPO_ROOT / "test" / "3rd" / "fd"
+POLL_MIN_S = 5.0
+POLL_MAX_S = 60.0
+POLL_BACKOFF = 1.5
 
 
 def parse_timestamp(ts: str | None) -> str:
@@ -112,44 +72,355 @@ def safe_name(name: str) -> str:
     return cleaned or "job"
 
 
-def latest_run(repo: str, token: str | None, branch: str | None) -> dict[str, Any] | None:
+def latest_run(
+    client: GitHubClient, repo: str, branch: str | None, sha: str | None = None
+) -> dict[str, Any] | None:
     params: dict[str, str] = {"per_page": "1"}
     if branch:
         params["branch"] = branch
-    url = f"{API_BASE}/repos/{repo}/actions/runs"
-    url = f"{url}?{urlencode(params)}"
-    data, _ = fetch_json(url, token)
+    if sha:
+        params["head_sha"] = sha
+    url = f"repos/{repo}/actions/runs?{urlencode(params)}"
+    key = f"{repo}/runs/sha/{sha}" if sha else f"{repo}/runs/latest/{branch or '_all'}"
+    data, _ = client.get_json(url, cache_key=key)
     runs = data.get("workflow_runs", [])
     if not runs:
         return None
     return runs[0]
 
 
-def list_jobs(run_id: int, repo: str, token: str | None) -> list[dict[str, Any]]:
-    url = f"{API_BASE}/repos/{repo}/actions/runs/{run_id}/jobs?per_page=100"
-    data, _ = fetch_json(url, token)
+def list_runs(
+    client: GitHubClient, repo: str, branch: str | None, count: int
+) -> list[dict[str, Any]]:
+    """The `count` most recent runs, newest first.
+
+    Pages after the first are fetched concurrently.
+    """
+    per_page = min(count, 100)
+
+    def page(number: int) -> dict[str, Any]:
+        params = {"per_page": str(per_page), "page": str(number)}
+        if branch:
+            params["branch"] = branch
+        data, _ = client.get_json(
+            f"repos/{repo}/actions/runs?{urlencode(params)}",
+            cache_key=f"{repo}/runs/page/{branch or '_all'}/{per_page}/{number}",
+        )
+        return data
+
+    first = page(1)
+    runs = first.get("workflow_runs", [])
+    pages = min(-(-count // per_page), -(-int(first.get("total_count", 0)) // per_page))
+    for data in client.map(page, range(2, pages + 1)):
+        runs.extend(data.get("workflow_runs", []))
+    return runs[:count]
+
+
+def list_jobs(client: GitHubClient, run: dict[str, Any], repo: str) -> list[dict[str, Any]]:
+    run_id = run["id"]
+    attempt = int(run.get("run_attempt") or 1)
+    data, _ = client.get_json(
+        f"repos/{repo}/actions/runs/{run_id}/attempts/{attempt}/jobs?per_page=100",
+        cache_key=f"{repo}/runs/{run_id}/attempts/{attempt}/jobs",
+        # Jobs of a finished attempt never change again; a re-run is a new attempt.
+        immutable=run.get("status") == "completed",
+    )
     return data.get("jobs", [])
 
 
-def iter_job_logs(job_id: int, repo: str, token: str | None) -> Iterable[tuple[str, str]]:
+def spool_job_log(client: GitHubClient, job: dict[str, Any], repo: str) -> tuple[IO[bytes], str]:
+    """Download a job's log archive into an anonymous temp file.
+
+    Logs of completed jobs are immutable and are served from the response
+    cache when one is configured. Returns the rewound file and the Content-Type.
     """
-    Yield (filename, text) pairs from the job log archive.
+    job_id = int(job["id"])
+    url = f"repos/{repo}/actions/jobs/{job_id}/logs"
+    if client.cache is not None and job.get("status") == "completed":
+        path, headers = client.download_cached(url, f"{repo}/jobs/{job_id}/logs")
+        return path.open("rb"), headers.get("Content-Type", "")
+    spool = tempfile.TemporaryFile()
+    try:
+        headers = client.download(url, spool)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool, headers.get("Content-Type", "")
+
 
-    GitHub returns a zip; we unzip and stream each file's contents.
+def iter_job_logs(spool: IO[bytes], ctype: str) -> Iterator[tuple[str, TextIO]]:
     """
-    url = f"{API_BASE}/repos/{repo}/actions/jobs/{job_id}/logs"
-    raw, headers = fetch_bytes(url, token)
-    ctype = headers.get("Content-Type", "")
-    if "zip" not in ctype and not zipfile.is_zipfile(BytesIO(raw)):
+    Yield (filename, text stream) pairs from a spooled job log archive.
+
+    GitHub returns a zip; members are decompressed lazily as they are read.
+    """
+    if "zip" not in ctype and not zipfile.is_zipfile(spool):
         # Fallback: treat response as plain text
-        yield ("job.log", raw.decode("utf-8", errors="replace"))
+        spool.seek(0)
+        yield ("job.log", io.TextIOWrapper(spool, encoding="utf-8", errors="replace", newline=""))
         return
 
-    with zipfile.ZipFile(BytesIO(raw)) as zf:
+    with zipfile.ZipFile(spool) as zf:
         for name in sorted(zf.namelist()):
             with zf.open(name) as fp:
-                text = fp.read().decode("utf-8", errors="replace")
-                yield (name, text)
+                yield (
+                    name,
+                    io.TextIOWrapper(fp, encoding="utf-8", errors="replace", newline=""),
+                )
+
+
+class RstripWriter:
+    """Text writer that drops trailing whitespace at close, like `text.rstrip()`.
+
+    Whitespace is held back until non-whitespace follows it, so only the
+    current whitespace run is buffered.
+    """
+
+    def __init__(self, out: TextIO) -> None:
+        self.out = out
+        self.pending = ""
+
+    def write(self, text: str) -> None:
+        stripped = text.rstrip()
+        if not stripped:
+            self.pending += text
+            return
+        self.out.write(self.pending)
+        self.out.write(stripped)
+        self.pending = text[len(stripped) :]
+
+    def close(self) -> None:
+        self.out.write("\n")
+
+
+def write_job_log(client: GitHubClient, job: dict[str, Any], repo: str, out_path: Path) -> None:
+    """Stream a job's logs to `out_path` as "# <file>" sections separated by blank lines."""
+    part_path = out_path.with_name(out_path.name + ".part")
+    spool, ctype = spool_job_log(client, job, repo)
+    try:
+        with spool, part_path.open("w", encoding="utf-8", errors="replace", newline="\n") as out:
+            writer = RstripWriter(out)
+            for index, (fname, text) in enumerate(iter_job_logs(spool, ctype)):
+                separator = "\n\n" if index else ""
+                writer.write(f"{separator}# {fname}\n")
+                while chunk := text.read(LOG_CHUNK_CHARS):
+                    writer.write(chunk)
+            writer.close()
+        part_path.replace(out_path)
+    except BaseException:
+        part_path.unlink(missing_ok=True)
+        raise
+
+
+def dump_job_log(client: GitHubClient, job: dict[str, Any], repo: str, log_dir: Path) -> None:
+    jname = job.get("name", "unknown")
+    jid = job.get("id")
+    try:
+        out_path = log_dir / f"{safe_name(jname)}_{jid}.log"
+        write_job_log(client, job, repo, out_path)
+        print(f"job '{jname}' failed; logs written to {out_path}", flush=True)
+    except Exception as exc:  # pragma: no cover - log download edge cases
+        err_path = log_dir / f"{safe_name(jname)}_{jid}.err.log"
+        err_path.write_text(
+            f"Error fetching logs for job {jid}: {exc}\n",
+            encoding="utf-8",
+            errors="replace",
+            newline="\n",
+        )
+        print(
+            f"Failed to fetch logs for job {jid}: {exc} (saved to {err_path})",
+            file=sys.stderr,
+            flush=True,
+        )
+
+
+def write_run_meta(log_dir: Path, run: dict[str, Any]) -> None:
+    """Record which run a log directory belongs to (read by buckal_log_index.py)."""
+    log_dir.mkdir(parents=True, exist_ok=True)
+    keys = ("id", "run_number", "head_sha", "head_branch", "created_at")
+    meta = {key: run.get(key) for key in keys}
+    (log_dir / "run.json").write_text(json.dumps(meta, indent=2) + "\n", encoding="utf-8")
+
+
+def is_failed_b2_job(job: dict[str, Any]) -> bool:
+    return (
+        str(job.get("name", "")).startswith("b2")
+        and job.get("status") == "completed"
+        and (job.get("conclusion") or "").lower() != "success"
+    )
+
+
+def local_head(path: Path) -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=path, capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def job_state(job: dict[str, Any]) -> str:
+    status = job.get("status") or "unknown"
+    conclusion = job.get("conclusion")
+    return f"{status}/{conclusion}" if conclusion else status
+
+
+def duration_s(item: dict[str, Any]) -> float | None:
+    """Seconds between started_at and completed_at of a job or step."""
+    try:
+        start = datetime.fromisoformat(item["started_at"].replace("Z", "+00:00"))
+        end = datetime.fromisoformat(item["completed_at"].replace("Z", "+00:00"))
+    except (KeyError, AttributeError, ValueError):
+        return None
+    return (end - start).total_seconds()
+
+
+def job_duration(job: dict[str, Any]) -> str:
+    seconds = duration_s(job)
+    return "" if seconds is None else f" ({seconds:.0f}s)"
+
+
+def watch_run(client: GitHubClient, args: argparse.Namespace) -> int:
+    """Follow the run for args.sha until it completes; returns the exit code."""
+    sha = args.sha or local_head(FD_SAMPLE_DIR)
+    if not sha:
+        sys.exit(f"--watch needs --sha (could not read HEAD of {FD_SAMPLE_DIR})")
+    print(f"[info] watching {args.repo} runs for {sha[:12]}", flush=True)
+
+    deadline = time.monotonic() + args.watch_timeout * 60
+    interval = POLL_MIN_S
+    run_state: str | None = None
+    job_states: dict[int, str] = {}
+    downloads: list[Future] = []
+    pool = ThreadPoolExecutor(max_workers=client.max_workers)
+    try:
+        while True:
+            changed = False
+            run = latest_run(client, args.repo, args.branch, sha)
+            if run is None:
+                if run_state is None:
+                    print("[info] no run yet; waiting for GitHub to queue one", flush=True)
+                    run_state = ""
+            else:
+                state = job_state(run)
+                if state != run_state:
+                    if not run_state:
+                        print(format_run(run), flush=True)
+                    print(f"[{datetime.now():%H:%M:%S}] run #{run.get('run_number')}: {state}")
+                    run_state = state
+                    changed = True
+                log_dir = REPO_ROOT / "log" / make_date_slug(run.get("created_at"))
+                for job in list_jobs(client, run, args.repo):
+                    jid = int(job["id"])
+                    state = job_state(job)
+                    if job_states.get(jid) == state:
+                        continue
+                    job_states[jid] = state
+                    changed = True
+                    print(
+                        f"[{datetime.now():%H:%M:%S}] {job.get('name', jid)}: {state}"
+                        f"{job_duration(job)}",
+                        flush=True,
+                    )
+                    if args.dump_log and is_failed_b2_job(job):
+                        write_run_meta(log_dir, run)
+                        downloads.append(
+                            pool.submit(dump_job_log, client, job, args.repo, log_dir)
+                        )
+                if run.get("status") == "completed":
+                    break
+            if time.monotonic() > deadline:
+                print(f"[warn] gave up after {args.watch_timeout} minutes", file=sys.stderr)
+                return 2
+            # Poll quickly while things change, back off while the run is idle.
+            interval = POLL_MIN_S if changed else min(interval * POLL_BACKOFF, POLL_MAX_S)
+            time.sleep(interval)
+    finally:
+        for future in downloads:
+            future.result()
+        pool.shutdown()
+
+    conclusion = (run.get("conclusion") or "").lower()
+    print(f"[{'ok' if conclusion == 'success' else 'warn'}] run finished: {conclusion}")
+    return 0 if conclusion == "success" else 1
+
+
+def trend(values: list[float]) -> float | None:
+    """Relative change of the newer half's median over the older half's (values oldest first)."""
+    if len(values) < 4:
+        return None
+    half = len(values) // 2
+    older = statistics.median(values[:half])
+    newer = statistics.median(values[-half:])
+    return (newer - older) / older if older else None
+
+
+def job_history(runs: list[dict[str, Any]], jobs_by_run: list[list[dict[str, Any]]]) -> dict:
+    """Per-job (platform) duration series and per-step durations across runs."""
+    platforms: dict[str, list[float]] = {}
+    steps: dict[tuple[str, str], list[float]] = {}
+    # Runs come newest first; build series oldest first.
+    for run, jobs in reversed(list(zip(runs, jobs_by_run))):
+        if run.get("status") != "completed":
+            continue
+        for job in jobs:
+            seconds = duration_s(job)
+            if job.get("status") != "completed" or seconds is None:
+                continue
+            name = str(job.get("name", job.get("id")))
+            platforms.setdefault(name, []).append(seconds)
+            for step in job.get("steps") or []:
+                step_s = duration_s(step)
+                if step_s is not None:
+                    steps.setdefault((name, str(step.get("name"))), []).append(step_s)
+    return {
+        "platforms": {
+            name: {**summarize(values), "last": values[-1], "trend": trend(values)}
+            for name, values in platforms.items()
+        },
+        "steps": [
+            {"job": job, "step": step, **summarize(values)}
+            for (job, step), values in steps.items()
+        ],
+    }
+
+
+def format_history(history: dict, runs: int, top: int) -> str:
+    platforms = history["platforms"]
+    lines = [f"Job durations over the last {runs} run(s) (sorted by median):"]
+    width = max([len("job"), *(len(name) for name in platforms)])
+    lines.append(f"{'job':<{width}}  {'n':>3}  {'median':>8}  {'p95':>8}  {'last':>8}  trend")
+    for name, stats in sorted(platforms.items(), key=lambda item: -item[1]["median"]):
+        change = "-" if stats["trend"] is None else f"{stats['trend'] * 100:+.0f}%"
+        lines.append(
+            f"{name:<{width}}  {stats['n']:>3}  {stats['median']:>7.0f}s  {stats['p95']:>7.0f}s  "
+            f"{stats['last']:>7.0f}s  {change}"
+        )
+    slowest = sorted(history["steps"], key=lambda item: -item["median"])[:top]
+    if slowest:
+        lines.append("")
+        lines.append(f"Slowest {len(slowest)} step(s) by median:")
+        width = max(len(f"{s['job']} / {s['step']}") for s in slowest)
+        for s in slowest:
+            label = f"{s['job']} / {s['step']}"
+            lines.append(
+                f"{label:<{width}}  {s['n']:>3}  {s['median']:>7.0f}s  max {s['max']:>6.0f}s"
+            )
+    return "\n".join(lines)
+
+
+def show_history(client: GitHubClient, args: argparse.Namespace) -> None:
+    runs = list_runs(client, args.repo, args.branch, args.history)
+    if not runs:
+        sys.exit(f"No workflow runs found for {args.repo}")
+    jobs_by_run = client.map(lambda run: list_jobs(client, run, args.repo), runs)
+    history = job_history(runs, jobs_by_run)
+    if args.json:
+        print(json.dumps({"runs": len(runs), **history}, indent=2))
+    else:
+        print(format_history(history, len(runs), args.top_steps))
 
 
 def format_run(run: dict[str, Any]) -> str:
@@ -206,6 +477,60 @@ def main() -> None:
         action="store_true",
         help="download logs for jobs whose name starts with 'b2'; saves failed job logs to files",
     )
+    parser.add_argument(
+        "--api-base",
+        default=API_BASE,
+        help=f"GitHub API base URL (default: $GITHUB_API_URL or {API_BASE})",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="maximum concurrent log downloads (default: 8)",
+    )
+    parser.add_argument(
+        "--sha",
+        help="only consider runs for this commit (with --watch, default: HEAD of test/3rd/fd)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="follow the run until it completes, printing job status changes as they happen",
+    )
+    parser.add_argument(
+        "--history",
+        type=int,
+        metavar="N",
+        help="summarize job and step durations over the last N runs instead of the latest run",
+    )
+    parser.add_argument(
+        "--top-steps",
+        type=int,
+        default=15,
+        help="with --history, how many of the slowest steps to print (default: 15)",
+    )
+    parser.add_argument(
+        "--watch-timeout",
+        type=float,
+        default=180,
+        help="give up watching after this many minutes (default: 180)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=str(CACHE_DIR),
+        help="response cache directory (default: log/.cache/github)",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=1024,
+        help="evict least recently used cache entries beyond this size (default: 1024)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="always fetch from GitHub without reading or writing the response cache",
+    )
     args = parser.parse_args()
 
     token = args.token or os.getenv("GITHUB_TOKEN") or os.getenv("GITHUB_ACCESS_TOKEN")
@@ -215,15 +540,33 @@ def main() -> None:
             "Log download requires authentication. Set --token, GITHUB_TOKEN, or GITHUB_ACCESS_TOKEN with actions:read scope."
         )
 
+    cache = None if args.no_cache else ResponseCache(Path(args.cache_dir), args.cache_max_mb << 20)
+    client = GitHubClient(
+        token, api_base=args.api_base, max_workers=max(1, args.concurrency), cache=cache
+    )
     try:
-        run = latest_run(args.repo, token, args.branch)
-    except HTTPError as exc:
+        run_main(client, args)
+    except GitHubError as exc:
         sys.exit(f"GitHub API error ({exc.code}): {exc.reason}")
-    except URLError as exc:
-        sys.exit(f"Network error: {exc.reason}")
-    except Exception as exc:  # pragma: no cover - guard rail
-        sys.exit(f"Unexpected error: {exc}")
+    except OSError as exc:
+        sys.exit(f"Network error: {exc}")
+    finally:
+        client.close()
+
+
+def run_main(client: GitHubClient, args: argparse.Namespace) -> None:
+    if args.history:
+        show_history(client, args)
+        print_cache_stats(client)
+        return
+    if args.watch:
+        code = watch_run(client, args)
+        print_cache_stats(client)
+        if code:
+            sys.exit(code)
+        return
 
+    run = latest_run(client, args.repo, args.branch, args.sha)
     if not run:
         sys.exit(f"No workflow runs found for {args.repo}")
 
@@ -233,7 +576,7 @@ def main() -> None:
         print(format_run(run))
 
     if args.dump_log:
-        jobs = list_jobs(run["id"], args.repo, token)
+        jobs = list_jobs(client, run, args.repo)
         matched = [j for j in jobs if str(j.get("name", "")).startswith("b2")]
         if not matched:
             print("No jobs with name starting with 'b2' found.", file=sys.stderr)
@@ -241,37 +584,28 @@ def main() -> None:
 
         date_slug = make_date_slug(run.get("created_at"))
         log_dir = REPO_ROOT / "log" / date_slug
-        log_dir.mkdir(parents=True, exist_ok=True)
+        write_run_meta(log_dir, run)
 
+        failed = []
         for job in matched:
-            jname = job.get("name", "unknown")
-            jid = job.get("id")
-            conclusion = (job.get("conclusion") or "").lower()
-
-            if conclusion == "success":
-                print(f"job '{jname}' succeeded; logs not fetched")
-                continue
-
-            try:
-                log_parts: list[str] = []
-                for fname, text in iter_job_logs(int(jid), args.repo, token):
-                    log_parts.append(f"# {fname}\n{text}")
-                combined = "\n\n".join(log_parts).rstrip() + "\n"
-                out_path = log_dir / f"{safe_name(jname)}_{jid}.log"
-                out_path.write_text(combined, encoding="utf-8", errors="replace", newline="\n")
-                print(f"job '{jname}' failed; logs written to {out_path}")
-            except Exception as exc:  # pragma: no cover - log download edge cases
-                err_path = log_dir / f"{safe_name(jname)}_{jid}.err.log"
-                err_path.write_text(
-                    f"Error fetching logs for job {jid}: {exc}\n",
-                    encoding="utf-8",
-                    errors="replace",
-                    newline="\n",
-                )
-                print(
-                    f"Failed to fetch logs for job {jid}: {exc} (saved to {err_path})",
-                    file=sys.stderr,
-                )
+            if (job.get("conclusion") or "").lower() == "success":
+                print(f"job '{job.get('name', 'unknown')}' succeeded; logs not fetched")
+            else:
+                failed.append(job)
+        # Log downloads are independent; fetch them concurrently over the pool.
+        client.map(lambda job: dump_job_log(client, job, args.repo, log_dir), failed)
+
+    print_cache_stats(client)
+
+
+def print_cache_stats(client: GitHubClient) -> None:
+    if client.cache is not None:
+        stats = client.cache_stats
+        print(
+            f"[info] response cache: {stats['hit']} hit, {stats['not_modified']} not modified, "
+            f"{stats['miss']} fetched",
+            file=sys.stderr,
+        )
 
 
 if __name__ == "__main__":
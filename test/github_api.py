@@ -0,0 +1,324 @@
+"""
+Small GitHub REST client used by github_actions_latest.py.
+
+- Keep-alive connections: one `http.client` connection per (thread, host),
+  reused across requests instead of a new `urlopen` connection each time.
+  Like `urlopen`, they go through the proxy from `HTTPS_PROXY`/`HTTP_PROXY`
+  (CONNECT tunnel for https) unless `NO_PROXY` matches the host.
+- Concurrency: `map()` runs requests on a bounded thread pool.
+- Caching: with a ResponseCache, `get_json(..., cache_key=...)` revalidates
+  with conditional requests and `download_cached()` never refetches immutable
+  bodies (see github_cache.py).
+- Rate limits: `X-RateLimit-Remaining`/`X-RateLimit-Reset` are tracked on every
+  response. When the budget is exhausted, requests wait for the reset instead
+  of failing. 403/429 responses with `Retry-After` (secondary limits) and 5xx
+  responses are retried with backoff.
+
+The API base is configurable (`GITHUB_API_URL`, `--api-base`), and plain http
+is supported, so the client can be pointed at a local stub server.
+"""
+
+from __future__ import annotations
+
+import base64
+import http.client
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.message import Message
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Iterable, TypeVar
+from urllib.parse import SplitResult, unquote, urljoin, urlsplit
+from urllib.request import getproxies, proxy_bypass
+
+from github_cache import ResponseCache
+
+API_BASE = os.getenv("GITHUB_API_URL", "https://api.github.com")
+USER_AGENT = "buckal-actions-helper/1.0"
+CHUNK_SIZE = 1 << 16
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Errors that mean a pooled keep-alive connection went stale; the request is
+# retried on a fresh connection.
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+def proxy_auth_headers(proxy: SplitResult) -> dict[str, str]:
+    """Proxy-Authorization for credentials in the proxy URL (user:pass@host)."""
+    if proxy.username is None:
+        return {}
+    credentials = f"{unquote(proxy.username)}:{unquote(proxy.password or '')}"
+    return {"Proxy-Authorization": "Basic " + base64.b64encode(credentials.encode()).decode()}
+
+
+class GitHubError(Exception):
+    def __init__(self, code: int, reason: str, url: str) -> None:
+        super().__init__(f"HTTP {code} {reason} for {url}")
+        self.code = code
+        self.reason = reason
+        self.url = url
+
+
+class GitHubClient:
+    def __init__(
+        self,
+        token: str | None,
+        api_base: str = API_BASE,
+        max_workers: int = 8,
+        max_retries: int = 4,
+        max_wait: float = 900.0,
+        timeout: float = 60.0,
+        cache: ResponseCache | None = None,
+    ) -> None:
+        self.token = token
+        self.cache = cache
+        self.cache_stats = {"hit": 0, "not_modified": 0, "miss": 0}
+        self.api_base = api_base.rstrip("/")
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.rate_remaining: int | None = None
+        self.rate_reset: float | None = None
+        self._rate_lock = threading.Lock()
+        self._local = threading.local()
+        self._all_connections: list[http.client.HTTPConnection] = []
+        self._conn_lock = threading.Lock()
+
+    # -- connection pool -------------------------------------------------
+
+    def _connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        pool = getattr(self._local, "pool", None)
+        if pool is None:
+            pool = self._local.pool = {}
+        conn = pool.get((scheme, netloc))
+        if conn is None:
+            conn = self._new_connection(scheme, netloc)
+            pool[(scheme, netloc)] = conn
+            with self._conn_lock:
+                self._all_connections.append(conn)
+        return conn
+
+    def _proxy_for(self, scheme: str, netloc: str) -> SplitResult | None:
+        """The proxy `urlopen` would use for this host (*_PROXY / NO_PROXY), if any."""
+        proxy = getproxies().get(scheme)
+        if not proxy or proxy_bypass(urlsplit(f"//{netloc}").hostname or netloc):
+            return None
+        return urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+
+    def _new_connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        proxy = self._proxy_for(scheme, netloc)
+        if proxy is None:
+            return cls(netloc, timeout=self.timeout)
+        proxy_host = f"{proxy.hostname}:{proxy.port or 80}"
+        if scheme != "https":
+            # Plain http goes to the proxy with absolute request targets (see open()).
+            return http.client.HTTPConnection(proxy_host, timeout=self.timeout)
+        # TLS to the real host inside a CONNECT tunnel through the proxy.
+        conn = cls(proxy_host, timeout=self.timeout)
+        conn.set_tunnel(netloc, headers=proxy_auth_headers(proxy))
+        return conn
+
+    def _drop_connection(self, scheme: str, netloc: str) -> None:
+        conn = self._local.pool.pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+    def close(self) -> None:
+        if self.cache is not None:
+            self.cache.evict()
+        with self._conn_lock:
+            for conn in self._all_connections:
+                conn.close()
+            self._all_connections.clear()
+
+    # -- rate limiting ---------------------------------------------------
+
+    def _note_rate_limit(self, headers: Message) -> None:
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        with self._rate_lock:
+            if remaining is not None and remaining.isdigit():
+                self.rate_remaining = int(remaining)
+            if reset is not None and reset.isdigit():
+                self.rate_reset = float(reset)
+
+    def _wait_for_rate_limit(self) -> None:
+        with self._rate_lock:
+            remaining, reset = self.rate_remaining, self.rate_reset
+        if remaining is None or remaining > 0 or reset is None:
+            return
+        delay = reset - time.time() + 1
+        if delay > 0:
+            self._sleep(delay, "rate limit exhausted")
+        with self._rate_lock:
+            if self.rate_reset == reset:
+                self.rate_remaining = None
+
+    def _sleep(self, delay: float, why: str) -> None:
+        delay = min(delay, self.max_wait)
+        print(f"[info] GitHub {why}; waiting {delay:.0f}s", flush=True)
+        time.sleep(delay)
+
+    def _retry_delay(self, status: int, headers: Message, attempt: int) -> float | None:
+        """Seconds to wait before retrying, or None if the response is final."""
+        if status in (403, 429):
+            retry_after = headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return float(retry_after)
+            if headers.get("X-RateLimit-Remaining") == "0":
+                reset = headers.get("X-RateLimit-Reset")
+                if reset and reset.isdigit():
+                    return max(float(reset) - time.time() + 1, 1.0)
+            return None
+        if status >= 500:
+            return float(2**attempt)
+        return None
+
+    # -- requests --------------------------------------------------------
+
+    def url(self, path: str) -> str:
+        return path if "://" in path else f"{self.api_base}/{path.lstrip('/')}"
+
+    def _headers(self, auth: bool, extra: dict[str, str] | None) -> dict[str, str]:
+        headers = {"Accept": "application/vnd.github+json", "User-Agent": USER_AGENT}
+        if auth and self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        if extra:
+            headers.update(extra)
+        return headers
+
+    def open(
+        self, url: str, headers: dict[str, str] | None = None, auth: bool = True
+    ) -> http.client.HTTPResponse:
+        """Send a GET and return the response, whose body the caller must read fully.
+
+        Handles stale keep-alive connections, rate limits and retries. Non-2xx
+        responses other than 3xx are raised as GitHubError.
+        """
+        url = self.url(url)
+        parts = urlsplit(url)
+        target = parts.path + (f"?{parts.query}" if parts.query else "")
+        send_headers = self._headers(auth, headers)
+        proxy = self._proxy_for(parts.scheme, parts.netloc) if parts.scheme == "http" else None
+        if proxy is not None:
+            target = f"http://{parts.netloc}{target}"
+            send_headers.update(proxy_auth_headers(proxy))
+        attempt = 0
+        while True:
+            if auth:
+                self._wait_for_rate_limit()
+            conn = self._connection(parts.scheme, parts.netloc)
+            try:
+                conn.request("GET", target, headers=send_headers)
+                resp = conn.getresponse()
+            except STALE_CONNECTION_ERRORS:
+                self._drop_connection(parts.scheme, parts.netloc)
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                continue
+            if auth:
+                self._note_rate_limit(resp.msg)
+            if resp.status < 400:
+                return resp
+            body = resp.read()
+            delay = self._retry_delay(resp.status, resp.msg, attempt)
+            if delay is None or attempt >= self.max_retries:
+                raise GitHubError(resp.status, resp.reason or body[:200].decode(errors="replace"), url)
+            attempt += 1
+            self._sleep(delay, f"returned {resp.status}")
+
+    def get_json(
+        self, url: str, cache_key: str | None = None, immutable: bool = False
+    ) -> tuple[Any, Message]:
+        """GET a JSON document; with a cache_key it is cached and revalidated."""
+        if self.cache is None or cache_key is None:
+            resp = self.open(url)
+            return json.loads(resp.read().decode("utf-8")), resp.msg
+        entry = self.cache.lookup(cache_key)
+        # An entry stored as immutable is only trusted by callers that still consider
+        # the document immutable; everyone else revalidates it.
+        if entry is not None and entry.immutable and immutable:
+            self._count("hit")
+            self.cache.touch(cache_key)
+            return json.loads(entry.read().decode("utf-8")), entry.headers()
+        resp = self.open(url, entry.validators() if entry else None)
+        body = resp.read()
+        if resp.status == 304 and entry is not None:
+            self._count("not_modified")
+            if immutable != entry.immutable:
+                entry = self.cache.store(cache_key, url, entry.headers(), entry.read(), immutable)
+            self.cache.touch(cache_key)
+            return json.loads(entry.read().decode("utf-8")), entry.headers()
+        self._count("miss")
+        self.cache.store(cache_key, url, resp.msg, body, immutable)
+        return json.loads(body.decode("utf-8")), resp.msg
+
+    def _count(self, kind: str) -> None:
+        with self._rate_lock:
+            self.cache_stats[kind] += 1
+
+    def open_following(self, url: str) -> http.client.HTTPResponse:
+        """Open `url`, following at most one redirect.
+
+        GitHub's log endpoints return a 302 to a signed blob URL; that URL is
+        fetched without GitHub auth headers.
+        """
+        resp = self.open(url)
+        if resp.status in (301, 302, 303, 307, 308):
+            location = resp.getheader("Location")
+            resp.read()
+            if not location:
+                raise GitHubError(resp.status, "redirect without Location", url)
+            resp = self.open(urljoin(self.url(url), location), {"Accept": "*/*"}, auth=False)
+        return resp
+
+    def get_bytes(self, url: str) -> tuple[bytes, Message]:
+        resp = self.open_following(url)
+        return resp.read(), resp.msg
+
+    def download(self, url: str, out: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Message:
+        """Copy the response body into `out` chunk by chunk; returns the headers."""
+        resp = self.open_following(url)
+        while chunk := resp.read(chunk_size):
+            out.write(chunk)
+        return resp.msg
+
+    def download_cached(self, url: str, cache_key: str) -> tuple[Path, Message]:
+        """Download an immutable body into the cache (once) and return its path."""
+        assert self.cache is not None
+        entry = self.cache.lookup(cache_key)
+        if entry is not None:
+            self._count("hit")
+            self.cache.touch(cache_key)
+            return entry.body_path, entry.headers()
+        fd, tmp = self.cache.temp_body(cache_key)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                headers = self.download(url, out)
+            entry = self.cache.store(cache_key, url, headers, tmp, immutable=True)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        self._count("miss")
+        return entry.body_path, headers
+
+    def map(self, fn: Callable[[T], R], items: Iterable[T]) -> list[R]:
+        """Run `fn` over items on at most max_workers threads, preserving order."""
+        items = list(items)
+        if len(items) <= 1 or self.max_workers <= 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as pool:
+            return list(pool.map(fn, items))
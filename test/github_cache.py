@@ -0,0 +1,164 @@
+"""
+On-disk cache of GitHub API responses, under `log/.cache/github` by default.
+
+Entries are keyed by repo/run/job (e.g. `yueneiqi/fd-test/runs/123/attempts/1/jobs`). Each
+key is stored as two files:
+
+    <key>.body       raw response body
+    <key>.meta.json  {"url", "etag", "last_modified", "content_type",
+                      "immutable", "stored_at", "size"}
+
+Mutable entries (run lists, jobs of a running workflow) are revalidated with
+`If-None-Match`/`If-Modified-Since`. A 304 reuses the body and, when
+authenticated, does not count against the rate limit. Immutable entries (logs
+and job lists of finished run attempts) are served without any request, but
+only to callers that still ask for them as immutable; anyone else revalidates
+the entry and downgrades it to mutable.
+
+The meta file's mtime is the last-used time. `evict()` drops least recently
+used entries until the cache fits in `max_bytes`.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import tempfile
+import time
+from dataclasses import dataclass
+from email.message import Message
+from pathlib import Path
+from typing import Any
+
+META_SUFFIX = ".meta.json"
+BODY_SUFFIX = ".body"
+STALE_TMP_SECONDS = 24 * 3600
+
+
+def safe_key(key: str) -> str:
+    parts = [re.sub(r"[^A-Za-z0-9_.-]+", "_", part) for part in key.split("/") if part]
+    return "/".join(part for part in parts if part not in (".", ".."))
+
+
+@dataclass
+class CachedResponse:
+    body_path: Path
+    meta: dict[str, Any]
+
+    @property
+    def immutable(self) -> bool:
+        return bool(self.meta.get("immutable"))
+
+    def read(self) -> bytes:
+        return self.body_path.read_bytes()
+
+    def headers(self) -> Message:
+        msg = Message()
+        if self.meta.get("content_type"):
+            msg["Content-Type"] = self.meta["content_type"]
+        if self.meta.get("etag"):
+            msg["ETag"] = self.meta["etag"]
+        if self.meta.get("last_modified"):
+            msg["Last-Modified"] = self.meta["last_modified"]
+        return msg
+
+    def validators(self) -> dict[str, str]:
+        headers: dict[str, str] = {}
+        if self.meta.get("etag"):
+            headers["If-None-Match"] = self.meta["etag"]
+        if self.meta.get("last_modified"):
+            headers["If-Modified-Since"] = self.meta["last_modified"]
+        return headers
+
+
+class ResponseCache:
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        base = self.root / safe_key(key)
+        return base.with_name(base.name + BODY_SUFFIX), base.with_name(base.name + META_SUFFIX)
+
+    def lookup(self, key: str) -> CachedResponse | None:
+        body_path, meta_path = self._paths(key)
+        try:
+            meta = json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            return None
+        if not body_path.is_file():
+            return None
+        return CachedResponse(body_path, meta)
+
+    def touch(self, key: str) -> None:
+        _, meta_path = self._paths(key)
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+
+    def store(
+        self, key: str, url: str, headers: Message, body: bytes | Path, immutable: bool
+    ) -> CachedResponse:
+        """Store a body (bytes, or a finished temp file which is moved in)."""
+        body_path, meta_path = self._paths(key)
+        body_path.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(body, Path):
+            os.replace(body, body_path)
+        else:
+            self._write_atomic(body_path, body)
+        meta = {
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "content_type": headers.get("Content-Type"),
+            "immutable": immutable,
+            "stored_at": time.time(),
+            "size": body_path.stat().st_size,
+        }
+        self._write_atomic(meta_path, json.dumps(meta, indent=2).encode())
+        return CachedResponse(body_path, meta)
+
+    def temp_body(self, key: str) -> tuple[int, Path]:
+        """A temp file next to `key`'s body, for streaming a download into the cache."""
+        body_path, _ = self._paths(key)
+        body_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, name = tempfile.mkstemp(dir=body_path.parent, prefix=body_path.name, suffix=".tmp")
+        return fd, Path(name)
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes) -> None:
+        fd, name = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(data)
+        os.replace(name, path)
+
+    def evict(self) -> int:
+        """Drop least recently used entries until the cache fits; returns bytes freed."""
+        entries: list[tuple[float, int, Path, Path]] = []
+        total = 0
+        # Leftovers from interrupted downloads.
+        for tmp in self.root.rglob("*.tmp"):
+            try:
+                if time.time() - tmp.stat().st_mtime > STALE_TMP_SECONDS:
+                    tmp.unlink()
+            except OSError:
+                pass
+        for meta_path in self.root.rglob(f"*{META_SUFFIX}"):
+            body_path = meta_path.with_name(meta_path.name[: -len(META_SUFFIX)] + BODY_SUFFIX)
+            try:
+                used = meta_path.stat().st_mtime
+                size = body_path.stat().st_size + meta_path.stat().st_size
+            except OSError:
+                continue
+            entries.append((used, size, body_path, meta_path))
+            total += size
+        freed = 0
+        for _, size, body_path, meta_path in sorted(entries):
+            if total - freed <= self.max_bytes:
+                break
+            meta_path.unlink(missing_ok=True)
+            body_path.unlink(missing_ok=True)
+            freed += size
+        return freed
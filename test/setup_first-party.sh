@@ -12,20 +12,11 @@ buck2 clean
 buck2 init
 
 echo "=== Updating .buckconfig ==="
-# Add buckal to cells section
-sed -i '/^  none = none$/a\  buckal = buckal' .buckconfig
-
-# Add buckal = git to external_cells section
-sed -i '/^  prelude = bundled$/a\  buckal = git' .buckconfig
-
-# Add external_cell_buckal section after external_cells section
-sed -i '/^\[external_cells\]/,/^$/{
-  /^$/i\
-\
-[external_cell_buckal]\
-  git_origin = https://github.com/buck2hub/buckal-bundles\
-  commit_hash = f9c4f306b1aad816fa520fe361f4f03d28cd5b7b
-}' .buckconfig
+python3 /home/seven/Workspace/r8s_c/buckal_c/script/cargo-buckal-wrapper.py \
+  --set cells.buckal=buckal \
+  --set external_cells.buckal=git \
+  --set external_cell_buckal.git_origin=https://github.com/buck2hub/buckal-bundles \
+  --set external_cell_buckal.commit_hash=f9c4f306b1aad816fa520fe361f4f03d28cd5b7b
 
 echo "=== Migrating demo-util ==="
 cd $ROOT_DIR/crates/demo-util/
@@ -0,0 +1,25 @@
+"""
+Summary statistics for timing samples, shared by the benchmark harness
+(buckal_harness.bench_history, bench/buckal_bench.py) and the GitHub Actions
+duration history in github_actions_latest.py.
+"""
+
+from __future__ import annotations
+
+import math
+import statistics
+from typing import Any
+
+
+def summarize(samples: list[float]) -> dict[str, Any]:
+    ordered = sorted(samples)
+    # Nearest-rank percentile; with few samples p95 is simply the slowest run.
+    p95 = ordered[max(0, math.ceil(0.95 * len(ordered)) - 1)]
+    return {
+        "n": len(ordered),
+        "median": statistics.median(ordered),
+        "p95": p95,
+        "min": ordered[0],
+        "max": ordered[-1],
+        "samples": samples,
+    }